@@ -0,0 +1,199 @@
+"""Auto-ajuste do x264: mede uma grade de preset x CRF x tune x threads e grava o perfil do host.
+
+Cada tipo é medido pelo caminho que roda em produção: "motion" recodifica um clipe Ken Burns
+gravado sem perdas; "still" passa as imagens por core.render.render_stills (concat + VFR).
+Cada combinação roda --repeat vezes (mediana do tempo, em x tempo real) e é medida em
+tamanho e qualidade (SSIM/PSNR contra a referência sem perdas). Fica a mais rápida entre
+as que passam do piso de qualidade e não crescem demais o arquivo, desde que seja pelo
+menos --min-speedup mais rápida que o padrão do core.encoder medido na mesma execução
+(abaixo disso é ruído e o padrão fica). O resultado vai para core.encoder
+(output/encoder_profile.json), usado por core/render, video.py, video_v2 e assemble.
+
+Uso:
+    python bench_encoder.py                          # grade padrão, grava o perfil
+    python bench_encoder.py --kinds still --secs 4 --ssim-floor 0.985
+    python bench_encoder.py --presets veryfast,fast --crfs 20,23 --threads 2,4 --repeat 5 --dry-run
+"""
+import argparse, itertools, os, re, statistics, subprocess, tempfile, time
+import numpy as np
+from PIL import Image, ImageDraw
+
+from core import encoder
+from core.render import W, H, FPS, ffmpeg_binary, load_frame, iter_slideshow, render_stills
+
+TUNES = {"motion": (None, "film"), "still": ("stillimage", None)}
+LOSSLESS = ["-c:v", "libx264", "-qp", "0", "-preset", "ultrafast"]  # yuv420p: a métrica mede só o encoder
+
+
+def _synthetic_images(n, tmp):
+    """Imagens parecidas com fotos legendadas: manchas suaves, textura fina e faixa de texto.
+
+    (O ruído uniforme do bench_render é o pior caso do x264 e reprovaria qualquer CRF.)
+    """
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(n):
+        coarse = rng.integers(0, 256, size=(16, 9, 3), dtype=np.uint8)
+        img = np.asarray(Image.fromarray(coarse).resize((W, H), Image.BICUBIC), dtype=np.float32)
+        grain = rng.normal(0, 8, size=(H // 4, W // 4)).astype(np.float32)
+        img += np.asarray(Image.fromarray(grain, mode="F").resize((W, H), Image.BILINEAR))[:, :, None]
+        img = Image.fromarray(np.clip(img, 0, 255).astype(np.uint8))
+        draw = ImageDraw.Draw(img)
+        draw.rectangle((0, H - 420, W, H), fill=(0, 0, 0))
+        for row in range(3):
+            y = H - 360 + row * 110
+            x = 80
+            while x < W - 120:
+                w = int(rng.integers(30, 140))
+                draw.rectangle((x, y, x + w, y + 60), fill=(255, 255, 255))
+                x += w + 28
+        path = os.path.join(tmp, f"bench_{i}.jpg")
+        img.save(path, quality=92)
+        paths.append(path)
+    return paths
+
+
+def _x264(preset, crf, tune, threads):
+    """Mesmos argumentos que core.encoder.x264_args monta a partir de um perfil."""
+    args = ["-c:v", "libx264", "-preset", preset]
+    if crf is not None:
+        args += ["-crf", str(crf)]
+    if tune:
+        args += ["-tune", tune]
+    return args + ["-threads", str(threads)]
+
+
+def _motion_reference(paths, secs, out):
+    """Ken Burns (zoom 1.05, CFR) gravado sem perdas; os candidatos recodificam este arquivo."""
+    per = secs / len(paths)
+    segments = [(load_frame(p), per, 1.05) for p in paths]
+    cmd = [ffmpeg_binary(), "-y", "-loglevel", "error",
+           "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{W}x{H}", "-r", str(FPS), "-i", "-",
+           *LOSSLESS, "-pix_fmt", "yuv420p", out]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    for frames in iter_slideshow(segments, total_secs=secs):
+        proc.stdin.write(np.ascontiguousarray(frames).tobytes())
+    proc.stdin.close()
+    if proc.wait() != 0:
+        raise RuntimeError("ffmpeg falhou ao gravar a referência")
+
+
+def _encoder_for(kind, paths, secs, ref):
+    """encode(args, out) do tipo, já com a referência sem perdas gravada em `ref`."""
+    if kind == "motion":
+        _motion_reference(paths, secs, ref)
+        return lambda args, out: subprocess.run(
+            [ffmpeg_binary(), "-y", "-loglevel", "error", "-i", ref, "-an", "-fps_mode", "passthrough",
+             *args, "-pix_fmt", "yuv420p", out], check=True)
+    # still: o mesmo render_stills de video.py (um quadro por imagem, concat + VFR)
+    frames = [load_frame(p) for p in paths]
+    durations = [secs / len(frames)] * len(frames)
+    render_stills(frames, durations, ref, total_secs=secs, encoder_args=LOSSLESS)
+    return lambda args, out: render_stills(frames, durations, out, total_secs=secs, encoder_args=args)
+
+
+def _timed(encode, args, out, repeat):
+    """Mediana de `repeat` execuções (s): uma execução isolada oscila demais entre candidatos."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        encode(args, out)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def _quality(out, ref):
+    """(SSIM médio, PSNR médio) da saída contra a referência."""
+    graph = "[0:v]split[a][b];[1:v]split[c][d];[a][c]ssim;[b][d]psnr"
+    res = subprocess.run([ffmpeg_binary(), "-hide_banner", "-i", out, "-i", ref,
+                          "-lavfi", graph, "-f", "null", "-"],
+                         stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    ssim = re.search(r"SSIM .*All:([\d.]+)", res.stderr)
+    psnr = re.search(r"PSNR .*average:([\d.]+|inf)", res.stderr)
+    return float(ssim.group(1)), float(psnr.group(1))
+
+
+def _pick(rows, ssim_floor, max_size_ratio):
+    """Mais rápida entre as que passam do piso de SSIM e ficam até max_size_ratio x a menor."""
+    ok = [r for r in rows if r["ssim"] >= ssim_floor]
+    if not ok:
+        return None
+    smallest = min(r["bytes"] for r in ok)
+    ok = [r for r in ok if r["bytes"] <= smallest * max_size_ratio]
+    return max(ok, key=lambda r: (r["speed"], -r["bytes"]))
+
+
+def _row(kind, encode, ref, out, params, secs, repeat):
+    dt = _timed(encode, _x264(**params), out, repeat)
+    ssim, psnr = _quality(out, ref)
+    row = dict(params, speed=round(secs / dt, 3), bytes=os.path.getsize(out),
+               ssim=round(ssim, 5), psnr=round(psnr, 2))
+    print(f"[{kind}] {row['preset']:<9}{str(row['crf'] or '-'):>4} {row['tune'] or '-':<11}{row['threads']:>4}"
+          f"{row['speed']:8.2f}{row['bytes'] / 1024:8.0f}{ssim:8.4f}{psnr:7.2f}")
+    return row
+
+
+def _csv(s, cast=str):
+    return [None if x in ("none", "") else cast(x) for x in s.split(",")]
+
+
+def main():
+    cores = os.cpu_count() or 1
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--kinds", default="motion,still")
+    ap.add_argument("--secs", type=float, default=3.0, help="duração do clipe sintético")
+    ap.add_argument("--images", type=int, default=3)
+    ap.add_argument("--presets", default="veryfast,faster,fast,medium")
+    ap.add_argument("--crfs", default="20,23,26")
+    ap.add_argument("--tunes", default=None, help="ex.: none,stillimage (padrão: por tipo)")
+    ap.add_argument("--threads", default=",".join(str(t) for t in sorted({1, max(1, cores // 2), cores})))
+    ap.add_argument("--ssim-floor", type=float, default=0.97)
+    ap.add_argument("--max-size-ratio", type=float, default=1.5,
+                    help="tamanho máximo em relação à menor saída aprovada")
+    ap.add_argument("--repeat", type=int, default=3, help="execuções por combinação (mediana do tempo)")
+    ap.add_argument("--min-speedup", type=float, default=0.10,
+                    help="ganho mínimo sobre o padrão do core.encoder para trocar o perfil")
+    ap.add_argument("--dry-run", action="store_true", help="só mede, não grava o perfil")
+    args = ap.parse_args()
+
+    presets, crfs, threads = _csv(args.presets), _csv(args.crfs, int), _csv(args.threads, int)
+    print(f"[bench] host {encoder.host_id()} ({cores} núcleos), clipe {args.secs:g}s {W}x{H}@{FPS}")
+    profiles, results = dict(encoder.load_profile()), {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = _synthetic_images(args.images, tmp)
+        for kind in args.kinds.split(","):
+            ref = os.path.join(tmp, f"ref_{kind}.mp4")
+            out = os.path.join(tmp, "cand.mp4")
+            encode = _encoder_for(kind, paths, args.secs, ref)
+            tunes = _csv(args.tunes) if args.tunes else TUNES[kind]
+            print(f"\n[{kind}] {'preset':<9}{'crf':>4} {'tune':<11}{'thr':>4}{'x real':>8}{'KB':>8}{'SSIM':>8}{'PSNR':>7}")
+            base = _row(kind, encode, ref, out, dict(encoder.DEFAULTS[kind]), args.secs, args.repeat)
+            rows = [_row(kind, encode, ref, out, {"preset": p, "crf": c, "tune": t, "threads": n},
+                         args.secs, args.repeat)
+                    for p, c, t, n in itertools.product(presets, crfs, tunes, threads)]
+            results[kind] = {"default": base, "rows": rows}
+
+            best = _pick(rows, args.ssim_floor, args.max_size_ratio)
+            if best is None:
+                print(f"[{kind}] nenhuma combinação atingiu SSIM >= {args.ssim_floor}; padrão mantido")
+                profiles.pop(kind, None)
+                continue
+            gain = best["speed"] / base["speed"] - 1
+            if gain < args.min_speedup:
+                print(f"[{kind}] melhor candidata só {gain:+.0%} sobre o padrão "
+                      f"(mínimo {args.min_speedup:.0%}); padrão mantido")
+                profiles.pop(kind, None)
+                continue
+            profiles[kind] = {k: best[k] for k in ("preset", "crf", "tune", "threads")}
+            print(f"[{kind}] escolhido: {profiles[kind]} -> {best['speed']:.2f}x tempo real "
+                  f"({gain:+.0%} sobre o padrão), {best['bytes'] / 1024:.0f} KB, SSIM {best['ssim']:.4f}")
+
+    if args.dry_run:
+        return
+    path = encoder.save_profile(profiles, results)
+    print(f"\n[bench] perfil gravado em {path}")
+
+
+if __name__ == "__main__":
+    main()
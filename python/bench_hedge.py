@@ -0,0 +1,97 @@
+"""Benchmark: LLM sequencial (primário, secundário só em erro) x hedged (core.hedge).
+
+Providers de mentira com latência log-normal e cauda pesada (travadas ocasionais),
+sem rede nem credenciais. Tempos em escala reduzida (--scale) para rodar rápido.
+
+Uso:
+    python bench_hedge.py --trials 200
+    python bench_hedge.py --trials 300 --stall 0.1 --percentile 95
+"""
+import argparse, json, random, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+from core import hedge
+from core.script_gen import _parse_script
+
+_rng_lock = threading.Lock()
+_VALID = json.dumps({"language": "pt-BR", "blocks": [{"text": f"bloco {i}"} for i in range(6)]})
+
+
+def _stub(name, median, sigma, stall_p, stall_secs, fail_p, scale, rng):
+    """fn() que dorme uma latência sorteada e devolve um roteiro válido (ou falha)."""
+    def call():
+        with _rng_lock:
+            lat = rng.lognormvariate(0, sigma) * median
+            if rng.random() < stall_p:
+                lat += stall_secs
+            fails = rng.random() < fail_p
+        time.sleep(lat * scale)
+        if fails:
+            raise RuntimeError(f"{name}: throttled")
+        return _VALID
+    return call
+
+
+def _sequential(primary, secondary):
+    try:
+        return _parse_script(primary[1]())
+    except Exception:
+        return _parse_script(secondary[1]())
+
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, max(0, int(round(p / 100 * len(xs))) - 1))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--trials", type=int, default=200)
+    ap.add_argument("--scale", type=float, default=0.01, help="fração do tempo real dormida pelos stubs")
+    ap.add_argument("--stall", type=float, default=0.08, help="prob. de travada do primário")
+    ap.add_argument("--percentile", type=float, default=hedge.HEDGE_PERCENTILE)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    primary = ("bedrock", _stub("bedrock", 6.0, 0.3, args.stall, 45.0, 0.02, args.scale, rng))
+    secondary = ("openai", _stub("openai", 7.0, 0.35, 0.03, 30.0, 0.02, args.scale, rng))
+
+    # histórico em memória: aquece o primário para o prazo por percentil
+    stats = hedge.LatencyStats(path=None)
+    for _ in range(50):
+        t0 = time.perf_counter()
+        try:
+            primary[1]()
+        except Exception:
+            pass
+        stats.record("bedrock", (time.perf_counter() - t0) / args.scale)
+    deadline = stats.deadline("bedrock", args.percentile)
+    print(f"prazo do hedge: p{args.percentile:g} do primário = {deadline:.1f}s")
+
+    def run_seq(_):
+        t0 = time.perf_counter()
+        _sequential(primary, secondary)
+        return (time.perf_counter() - t0) / args.scale
+
+    def run_hedged(_):
+        t0 = time.perf_counter()
+        hedge.hedged_call(primary, secondary, _parse_script, deadline * args.scale,
+                          hedge.LatencyStats(path=None), verbose=False)
+        return (time.perf_counter() - t0) / args.scale
+
+    results = {}
+    for label, fn in (("sequencial", run_seq), ("hedged", run_hedged)):
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results[label] = list(pool.map(fn, range(args.trials)))
+
+    print(f"\n{'modo':<12}{'p50':>8}{'p90':>8}{'p99':>8}{'máx':>8}")
+    for label, xs in results.items():
+        print(f"{label:<12}" + "".join(f"{_pct(xs, p):7.1f}s" for p in (50, 90, 99)) + f"{max(xs):7.1f}s")
+    p99_seq, p99_h = _pct(results["sequencial"], 99), _pct(results["hedged"], 99)
+    print(f"\ncauda p99: {p99_seq:.1f}s -> {p99_h:.1f}s ({p99_seq / max(p99_h, 1e-9):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark: Ken Burns via MoviePy (clip.resize/PIL) x motor streaming (core.render).
+
+Uso:
+    python bench_render.py --secs 10 --images 5
+    python bench_render.py --secs 60 --encode   # inclui o encode libx264 completo
+"""
+import argparse, os, tempfile, time
+import numpy as np
+from PIL import Image
+
+from core import assemble
+from core.render import W, H, FPS, load_frame, iter_slideshow, render_slideshow
+
+
+def _synthetic_images(n, tmp):
+    """Imagens sintéticas (gradiente + ruído) para não depender do Pexels."""
+    rng = np.random.default_rng(0)
+    yy, xx = np.mgrid[0:H, 0:W]
+    paths = []
+    for i in range(n):
+        base = np.stack([(xx * 255 // W), (yy * 255 // H), np.full_like(xx, 40 * i % 255)], axis=2)
+        noise = rng.integers(0, 40, size=base.shape)
+        img = np.clip(base + noise, 0, 255).astype(np.uint8)
+        p = os.path.join(tmp, f"bench_{i}.jpg")
+        Image.fromarray(img).save(p, quality=90)
+        paths.append(p)
+    return paths
+
+
+def _bench_frames_moviepy(paths, secs):
+    from moviepy.editor import concatenate_videoclips
+    per = secs / len(paths)
+    video = concatenate_videoclips([assemble.ken_burns(p, per) for p in paths], method="compose")
+    t0 = time.perf_counter()
+    n = sum(1 for _ in video.iter_frames(fps=FPS, dtype="uint8"))
+    return n, time.perf_counter() - t0
+
+
+def _bench_frames_stream(paths, secs):
+    per = secs / len(paths)
+    t0 = time.perf_counter()
+    segments = [(load_frame(p), per, assemble.ZOOM) for p in paths]
+    n = sum(len(b) for b in iter_slideshow(segments, fps=FPS, total_secs=secs))
+    return n, time.perf_counter() - t0
+
+
+def _bench_encode_moviepy(paths, secs, out):
+    from moviepy.editor import concatenate_videoclips
+    per = secs / len(paths)
+    video = concatenate_videoclips([assemble.ken_burns(p, per) for p in paths], method="compose")
+    t0 = time.perf_counter()
+    video.write_videofile(out, fps=FPS, codec="libx264", audio=False, threads=4,
+                          preset="medium", logger=None)
+    return int(round(secs * FPS)), time.perf_counter() - t0
+
+
+def _bench_encode_stream(paths, secs, out):
+    per = secs / len(paths)
+    t0 = time.perf_counter()
+    segments = [(load_frame(p), per, assemble.ZOOM) for p in paths]
+    render_slideshow(segments, out, total_secs=secs)
+    return int(round(secs * FPS)), time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--secs", type=float, default=10.0)
+    ap.add_argument("--images", type=int, default=5)
+    ap.add_argument("--encode", action="store_true", help="mede o render completo com libx264")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = _synthetic_images(args.images, tmp)
+        if args.encode:
+            runs = [
+                ("moviepy", lambda: _bench_encode_moviepy(paths, args.secs, os.path.join(tmp, "mp.mp4"))),
+                ("stream", lambda: _bench_encode_stream(paths, args.secs, os.path.join(tmp, "st.mp4"))),
+            ]
+        else:
+            runs = [
+                ("moviepy", lambda: _bench_frames_moviepy(paths, args.secs)),
+                ("stream", lambda: _bench_frames_stream(paths, args.secs)),
+            ]
+
+        print(f"[bench] {args.images} imagens, {args.secs:.0f}s @ {FPS}fps, {W}x{H}"
+              f" ({'encode' if args.encode else 'só frames'})")
+        results = {}
+        for name, fn in runs:
+            n, dt = fn()
+            results[name] = n / dt
+            print(f"  {name:8s} {n:5d} frames em {dt:7.2f}s -> {n / dt:7.1f} frames/s")
+        print(f"  speedup  {results['stream'] / results['moviepy']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 # python/core/assemble.py
-import os, random, pathlib
+import os, random, pathlib, tempfile
 import numpy as np
 from moviepy.editor import (
     ImageClip,
@@ -10,45 +10,96 @@ from moviepy.editor import (
 )
 from PIL import Image
 
+from core import audio, encoder
+from core.render import load_frame, render_slideshow
+
 W, H = 1080, 1920
+ZOOM = 1.05
 
 def ken_burns(path, dur):
     # Carrega -> redimensiona -> converte para NumPy antes de criar o ImageClip
     img = Image.open(path).convert("RGB").resize((W, H))
     frame = np.array(img)  # << chave para evitar o erro .shape
     clip = ImageClip(frame).set_duration(dur)
-    zoom = 1.05
+    zoom = ZOOM
     return clip.resize(lambda t: 1 + (zoom - 1) * (t / dur))
 
-def build_video(image_paths, narration_mp3, out_mp4, target_secs=60, music_dir=None, branding_handle=None):
-    per_img = target_secs / max(1, len(image_paths))
-    clips = [ken_burns(p, per_img) for p in image_paths]
-
-    # Branding simples: tela preta final de 3s (sem dependência de ImageMagick/TextClip)
-    if branding_handle:
-        clips.append(ColorClip(size=(W, H), color=(0, 0, 0), duration=3))
-
-    video = concatenate_videoclips(clips, method="compose")
+def _music_tracks(music_dir):
+    if not (music_dir and os.path.isdir(music_dir)):
+        return []
+    return [
+        os.path.join(music_dir, f)
+        for f in os.listdir(music_dir)
+        if f.lower().endswith((".mp3", ".wav", ".m4a"))
+    ]
 
+def _audio_layers(narration_mp3, duration, music_dir=None):
     narration = AudioFileClip(narration_mp3)
     audio_layers = [narration.volumex(1.0)]
 
     if music_dir and os.path.isdir(music_dir):
-        tracks = [
-            os.path.join(music_dir, f)
-            for f in os.listdir(music_dir)
-            if f.lower().endswith((".mp3", ".wav", ".m4a"))
-        ]
+        tracks = _music_tracks(music_dir)
         if tracks:
             bg = AudioFileClip(random.choice(tracks)).volumex(0.15)
-            bg = bg.subclip(0, min(video.duration, bg.duration))
+            bg = bg.subclip(0, min(duration, bg.duration))
             audio_layers.append(bg)
 
-    final_audio = CompositeAudioClip(audio_layers)
+    return CompositeAudioClip(audio_layers)
+
+def _load_narration(path, sr=audio.MIX_RATE):
+    """Narração em float32 na taxa da mixagem; WAV do TTS é lido sem ffmpeg."""
+    if str(path).lower().endswith(".wav"):
+        try:
+            x, rate = audio.read_wav(path)
+            return audio.resample(x, rate, sr)
+        except ValueError:
+            pass  # WAV não-16-bit: deixa o ffmpeg decodificar
+    return audio.decode_file(path, sr=sr, channels=1)
+
+def _mix_audio(narration_path, duration, music_dir=None, sr=audio.MIX_RATE):
+    """Mesmo mix do _audio_layers (voz 1.0 + música 0.15), em NumPy."""
+    layers = [_load_narration(narration_path, sr)]
+    tracks = _music_tracks(music_dir)
+    if tracks:
+        layers.append(audio.decode_file(random.choice(tracks), sr=sr, channels=2) * 0.15)
+    return audio.fit(audio.mix(*layers), int(round(duration * sr)))
+
+def build_video(image_paths, narration_mp3, out_mp4, target_secs=60, music_dir=None,
+                branding_handle=None, engine="stream"):
+    """Monta o vídeo final. engine="stream" usa o pipe NumPy -> ffmpeg
+    (core.render); engine="moviepy" mantém o caminho antigo (comparação/benchmark)."""
+    if engine == "moviepy":
+        return _build_video_moviepy(image_paths, narration_mp3, out_mp4, target_secs,
+                                    music_dir, branding_handle)
+
+    per_img = target_secs / max(1, len(image_paths))
+    segments = [(load_frame(p, (W, H)), per_img, ZOOM) for p in image_paths]
+    if branding_handle:
+        # mesma tela preta final de 3s (cortada por target_secs, como antes)
+        segments.append((None, 3, 1.0))
+
+    # Mix em PCM/NumPy (sem decodificar/recodificar MP3); o AAC é gerado só no mux
+    mixed = _mix_audio(narration_mp3, target_secs, music_dir)
+    with tempfile.TemporaryDirectory() as tmp:
+        wav = audio.write_wav(os.path.join(tmp, "mix.wav"), mixed, audio.MIX_RATE)
+        render_slideshow(segments, out_mp4, audio_path=wav, total_secs=target_secs)
+    return out_mp4
+
+def _build_video_moviepy(image_paths, narration_mp3, out_mp4, target_secs=60, music_dir=None, branding_handle=None):
+    per_img = target_secs / max(1, len(image_paths))
+    clips = [ken_burns(p, per_img) for p in image_paths]
+
+    # Branding simples: tela preta final de 3s (sem dependência de ImageMagick/TextClip)
+    if branding_handle:
+        clips.append(ColorClip(size=(W, H), color=(0, 0, 0), duration=3))
+
+    video = concatenate_videoclips(clips, method="compose")
+
+    final_audio = _audio_layers(narration_mp3, video.duration, music_dir)
     video = video.set_audio(final_audio).set_duration(target_secs)
 
     pathlib.Path(os.path.dirname(out_mp4)).mkdir(parents=True, exist_ok=True)
     video.write_videofile(
-        out_mp4, fps=30, codec="libx264", audio_codec="aac", threads=4, preset="medium"
+        out_mp4, fps=30, codec="libx264", audio_codec="aac", **encoder.moviepy_kwargs("motion")
     )
     return out_mp4
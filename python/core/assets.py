@@ -0,0 +1,254 @@
+# python/core/assets.py
+# Armazém de imagens do Pexels compartilhado (media.py e core/media.py)
+# - Conteúdo endereçado por SHA-256: objects/ab/abcdef....jpg (sem duplicatas)
+# - Índice SQLite: photo_id, URL de origem, dimensões, bytes, último acesso
+# - Orçamento de disco (PEXELS_CACHE_MB) com despejo LRU
+# - Abertura rápida: só o índice é lido, nada de varrer objects/
+# - Arquivos pexels_<id>.jpg do cache antigo são indexados (ou apagados) na primeira abertura
+# - width/height são sempre os da renderização gravada (não os da foto original)
+# - Cache de buscas (/v1/search) por (query, orientation, per_page) com TTL
+# - Pins por dono (ex.: key de um job da fila): blob fixado não sai no LRU até o unpin
+
+import io, os, json, time, shutil, hashlib, sqlite3, pathlib, threading
+
+from PIL import Image
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent          # …/python
+DEFAULT_DIR = ROOT / "output" / "pexels_cache"
+DEFAULT_BUDGET_MB = int(os.getenv("PEXELS_CACHE_MB", "2048"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    photo_id    TEXT PRIMARY KEY,
+    sha256      TEXT NOT NULL,
+    url         TEXT,
+    width       INTEGER,
+    height      INTEGER,
+    bytes       INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS assets_lru ON assets(last_access);
+CREATE INDEX IF NOT EXISTS assets_sha ON assets(sha256);
+CREATE TABLE IF NOT EXISTS searches (
+    query       TEXT NOT NULL,
+    orientation TEXT NOT NULL,
+    per_page    INTEGER NOT NULL,
+    response    TEXT NOT NULL,
+    fetched_at  REAL NOT NULL,
+    PRIMARY KEY (query, orientation, per_page)
+);
+CREATE TABLE IF NOT EXISTS pins (
+    owner       TEXT NOT NULL,
+    sha256      TEXT NOT NULL,
+    PRIMARY KEY (owner, sha256)
+);
+CREATE INDEX IF NOT EXISTS pins_sha ON pins(sha256);
+"""
+
+class AssetStore:
+    def __init__(self, root=DEFAULT_DIR, budget_mb=DEFAULT_BUDGET_MB):
+        self.root = pathlib.Path(root)
+        self.budget = int(budget_mb) * 1024 * 1024
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = self._open()
+        self._migrate_legacy()
+
+    def _open(self):
+        db = sqlite3.connect(str(self.root / "index.sqlite"), timeout=30, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript(_SCHEMA)
+        return db
+
+    def _blob(self, sha):
+        return self.root / "objects" / sha[:2] / f"{sha}.jpg"
+
+    def _write_blob(self, sha, data):
+        path = self._blob(sha)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        return path
+
+    def _drop_blob_if_unused_locked(self, sha):
+        """Apaga o blob quando nenhum photo_id aponta mais para ele e nenhum dono o fixou."""
+        if self._pinned_locked(sha):
+            return False
+        if not self._db.execute("SELECT 1 FROM assets WHERE sha256 = ? LIMIT 1", (sha,)).fetchone():
+            self._blob(sha).unlink(missing_ok=True)
+            return True
+        return False
+
+    def _pinned_locked(self, sha):
+        return self._db.execute("SELECT 1 FROM pins WHERE sha256 = ? LIMIT 1", (sha,)).fetchone() is not None
+
+    def _migrate_legacy(self):
+        """Cache antigo (pexels_<id>.jpg na raiz): entra no índice com o mtime como
+        último acesso (primeiro a sair no LRU); arquivo ilegível é apagado."""
+        legacy = list(self.root.glob("pexels_*.jpg"))
+        if not legacy:
+            return
+        moved = 0
+        for f in legacy:
+            try:
+                data = f.read_bytes()
+                with Image.open(io.BytesIO(data)) as img:
+                    width, height = img.size
+                sha = hashlib.sha256(data).hexdigest()
+                self._write_blob(sha, data)
+                with self._lock:
+                    self._db.execute(
+                        "INSERT OR IGNORE INTO assets (photo_id, sha256, url, width, height, bytes, last_access) "
+                        "VALUES (?, ?, NULL, ?, ?, ?, ?)",
+                        (f.stem[len("pexels_"):], sha, width, height, len(data), f.stat().st_mtime))
+                    self._db.commit()
+                moved += 1
+            except Exception:
+                pass
+            f.unlink(missing_ok=True)
+        with self._lock:
+            self._evict_locked()
+        print(f"[assets] cache antigo: {moved}/{len(legacy)} imagem(ns) indexada(s)")
+
+    def get(self, photo_id):
+        """Caminho local da foto (atualiza o LRU) ou None se não estiver no armazém."""
+        with self._lock:
+            row = self._db.execute("SELECT sha256 FROM assets WHERE photo_id = ?", (str(photo_id),)).fetchone()
+            if not row:
+                return None
+            path = self._blob(row[0])
+            if not path.exists():
+                # índice órfão (arquivo apagado por fora): esquece a entrada
+                self._db.execute("DELETE FROM assets WHERE photo_id = ?", (str(photo_id),))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE assets SET last_access = ? WHERE photo_id = ?", (time.time(), str(photo_id)))
+            self._db.commit()
+            return str(path)
+
+    def put(self, photo_id, data, url=None, width=None, height=None):
+        """Grava os bytes (atômico), indexa e aplica o orçamento. Retorna o caminho."""
+        sha = hashlib.sha256(data).hexdigest()
+        path = self._write_blob(sha, data)
+        with self._lock:
+            old = self._db.execute("SELECT sha256 FROM assets WHERE photo_id = ?", (str(photo_id),)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO assets (photo_id, sha256, url, width, height, bytes, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (str(photo_id), sha, url, width, height, len(data), time.time()),
+            )
+            self._db.commit()
+            # conteúdo novo para o mesmo photo_id: o blob antigo não conta mais no orçamento
+            if old and old[0] != sha:
+                self._drop_blob_if_unused_locked(old[0])
+            self._evict_locked(keep=sha)
+        return str(path)
+
+    def size(self):
+        """Bytes ocupados (cada blob conta uma vez, mesmo com vários photo_id)."""
+        with self._lock:
+            return self._size_locked()
+
+    def _size_locked(self):
+        row = self._db.execute("SELECT COALESCE(SUM(b), 0) FROM (SELECT MAX(bytes) AS b FROM assets GROUP BY sha256)").fetchone()
+        return row[0]
+
+    def evict(self, budget=None):
+        with self._lock:
+            return self._evict_locked(budget=budget)
+
+    def _evict_locked(self, budget=None, keep=None):
+        budget = self.budget if budget is None else budget
+        total = self._size_locked()
+        removed = 0
+        if total <= budget:
+            return removed
+        for photo_id, sha, nbytes in self._db.execute(
+            "SELECT photo_id, sha256, bytes FROM assets ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= budget:
+                break
+            if sha == keep or self._pinned_locked(sha):
+                continue
+            self._db.execute("DELETE FROM assets WHERE photo_id = ?", (photo_id,))
+            # o blob só sai quando nenhum outro photo_id aponta para ele
+            if self._drop_blob_if_unused_locked(sha):
+                total -= nbytes
+            removed += 1
+        self._db.commit()
+        if removed:
+            print(f"[assets] LRU: {removed} entrada(s) removida(s), {total / 1e6:.0f} MB em uso")
+        return removed
+
+    def pin(self, owner, paths):
+        """Fixa os blobs de `paths` (caminhos devolvidos por get/put) para `owner`.
+        Caminhos fora do armazém são ignorados. Idempotente."""
+        objects = (self.root / "objects").resolve()
+        shas = [pathlib.Path(p).stem for p in paths
+                if pathlib.Path(p).resolve().parent.parent == objects]
+        with self._lock:
+            self._db.executemany("INSERT OR IGNORE INTO pins (owner, sha256) VALUES (?, ?)",
+                                 [(str(owner), sha) for sha in shas])
+            self._db.commit()
+        return len(shas)
+
+    def unpin(self, owner):
+        """Solta os pins de `owner`; blobs que ficaram sem referência saem agora."""
+        with self._lock:
+            shas = [r[0] for r in self._db.execute("SELECT sha256 FROM pins WHERE owner = ?", (str(owner),))]
+            self._db.execute("DELETE FROM pins WHERE owner = ?", (str(owner),))
+            for sha in shas:
+                self._drop_blob_if_unused_locked(sha)
+            self._evict_locked()
+            self._db.commit()
+
+    def release_pins(self, keep):
+        """Solta os pins de todo dono com keep(owner) falso (ex.: jobs que não estão mais na fila)."""
+        with self._lock:
+            owners = [r[0] for r in self._db.execute("SELECT DISTINCT owner FROM pins")]
+        stale = [o for o in owners if not keep(o)]
+        for owner in stale:
+            self.unpin(owner)
+        return len(stale)
+
+    def search_get(self, query, orientation, per_page, ttl=None):
+        """Fotos gravadas para a busca; None se ausente ou mais velha que ttl (s).
+        ttl=None ignora a idade (modo replay)."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response, fetched_at FROM searches WHERE query = ? AND orientation = ? AND per_page = ?",
+                (query, orientation or "", int(per_page)),
+            ).fetchone()
+        if not row or (ttl is not None and time.time() - row[1] > ttl):
+            return None
+        return json.loads(row[0])
+
+    def search_put(self, query, orientation, per_page, photos):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO searches (query, orientation, per_page, response, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (query, orientation or "", int(per_page), json.dumps(photos), time.time()),
+            )
+            self._db.commit()
+
+    def clear(self):
+        """Apaga tudo (imagens e índice)."""
+        with self._lock:
+            self._db.close()
+            shutil.rmtree(self.root, ignore_errors=True)
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._db = self._open()
+
+_store = None
+_store_lock = threading.Lock()
+
+def default_store():
+    """Instância única por processo (PEXELS_CACHE_DIR / PEXELS_CACHE_MB)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AssetStore(os.getenv("PEXELS_CACHE_DIR", str(DEFAULT_DIR)))
+        return _store
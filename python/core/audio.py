@@ -0,0 +1,247 @@
+# python/core/audio.py
+# Áudio em PCM/NumPy do TTS até o mux final
+# - Amostras float32 com shape (n, canais), valores em [-1, 1]
+# - Polly entrega PCM 16-bit mono (16 kHz, maior taxa PCM do Polly)
+# - Mixagem em 44.1 kHz; arquivos intermediários em WAV (sem perda)
+# - A única codificação com perda é o AAC no mux final (core.render)
+# - Timeline: montagem por offset num único buffer pré-alocado (custo linear)
+# - Ducking sidechain: envelope RMS da voz -> curva de ganho na música, em blocos
+# - VAD por energia + cruzamentos por zero: onde cada fala começa e termina
+
+import subprocess, wave
+import numpy as np
+
+from core.render import ffmpeg_binary
+
+PCM_RATE = 16000
+MIX_RATE = 44100
+
+def from_pcm16(data, channels=1):
+    """Bytes PCM s16le -> float32 (n, canais)."""
+    x = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+    return x.reshape(-1, channels)
+
+def to_pcm16(x):
+    return (np.clip(x, -1.0, 1.0) * 32767.0).round().astype("<i2").tobytes()
+
+def silence(secs, sr=PCM_RATE, channels=1):
+    return np.zeros((int(round(secs * sr)), channels), dtype=np.float32)
+
+def duration(x, sr):
+    return len(x) / float(sr)
+
+def resample(x, sr_from, sr_to):
+    """Reamostragem linear por canal (suficiente para voz 16k -> 44.1k)."""
+    if sr_from == sr_to or len(x) == 0:
+        return x
+    n_out = int(round(len(x) * sr_to / sr_from))
+    t_out = np.arange(n_out) * (sr_from / sr_to)
+    t_in = np.arange(len(x))
+    return np.stack([np.interp(t_out, t_in, x[:, c]) for c in range(x.shape[1])], axis=1).astype(np.float32)
+
+def fit(x, n):
+    """Corta ou completa com silêncio até n amostras."""
+    if len(x) >= n:
+        return x[:n]
+    return np.concatenate([x, np.zeros((n - len(x), x.shape[1]), dtype=np.float32)])
+
+def loop(x, n):
+    """Repete x até n amostras, escrevendo por offset num buffer único."""
+    out = np.zeros((n, x.shape[1]), dtype=np.float32)
+    if len(x) == 0:
+        return out
+    for off in range(0, n, len(x)):
+        k = min(len(x), n - off)
+        out[off:off + k] = x[:k]
+    return out
+
+class Timeline:
+    """Trechos e pausas enfileirados; render() aloca a saída uma vez só.
+
+    append()/pause() devolvem o offset (em amostras) onde o trecho começa.
+    """
+    def __init__(self, sr, channels=1):
+        self.sr = sr
+        self.channels = channels
+        self.length = 0
+        self._items = []  # (offset, array)
+
+    def append(self, x):
+        off = self.length
+        if len(x):
+            self._items.append((off, x))
+        self.length += len(x)
+        return off
+
+    def pause(self, secs):
+        off = self.length
+        self.length += int(round(secs * self.sr))
+        return off
+
+    def pad_to(self, secs):
+        """Completa com silêncio até secs (não corta)."""
+        self.length = max(self.length, int(round(secs * self.sr)))
+
+    def duration(self):
+        return self.length / float(self.sr)
+
+    def render(self):
+        out = np.zeros((self.length, self.channels), dtype=np.float32)
+        for off, x in self._items:
+            out[off:off + len(x)] = x  # mono espalha por broadcast
+        return out
+
+def _frames(x, hop):
+    mono = x.mean(axis=1) if x.shape[1] > 1 else x[:, 0]
+    n = -(-len(mono) // hop) * hop
+    frames = np.zeros(n, dtype=np.float32)
+    frames[:len(mono)] = mono
+    return frames.reshape(-1, hop)
+
+def rms_envelope(x, hop):
+    """RMS por quadro de `hop` amostras (canais somados em mono); último quadro parcial incluso."""
+    frames = _frames(x, hop)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+def voice_activity(x, sr, hop_ms=10.0, floor_db=-50.0, rel_db=-35.0, zcr_min=0.25):
+    """Um bool por quadro de hop_ms: há fala?
+
+    Fala = energia acima do limiar (rel_db abaixo do quadro mais forte, nunca
+    abaixo de floor_db) ou, até 15 dB abaixo dele, muitos cruzamentos por zero
+    (fricativas como "s"/"f", fracas mas ruidosas).
+    """
+    hop = max(1, int(sr * hop_ms / 1000))
+    frames = _frames(x, hop)
+    e_db = 20 * np.log10(np.sqrt(np.mean(frames * frames, axis=1)) + 1e-9)
+    zcr = np.mean(np.signbit(frames[:, 1:]) != np.signbit(frames[:, :-1]), axis=1)
+    thr = max(floor_db, (e_db.max() if len(e_db) else floor_db) + rel_db)
+    return (e_db > thr) | ((e_db > thr - 15.0) & (zcr > zcr_min))
+
+def speech_spans(x, sr, n, min_pause_ms=200.0, hop_ms=10.0, near=None, max_dist=0.5):
+    """Divide o áudio em n falas pelas pausas internas.
+
+    near: inícios esperados (s) das falas 2..n (ex.: offsets da Timeline); cada fronteira
+    fica na pausa mais próxima do seu ponto (até max_dist s). Sem near, usa as n-1
+    pausas mais longas, o que falha se o TTS pausar mais dentro de uma fala que entre elas.
+    Retorna [(início, fim)] em segundos (só a parte com voz de cada fala),
+    ou None se a VAD não achar pausas suficientes.
+    """
+    active = voice_activity(x, sr, hop_ms=hop_ms)
+    sec = max(1, int(sr * hop_ms / 1000)) / float(sr)  # duração de um quadro
+    idx = np.flatnonzero(active)
+    if n < 1 or len(idx) == 0:
+        return None
+    first, last = idx[0], idx[-1] + 1
+
+    # trechos de silêncio como (início, fim) em quadros, numa passada por np.diff
+    edges = np.diff(np.concatenate([[0], (~active[first:last]).astype(np.int8), [0]]))
+    gap_start = np.flatnonzero(edges == 1) + first
+    gap_end = np.flatnonzero(edges == -1) + first
+    keep = (gap_end - gap_start) * sec * 1000 >= min_pause_ms
+    gap_start, gap_end = gap_start[keep], gap_end[keep]
+    if len(gap_start) < n - 1:
+        return None
+
+    if near is not None:
+        chosen = _nearest_gaps(gap_start, gap_end, [t / sec for t in near], max_dist / sec)
+        if chosen is None:
+            return None
+    else:
+        # as n-1 mais longas, de volta à ordem temporal
+        chosen = np.sort(np.argsort(gap_start - gap_end, kind="stable")[:n - 1])
+    starts = np.concatenate([[first], gap_end[chosen]])
+    ends = np.concatenate([gap_start[chosen], [last]])
+    return [(float(a) * sec, min(float(b) * sec, duration(x, sr))) for a, b in zip(starts, ends)]
+
+def _nearest_gaps(gap_start, gap_end, points, max_dist):
+    """Índice da pausa mais próxima de cada ponto (quadros), em ordem e sem repetir; None se longe demais."""
+    chosen, lo = [], 0
+    for t in points:
+        dist = np.maximum(0, np.maximum(gap_start[lo:] - t, t - gap_end[lo:]))
+        if dist.size == 0 or dist.min() > max_dist:
+            return None
+        k = lo + int(np.argmin(dist))
+        chosen.append(k)
+        lo = k + 1
+    return np.asarray(chosen, dtype=np.intp)
+
+def sidechain_duck(music, voice, sr, depth_db=-12.0, threshold_db=-40.0, knee_db=6.0,
+                   attack_ms=15.0, release_ms=300.0, hop_ms=10.0, chunk_secs=30.0):
+    """Abaixa a música só onde há voz.
+
+    - envelope RMS da voz por quadro (hop_ms), janelado em bloco pelo NumPy
+    - acima de threshold_db a música desce até depth_db (joelho de knee_db)
+    - ataque/soltura exponenciais na taxa de quadros; ganho interpolado por amostra
+    - processa chunk_secs por vez (memória limitada), levando o estado entre blocos
+    """
+    hop = max(1, int(sr * hop_ms / 1000))
+    chunk = max(1, int(sr * chunk_secs) // hop) * hop
+    a_att = np.exp(-hop_ms / max(attack_ms, 1e-3))
+    a_rel = np.exp(-hop_ms / max(release_ms, 1e-3))
+    duck = 10 ** (depth_db / 20.0)
+
+    out = np.empty_like(music)
+    g = 1.0
+    for start in range(0, len(music), chunk):
+        m = music[start:start + chunk]
+        v = voice[start:start + len(m)]
+        if len(v) < len(m):
+            v = fit(v, len(m)) if len(v) else np.zeros((len(m), 1), dtype=np.float32)
+
+        env_db = 20 * np.log10(rms_envelope(v, hop) + 1e-9)
+        target = np.interp(env_db, [threshold_db - knee_db, threshold_db], [1.0, duck])
+
+        # suavização recursiva só na taxa de quadros (~100/s)
+        g0 = g
+        gains = np.empty_like(target)
+        for i, t in enumerate(target):
+            a = a_att if t < g else a_rel
+            g = t + a * (g - t)
+            gains[i] = g
+
+        # ganho por amostra: interpolação linear entre os fins de quadro
+        ends = np.minimum(np.arange(1, len(gains) + 1) * hop, len(m))
+        curve = np.interp(np.arange(1, len(m) + 1), np.concatenate([[0], ends]), np.concatenate([[g0], gains]))
+        out[start:start + len(m)] = m * curve[:, None].astype(np.float32)
+    return out
+
+def decode_file(path, sr=MIX_RATE, channels=2):
+    """Decodifica qualquer arquivo de áudio via ffmpeg direto para float32 (uma vez)."""
+    cmd = [ffmpeg_binary(), "-loglevel", "error", "-i", str(path),
+           "-f", "f32le", "-ac", str(channels), "-ar", str(sr), "-"]
+    res = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if res.returncode != 0:
+        raise RuntimeError(f"ffmpeg falhou ao decodificar {path}: {res.stderr.decode(errors='replace')[-400:]}")
+    return np.frombuffer(res.stdout, dtype="<f4").reshape(-1, channels).copy()
+
+def from_segment(seg, sr=MIX_RATE, channels=2):
+    """pydub.AudioSegment -> float32 (n, canais) na taxa pedida."""
+    seg = seg.set_frame_rate(sr).set_channels(channels)
+    x = np.array(seg.get_array_of_samples(), dtype=np.float32)
+    x /= float(1 << (8 * seg.sample_width - 1))
+    return x.reshape(-1, channels)
+
+def write_wav(path, x, sr):
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(x.shape[1])
+        w.setsampwidth(2)
+        w.setframerate(sr)
+        w.writeframes(to_pcm16(x))
+    return str(path)
+
+def read_wav(path):
+    """WAV PCM 16-bit -> (float32 (n, canais), taxa)."""
+    with wave.open(str(path), "rb") as w:
+        if w.getsampwidth() != 2:
+            raise ValueError(f"WAV com {8 * w.getsampwidth()} bits não suportado: {path}")
+        return from_pcm16(w.readframes(w.getnframes()), w.getnchannels()), w.getframerate()
+
+def mix(*layers):
+    """Soma camadas (n, c) — canais mono se espalham por broadcast — e limita em [-1, 1]."""
+    n = max(len(x) for x in layers)
+    ch = max(x.shape[1] for x in layers)
+    out = np.zeros((n, ch), dtype=np.float32)
+    for x in layers:
+        out[:len(x)] += x
+    np.clip(out, -1.0, 1.0, out=out)
+    return out
@@ -0,0 +1,108 @@
+# python/core/audio_cache.py
+# Cache em disco do áudio sintetizado (Polly), endereçado por conteúdo
+# - Chave: SHA-256 de (SSML normalizado, voz, engine, rate, formato)
+# - Arquivos em output/tts_cache/ab/<chave>.<formato>; LRU pelo mtime
+# - Orçamento de disco (TTS_CACHE_MB) e contadores de acerto/erro
+
+import os, re, json, hashlib, pathlib, threading, unicodedata
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent          # …/python
+DEFAULT_DIR = ROOT / "output" / "tts_cache"
+DEFAULT_BUDGET_MB = int(os.getenv("TTS_CACHE_MB", "512"))
+
+def normalize_ssml(ssml):
+    """Mesma fala => mesma chave: NFC, espaços colapsados, aspas padronizadas."""
+    s = unicodedata.normalize("NFC", ssml).strip()
+    s = re.sub(r"\s+", " ", s)
+    s = re.sub(r">\s+", ">", s)
+    s = re.sub(r"\s+<", "<", s)
+    return s.replace('"', "'")
+
+class AudioCache:
+    def __init__(self, root=DEFAULT_DIR, budget_mb=DEFAULT_BUDGET_MB):
+        self.root = pathlib.Path(root)
+        self.budget = int(budget_mb) * 1024 * 1024
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._size = None  # calculado na primeira gravação
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(ssml, voice, engine, rate, fmt):
+        payload = json.dumps([normalize_ssml(ssml), voice, engine, rate, fmt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key, fmt):
+        return self.root / key[:2] / f"{key}.{fmt}"
+
+    def get(self, key, fmt):
+        path = self._path(key, fmt)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        os.utime(path)  # LRU: acesso recente
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key, fmt, data):
+        path = self._path(key, fmt)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        with self._lock:
+            if self._size is None:
+                self._size = sum(f.stat().st_size for f in self._files())
+            else:
+                self._size += len(data)
+            if self._size > self.budget:
+                self._evict_locked()
+
+    def _files(self):
+        return [f for f in self.root.glob("*/*") if not f.name.endswith(".tmp")]
+
+    def _evict_locked(self):
+        files = sorted(self._files(), key=lambda f: f.stat().st_mtime)
+        total = sum(f.stat().st_size for f in files)
+        removed = 0
+        # desce até 90% do orçamento para não despejar a cada gravação
+        for f in files:
+            if total <= self.budget * 0.9:
+                break
+            total -= f.stat().st_size
+            f.unlink(missing_ok=True)
+            removed += 1
+        self._size = total
+        if removed:
+            print(f"[tts-cache] LRU: {removed} arquivo(s) removido(s), {total / 1e6:.0f} MB em uso")
+
+    def fetch(self, ssml, voice, engine, rate, fmt, synth):
+        """Áudio do cache ou, se ausente, synth() gravado no cache."""
+        key = self.key(ssml, voice, engine, rate, fmt)
+        data = self.get(key, fmt)
+        if data is None:
+            data = synth()
+            self.put(key, fmt, data)
+        return data
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses,
+                    "hit_rate": (self.hits / total) if total else 0.0}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def default_cache():
+    """Instância única por processo (TTS_CACHE_DIR / TTS_CACHE_MB)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AudioCache(os.getenv("TTS_CACHE_DIR", str(DEFAULT_DIR)))
+        return _cache
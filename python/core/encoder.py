@@ -0,0 +1,100 @@
+# python/core/encoder.py
+# Perfil do x264 por host (preset, CRF, tune, threads), medido por bench_encoder.py
+# - Dois tipos de conteúdo: "motion" (Ken Burns, core.render/video_v2/assemble) e
+#   "still" (slideshow de quadros parados, render_stills/video.py)
+# - output/encoder_profile.json (ENCODER_PROFILE): um perfil por assinatura de hardware
+#   (arquitetura, núcleos, modelo da CPU), então runners efêmeros iguais reaproveitam a medição
+# - Sem perfil para o host: mesmos parâmetros de antes (medium, CRF padrão do x264, 4 threads)
+# - threads/preset passados explicitamente (ex.: orçamento de CPU do main.py) têm prioridade
+
+import os, json, time, socket, platform, pathlib, threading
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent          # …/python
+DEFAULT_PATH = ROOT / "output" / "encoder_profile.json"
+
+DEFAULTS = {
+    "motion": {"preset": "medium", "crf": None, "tune": None, "threads": 4},
+    "still":  {"preset": "medium", "crf": None, "tune": "stillimage", "threads": 4},
+}
+
+def profile_path():
+    return pathlib.Path(os.getenv("ENCODER_PROFILE", str(DEFAULT_PATH)))
+
+def _cpu_model():
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or "cpu"
+
+def host_id():
+    """Assinatura do hardware (não o hostname: runners de CI mudam de nome a cada execução)."""
+    return f"{platform.machine()}-{os.cpu_count() or 1}c-{_cpu_model()}"
+
+_profile = None
+_profile_lock = threading.Lock()
+
+def _read_all():
+    try:
+        return json.loads(profile_path().read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+def load_profile():
+    """{tipo: parâmetros} medidos para este host ({} se não houver), lido uma vez por processo."""
+    global _profile
+    with _profile_lock:
+        if _profile is None:
+            entry = _read_all().get("hosts", {}).get(host_id(), {})
+            _profile = entry.get("profiles", {})
+        return _profile
+
+def save_profile(profiles, results=None):
+    """Grava os perfis deste host (mantém os dos outros) e recarrega no processo."""
+    global _profile
+    path = profile_path()
+    data = _read_all()
+    data.setdefault("hosts", {})[host_id()] = {
+        "profiles": profiles,
+        "measured_on": socket.gethostname(),
+        "at": time.time(),
+        "results": results or {},
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+    with _profile_lock:
+        _profile = dict(profiles)
+    return path
+
+def settings(kind, threads=None, preset=None):
+    """Parâmetros efetivos: padrão < perfil do host < argumentos explícitos."""
+    out = dict(DEFAULTS[kind])
+    out.update({k: v for k, v in load_profile().get(kind, {}).items() if k in out})
+    if threads:
+        out["threads"] = threads
+    if preset:
+        out["preset"] = preset
+    return out
+
+def _extra(s):
+    args = []
+    if s["crf"] is not None:
+        args += ["-crf", str(s["crf"])]
+    if s["tune"]:
+        args += ["-tune", s["tune"]]
+    return args
+
+def x264_args(kind, threads=None, preset=None):
+    """Argumentos do libx264 para a linha de comando do ffmpeg."""
+    s = settings(kind, threads, preset)
+    return ["-c:v", "libx264", "-preset", s["preset"], *_extra(s), "-threads", str(s["threads"])]
+
+def moviepy_kwargs(kind, threads=None):
+    """preset/threads/ffmpeg_params para write_videofile (codec libx264)."""
+    s = settings(kind, threads)
+    return {"preset": s["preset"], "threads": s["threads"], "ffmpeg_params": _extra(s)}
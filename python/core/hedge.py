@@ -0,0 +1,143 @@
+# python/core/hedge.py
+# Requisições "hedged" entre dois providers de LLM (ex.: Bedrock -> OpenAI)
+# - Dispara o primário; se não houver resposta válida até o prazo, dispara o secundário
+# - Prazo = percentil HEDGE_PERCENTILE da latência histórica do primário (HEDGE_DEADLINE até ter amostras)
+# - Fica com a primeira resposta aceita; a perdedora é cancelada se ainda não começou,
+#   senão termina em segundo plano e é descartada
+# - Histogramas de latência por provider em output/llm_latency.json
+
+import os, json, math, time, pathlib, threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent          # …/python
+DEFAULT_PATH = ROOT / "output" / "llm_latency.json"
+
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "90"))
+HEDGE_DEADLINE = float(os.getenv("HEDGE_DEADLINE", "10"))  # s, sem histórico suficiente
+MIN_SAMPLES = 10
+KEEP_SAMPLES = 256
+
+# Limites superiores (s) das faixas do histograma
+BUCKETS = (0.5, 1, 2, 4, 8, 15, 30, 60, math.inf)
+
+class LatencyStats:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = pathlib.Path(path) if path else None
+        self._lock = threading.Lock()
+        self._data = {}  # provider -> {"counts": [...], "errors": n, "samples": [...]}
+        if self.path and self.path.exists():
+            try:
+                self._data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._data = {}
+
+    def _entry(self, provider):
+        return self._data.setdefault(provider, {"counts": [0] * len(BUCKETS), "errors": 0, "samples": []})
+
+    def record(self, provider, secs, ok=True):
+        with self._lock:
+            e = self._entry(provider)
+            if ok:
+                e["counts"][next(i for i, b in enumerate(BUCKETS) if secs <= b)] += 1
+                e["samples"] = (e["samples"] + [round(secs, 3)])[-KEEP_SAMPLES:]
+            else:
+                e["errors"] += 1
+            self._save_locked()
+
+    def _save_locked(self):
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self._data), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def percentile(self, provider, p):
+        """Percentil p (0–100) das latências recentes com sucesso, ou None sem amostras suficientes."""
+        with self._lock:
+            samples = sorted(self._data.get(provider, {}).get("samples", []))
+        if len(samples) < MIN_SAMPLES:
+            return None
+        k = min(len(samples) - 1, max(0, math.ceil(p / 100.0 * len(samples)) - 1))
+        return samples[k]
+
+    def deadline(self, provider, p=None):
+        q = self.percentile(provider, HEDGE_PERCENTILE if p is None else p)
+        return HEDGE_DEADLINE if q is None else q
+
+    def report(self):
+        """Tabela por provider: amostras, erros, p50/p90/p99 e histograma."""
+        lines = []
+        with self._lock:
+            providers = sorted(self._data)
+        for name in providers:
+            e = self._data[name]
+            n = sum(e["counts"])
+            pct = [self.percentile(name, p) for p in (50, 90, 99)]
+            fmt = lambda v: "   -  " if v is None else f"{v:5.1f}s"
+            lines.append(f"  {name:<10} n={n:<4} erros={e['errors']:<3} "
+                         f"p50={fmt(pct[0])} p90={fmt(pct[1])} p99={fmt(pct[2])}")
+            top = max(e["counts"]) or 1
+            for b, c in zip(BUCKETS, e["counts"]):
+                label = "   >60s" if b == math.inf else f"<={b:>4g}s"
+                lines.append(f"    {label} {'#' * round(20 * c / top):<20} {c}")
+        return "\n".join(lines)
+
+def hedged_call(primary, secondary, accept, deadline, stats=None, verbose=True):
+    """Executa primary=(nome, fn); se até `deadline` s não houver resposta aceita,
+    dispara também secondary=(nome, fn) (pode ser None).
+
+    accept(resultado) devolve o valor final ou levanta/devolve None se inválido.
+    Retorna (nome_vencedor, valor). Se ninguém produzir resposta válida, levanta o último erro.
+    """
+    stats = stats or default_stats()
+    pool = ThreadPoolExecutor(max_workers=2)
+
+    def timed(name, fn):
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            out = fn()
+            ok = True
+            return out
+        finally:
+            stats.record(name, time.perf_counter() - t0, ok)
+
+    futures = {pool.submit(timed, *primary): primary[0]}
+    hedged = secondary is None
+    last_err = None
+    try:
+        done, _ = wait(futures, timeout=deadline)
+        while True:
+            for fut in done:
+                name = futures.pop(fut)
+                try:
+                    value = accept(fut.result())
+                except Exception as e:
+                    last_err, value = e, None
+                if value is not None:
+                    return name, value
+                last_err = last_err or ValueError(f"resposta inválida de {name}")
+            if not hedged:
+                # prazo estourado (ou primário falhou): entra o secundário
+                if verbose:
+                    print(f"[hedge] {primary[0]} sem resposta válida em {deadline:.1f}s; disparando {secondary[0]}")
+                futures[pool.submit(timed, *secondary)] = secondary[0]
+                hedged = True
+            if not futures:
+                break
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    raise last_err or RuntimeError("nenhum provider respondeu")
+
+_stats = None
+_stats_lock = threading.Lock()
+
+def default_stats():
+    """Instância única por processo (LLM_LATENCY_PATH)."""
+    global _stats
+    with _stats_lock:
+        if _stats is None:
+            _stats = LatencyStats(os.getenv("LLM_LATENCY_PATH", str(DEFAULT_PATH)))
+        return _stats
@@ -0,0 +1,74 @@
+# python/core/manifest.py
+# Manifesto de estágios do main_daily (build incremental / retomada)
+# - output/<data>/manifest.json: por estágio, hash das entradas, hash de cada saída e dados
+# - Estágio pulado se as entradas têm o mesmo hash e as saídas existem inalteradas
+# - Estágio refeito => saídas novas => entradas dos seguintes mudam => refeitos também
+# - Resultado degradado (fallback após falha transitória) não é gravado: refeito na próxima execução
+
+import os, json, time, hashlib, pathlib, threading
+
+def file_hash(path):
+    """SHA-256 do conteúdo (lido em blocos de 1 MB)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def inputs_hash(inputs):
+    payload = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class Manifest:
+    def __init__(self, out_dir):
+        self.path = pathlib.Path(out_dir) / "manifest.json"
+        self._lock = threading.Lock()
+        try:
+            self._stages = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self._stages = {}
+
+    def lookup(self, name, inputs):
+        """Dados gravados do estágio se estiver em dia; None se precisa refazer."""
+        with self._lock:
+            entry = self._stages.get(name)
+        if not entry or entry.get("inputs") != inputs_hash(inputs):
+            return None
+        for path, sha in entry.get("outputs", {}).items():
+            try:
+                if file_hash(path) != sha:
+                    return None
+            except OSError:
+                return None
+        return entry.get("data")
+
+    def record(self, name, inputs, data, outputs=()):
+        entry = {
+            "inputs": inputs_hash(inputs),
+            "outputs": {str(p): file_hash(p) for p in outputs},
+            "data": data,
+            "at": time.time(),
+        }
+        with self._lock:
+            self._stages[name] = entry
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(self._stages, ensure_ascii=False, indent=2), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+    def stage(self, name, inputs, fn, degraded=None):
+        """Resultado do estágio: do manifesto se em dia; senão fn() -> (dados, [saídas]) e grava.
+
+        degraded() verdadeiro após fn() => resultado usado nesta execução, mas não gravado.
+        """
+        data = self.lookup(name, inputs)
+        if data is not None:
+            print(f"[manifest] {name}: em dia, pulando")
+            return data
+        print(f"[manifest] {name}: executando")
+        data, outputs = fn()
+        if degraded and degraded():
+            print(f"[manifest] {name}: resultado de reserva, não gravado (refaz na próxima execução)")
+            return data
+        self.record(name, inputs, data, outputs)
+        return data
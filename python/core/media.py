@@ -1,20 +1,38 @@
 # core/media.py
-import os, requests, pathlib, random
+import io, os, random
 
-PEXELS_URL = "https://api.pexels.com/v1/search"
+from PIL import Image
 
-def fetch_broll(query, n=6, base_dir="python/output/tmp"):
+from core import pexels
+from core.assets import default_store
+
+PEXELS_URL = pexels.SEARCH_URL
+
+def fetch_broll(query, n=6, base_dir=None):
+    """Retorna caminhos de n imagens no armazém compartilhado (core.assets).
+    base_dir mantido por compatibilidade: as imagens não são mais copiadas por dia."""
     key = os.getenv("PEXELS_KEY")
-    pathlib.Path(base_dir).mkdir(parents=True, exist_ok=True)
-    r = requests.get(PEXELS_URL, headers={"Authorization": key}, params={"query": query, "per_page": n*2})
-    r.raise_for_status()
-    items = r.json().get("photos", [])
-    random.shuffle(items)
-    paths = []
-    for i, p in enumerate(items[:n]):
-        src = p["src"].get("large2x") or p["src"].get("original")
-        img = requests.get(src, timeout=30).content
-        fp = pathlib.Path(base_dir) / f"img_{i}.jpg"
-        fp.write_bytes(img)
-        paths.append(str(fp))
-    return paths
+    store = default_store()
+    items = pexels.search(query, per_page=n*2, key=key)
+    # em replay a escolha é determinística (mesma busca -> mesmas imagens)
+    rng = random.Random(query) if pexels.replay_mode() else random
+    rng.shuffle(items)
+    picked = items[:n]
+
+    paths = [store.get(p.get("id")) if p.get("id") is not None else None for p in picked]
+    missing = [i for i, path in enumerate(paths) if not path]
+    # downloads concorrentes, na menor renderização que cobre 1080x1920 + zoom
+    urls = [pexels.best_src(picked[i]) for i in missing]
+    for i, url, (img, err) in zip(missing, urls, pexels.download_many(urls)):
+        if err is not None:
+            print(f"[broll] falha no download: {err}")
+            continue
+        p = picked[i]
+        try:
+            with Image.open(io.BytesIO(img)) as im:  # só o cabeçalho: tamanho da renderização baixada
+                size = im.size
+        except Exception as e:
+            print(f"[broll] imagem inválida: {e}")
+            continue
+        paths[i] = store.put(p.get("id", url), img, url=url, width=size[0], height=size[1])
+    return [p for p in paths if p]
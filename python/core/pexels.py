@@ -0,0 +1,171 @@
+# python/core/pexels.py
+# Cliente Pexels compartilhado (media.py e core/media.py)
+# - Sessão HTTP única com keep-alive e pool de conexões
+# - Retry com backoff exponencial (5xx); 429 fica com core.ratelimit (pausa o serviço inteiro)
+# - Escolhe a menor renderização que ainda cobre 1080x1920 + margem do zoom
+# - Downloads concorrentes com número limitado de workers
+# - Buscas em cache com TTL (PEXELS_SEARCH_TTL) e modo replay offline (PEXELS_REPLAY=1)
+
+import os, math, time, threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs, urlencode, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from core import ratelimit
+from core.assets import default_store
+
+SEARCH_URL = "https://api.pexels.com/v1/search"
+
+# Quadro final e margem do Ken Burns (zoom 1.05)
+TARGET_W, TARGET_H = 1080, 1920
+ZOOM_MARGIN = 1.05
+
+WORKERS = int(os.getenv("PEXELS_WORKERS", "6"))
+SEARCH_TTL = int(os.getenv("PEXELS_SEARCH_TTL", str(24 * 3600)))
+
+def replay_mode():
+    """PEXELS_REPLAY=1: só respostas gravadas, nenhuma chamada de rede."""
+    return os.getenv("PEXELS_REPLAY", "").lower() in ("1", "true", "yes")
+
+_session = None
+_session_lock = threading.Lock()
+
+def session():
+    """Sessão requests compartilhada (thread-safe para GETs simples)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=4,
+                backoff_factor=0.5,  # 0.5s, 1s, 2s, 4s
+                status_forcelist=(500, 502, 503, 504),
+                allowed_methods=frozenset({"GET"}),
+                respect_retry_after_header=True,
+            )
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(4, WORKERS * 2), max_retries=retry)
+            s = requests.Session()
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _session = s
+        return _session
+
+def search(query, per_page, orientation=None, key=None, timeout=10, ttl=None):
+    """Lista de fotos de /v1/search, servida do cache quando ainda válida.
+
+    Toda resposta da rede é gravada; em replay_mode() só o que foi gravado é
+    servido (sem olhar a idade) e uma busca nunca gravada gera erro.
+    """
+    store = default_store()
+    ttl = SEARCH_TTL if ttl is None else ttl
+
+    if replay_mode():
+        photos = store.search_get(query, orientation, per_page, ttl=None)
+        if photos is None:
+            raise RuntimeError(f"[pexels] replay: busca não gravada: {query!r}")
+        return photos
+
+    photos = store.search_get(query, orientation, per_page, ttl=ttl)
+    if photos is not None:
+        print(f"  [pexels] busca em cache: '{query}'")
+        return photos
+
+    params = {"query": query, "per_page": per_page}
+    if orientation:
+        params["orientation"] = orientation
+
+    def _get():
+        r = session().get(SEARCH_URL, headers={"Authorization": key or os.getenv("PEXELS_KEY")},
+                          params=params, timeout=timeout)
+        r.raise_for_status()
+        return r
+
+    photos = ratelimit.call("pexels", _get).json().get("photos", [])
+    store.search_put(query, orientation, per_page, photos)
+    return photos
+
+# ======================================================================
+# Escolha da renderização
+# ======================================================================
+
+def _rendition_size(url, pw, ph):
+    """Tamanho efetivo de uma URL do CDN (parâmetros w/h/dpr/fit), ou None se recorta."""
+    q = {k: v[0] for k, v in parse_qs(urlsplit(url).query).items()}
+    if q.get("fit") == "crop":
+        return None  # muda o enquadramento em relação à foto inteira
+    dpr = float(q.get("dpr", 1))
+    w = float(q["w"]) if "w" in q else None
+    h = float(q["h"]) if "h" in q else None
+    if w is None and h is None:
+        return pw, ph
+    scale = min(x for x in (w / pw if w else None, h / ph if h else None) if x is not None)
+    scale = min(1.0, scale * dpr)
+    return pw * scale, ph * scale
+
+def best_src(photo, target=(TARGET_W, TARGET_H), margin=ZOOM_MARGIN):
+    """URL da menor renderização que cobre target*margin nos dois eixos.
+
+    Se nenhuma renderização pronta cobrir, pede ao CDN a largura exata a partir
+    do original (auto=compress); se o original for menor que o alvo, usa o original.
+    """
+    src = photo.get("src") or {}
+    pw, ph = photo.get("width"), photo.get("height")
+    if not pw or not ph:
+        return src.get("large2x") or src.get("large") or src.get("original")
+
+    tw, th = math.ceil(target[0] * margin), math.ceil(target[1] * margin)
+    best = None
+    for name, url in src.items():
+        if not url or name == "original":
+            continue
+        size = _rendition_size(url, pw, ph)
+        if size and size[0] >= tw and size[1] >= th:
+            if best is None or size[0] * size[1] < best[0]:
+                best = (size[0] * size[1], url)
+    if best:
+        return best[1]
+
+    original = src.get("original")
+    if not original:
+        return src.get("large2x") or src.get("large")
+    scale = max(tw / pw, th / ph)
+    if scale >= 1.0:
+        return original
+    parts = urlsplit(original)
+    query = urlencode({"auto": "compress", "cs": "tinysrgb", "w": math.ceil(pw * scale)})
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query, ""))
+
+# ======================================================================
+# Download concorrente
+# ======================================================================
+
+def download(url, timeout=20):
+    if replay_mode():
+        raise RuntimeError(f"[pexels] replay: imagem fora do armazém: {url}")
+
+    def _get():
+        r = session().get(url, timeout=timeout)
+        r.raise_for_status()
+        return r.content
+
+    return ratelimit.call("pexels_cdn", _get)
+
+def download_many(urls, workers=WORKERS):
+    """Baixa as URLs em paralelo; retorna [(bytes | None, erro | None)] na mesma ordem."""
+    def _one(url):
+        try:
+            return download(url), None
+        except Exception as e:
+            return None, e
+
+    if not urls:
+        return []
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(urls)))) as pool:
+        results = list(pool.map(_one, urls))
+    total = sum(len(b) for b, _ in results if b)
+    print(f"  [pexels] {sum(1 for b, _ in results if b)}/{len(urls)} baixadas, "
+          f"{total / 1e6:.1f} MB em {time.perf_counter() - t0:.1f}s")
+    return results
@@ -0,0 +1,185 @@
+# python/core/ratelimit.py
+# Limite de taxa compartilhado para as APIs externas (Pexels, SerpApi, Polly, Bedrock, OpenAI, Translate)
+# - Um token bucket por serviço: ritmo sustentado em vez de rajadas seguidas de 429
+# - Throttling (429 / ThrottlingException / TooManyRequests) => o serviço inteiro pausa
+#   (Retry-After quando houver) e o ritmo cai pela metade; volta aos poucos a cada sucesso
+# - Orçamento por execução (QUOTA_<SERVIÇO>): esgotado => QuotaExceeded sem chamar a API
+# - Ritmo por serviço: RATE_LIMIT_<SERVIÇO>="req/s[:rajada]" (ex.: RATE_LIMIT_BEDROCK=0.5:2);
+#   0 = sem limite de ritmo (throttling e orçamento continuam valendo)
+# - Os limites valem por processo; report() resume chamadas, throttles, espera e orçamento
+
+import os, time, threading
+
+# serviço -> (req/s, rajada); valores conservadores para as cotas padrão das contas
+DEFAULTS = {
+    "pexels":     (200 / 3600, 10),  # 200 buscas/hora
+    "pexels_cdn": (20.0, 20),        # downloads de imagens (CDN, fora da cota da API)
+    "serpapi":    (1.0, 3),
+    "polly":      (8.0, 8),          # TPS padrão do synthesize_speech
+    "bedrock":    (0.8, 3),          # ~50 req/min
+    "openai":     (3.0, 5),
+    "translate":  (10.0, 10),
+}
+MAX_RETRIES = int(os.getenv("RATE_LIMIT_RETRIES", "4"))
+BACKOFF_SECS = 1.0
+RECOVERY = 0.05  # fração do ritmo base recuperada a cada sucesso
+
+_THROTTLE_CODES = {
+    "Throttling", "ThrottlingException", "ThrottledException", "TooManyRequestsException",
+    "RequestLimitExceeded", "ProvisionedThroughputExceededException", "SlowDown",
+}
+
+class Throttled(RuntimeError):
+    """Throttling detectado fora de exceções HTTP (ex.: SerpApi devolve {"error": ...})."""
+    def __init__(self, msg, retry_after=None):
+        super().__init__(msg)
+        self.retry_after = retry_after
+
+class QuotaExceeded(RuntimeError):
+    pass
+
+def _retry_after(headers):
+    try:
+        return float((headers or {}).get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+def throttle_info(exc):
+    """(é throttling?, Retry-After em s ou None) para exceções de requests, botocore e google."""
+    if isinstance(exc, Throttled):
+        return True, exc.retry_after
+    resp = getattr(exc, "response", None)
+    if isinstance(resp, dict):  # botocore ClientError
+        code = resp.get("Error", {}).get("Code")
+        meta = resp.get("ResponseMetadata", {})
+        if code in _THROTTLE_CODES or meta.get("HTTPStatusCode") == 429:
+            return True, _retry_after(meta.get("HTTPHeaders"))
+        return False, None
+    if getattr(resp, "status_code", None) == 429:  # requests.HTTPError
+        return True, _retry_after(resp.headers)
+    if getattr(exc, "code", None) == 429:  # google.api_core (TooManyRequests / ResourceExhausted)
+        return True, None
+    return False, None
+
+class Limiter:
+    def __init__(self, name, rate, burst, budget=None):
+        if rate < 0 or (rate > 0 and burst < 1):
+            raise ValueError(f"[ratelimit] {name}: ritmo {rate} req/s com rajada {burst} inválido")
+        self.name = name
+        self.base_rate = float(rate)
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.budget = budget
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self.calls = self.throttled = self.errors = 0
+        self.waited = 0.0
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self):
+        """Bloqueia até haver token (e passar a pausa de throttling); conta no orçamento."""
+        t0 = time.monotonic()
+        while True:
+            with self._lock:
+                if self.budget is not None and self.calls >= self.budget:
+                    raise QuotaExceeded(f"[ratelimit] {self.name}: orçamento de {self.budget} chamada(s) esgotado")
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                elif self.base_rate and self._tokens < 1:
+                    wait = (1 - self._tokens) / self.rate
+                else:
+                    if self.base_rate:  # 0 = sem limite de ritmo
+                        self._tokens -= 1
+                    self.calls += 1
+                    self.waited += now - t0
+                    return
+            time.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.base_rate, self.rate + self.base_rate * RECOVERY)
+
+    def on_throttle(self, retry_after=None, attempt=0):
+        """Pausa o serviço e reduz o ritmo pela metade (mínimo 1/20 do base)."""
+        with self._lock:
+            self.throttled += 1
+            self._refill(time.monotonic())
+            self.rate = max(self.base_rate / 20, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            pause = retry_after if retry_after is not None else BACKOFF_SECS * 2 ** attempt
+            self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+
+    def call(self, fn, retries=MAX_RETRIES):
+        """fn() sob o limite; repete só em throttling (até `retries` vezes), outros erros sobem."""
+        for attempt in range(retries + 1):
+            self.acquire()
+            try:
+                out = fn()
+            except Exception as e:
+                throttled, retry_after = throttle_info(e)
+                if not throttled:
+                    with self._lock:
+                        self.errors += 1
+                    raise
+                self.on_throttle(retry_after, attempt)
+                print(f"[ratelimit] {self.name}: throttling (tentativa {attempt + 1}); "
+                      f"ritmo agora {self.rate:.3g} req/s")
+                if attempt == retries:
+                    raise
+                continue
+            self.on_success()
+            return out
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "throttled": self.throttled, "errors": self.errors,
+                    "waited": round(self.waited, 2), "rate": round(self.rate, 4),
+                    "base_rate": round(self.base_rate, 4), "budget": self.budget}
+
+def _from_env(name):
+    rate, burst = DEFAULTS.get(name, (5.0, 5))
+    spec = os.getenv(f"RATE_LIMIT_{name.upper()}")
+    if spec:
+        r, _, b = spec.partition(":")
+        try:
+            rate = float(r)
+            burst = float(b) if b else max(1.0, rate)
+        except ValueError:
+            raise ValueError(f"RATE_LIMIT_{name.upper()}={spec!r}: use \"req/s[:rajada]\"") from None
+        if rate < 0:
+            raise ValueError(f"RATE_LIMIT_{name.upper()}={spec!r}: ritmo negativo (0 = sem limite)")
+    budget = os.getenv(f"QUOTA_{name.upper()}")
+    return Limiter(name, rate, burst, int(budget) if budget else None)
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def limiter(name):
+    """Limiter único por serviço neste processo (configurado pelo ambiente)."""
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = _from_env(name)
+        return _limiters[name]
+
+def call(service, fn, retries=MAX_RETRIES):
+    return limiter(service).call(fn, retries)
+
+def report():
+    """Uso por serviço nesta execução: chamadas, throttles, espera no bucket e orçamento."""
+    with _limiters_lock:
+        items = sorted(_limiters.items())
+    lines = []
+    for name, lim in items:
+        s = lim.stats()
+        budget = "" if s["budget"] is None else f" orçamento={s['calls']}/{s['budget']}"
+        lines.append(f"  {name:<10} chamadas={s['calls']:<4} throttles={s['throttled']:<3} "
+                     f"erros={s['errors']:<3} espera={s['waited']:6.1f}s "
+                     f"ritmo={s['rate']:.3g}/{s['base_rate']:.3g} req/s{budget}")
+    return "\n".join(lines)
@@ -0,0 +1,274 @@
+# python/core/render.py
+# Motor de renderização em streaming (Ken Burns vetorizado)
+# - Cada imagem é decodificada/redimensionada UMA vez para NumPy (H, W, 3)
+# - Retângulos de recorte (zoom central) pré-calculados para todos os frames
+# - Reamostragem bilinear separável em ponto fixo (int16, pesos de 7 bits), em lotes, sem PIL por frame
+# - Frames RGB crus enviados direto ao stdin de um subprocesso ffmpeg
+# - Parâmetros do x264 do perfil do host (core.encoder / bench_encoder.py)
+
+import os, subprocess, pathlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+
+from core import encoder
+
+W, H = 1080, 1920
+FPS = 30
+WEIGHT_BITS = 7  # pesos 0..128: (b - a) * w não estoura int16
+
+def ffmpeg_binary():
+    """Mesmo binário que o MoviePy usa (imageio-ffmpeg); cai para o do PATH."""
+    try:
+        from moviepy.config import get_setting
+        return get_setting("FFMPEG_BINARY")
+    except Exception:
+        return os.getenv("FFMPEG_BINARY", "ffmpeg")
+
+def load_frame(path, size=(W, H), resample=Image.BICUBIC):
+    """Decodifica a imagem e redimensiona para o quadro final (uint8, H x W x 3)."""
+    img = Image.open(path).convert("RGB").resize(size, resample=resample)
+    return np.asarray(img, dtype=np.uint8)
+
+# ======================================================================
+# Geometria: retângulos de recorte por frame
+# ======================================================================
+
+def ken_burns_crops(times, dur, zoom=1.05, size=(W, H)):
+    """Retângulos (x0, y0, largura, altura) no espaço da imagem-fonte.
+
+    Equivale ao `clip.resize(lambda t: 1 + (zoom - 1) * (t / dur))` centralizado
+    pelo concatenate(method="compose"): ampliar por s e cortar W x H no centro
+    é o mesmo que recortar W/s x H/s no centro e escalar para W x H.
+    """
+    w, h = size
+    t = np.asarray(times, dtype=np.float64)
+    s = 1.0 + (zoom - 1.0) * (t / max(dur, 1e-9))
+    cw = w / s
+    ch = h / s
+    return np.stack([(w - cw) / 2.0, (h - ch) / 2.0, cw, ch], axis=1)
+
+def _axis_taps(start, length, out_len, src_len, channels=1):
+    """Índices vizinhos e pesos bilineares (ponto fixo, 7 bits) de um eixo, por frame.
+
+    Com channels=3 os índices já apontam para a fonte achatada (H, W*3).
+    """
+    # centro do pixel de saída mapeado para a fonte (convenção half-pixel)
+    pos = start[:, None] + (np.arange(out_len)[None, :] + 0.5) * (length[:, None] / out_len) - 0.5
+    pos = np.clip(pos, 0, src_len - 1)
+    i0 = np.floor(pos).astype(np.intp)
+    i1 = np.minimum(i0 + 1, src_len - 1)
+    wt = np.rint((pos - i0) * (1 << WEIGHT_BITS)).astype(np.int16)
+    if channels > 1:
+        ch = np.arange(channels)
+        i0 = (i0[:, :, None] * channels + ch).reshape(len(i0), -1)
+        i1 = (i1[:, :, None] * channels + ch).reshape(len(i1), -1)
+        wt = np.repeat(wt, channels, axis=1)
+    return i0, i1, wt
+
+def _lerp(a, b, w):
+    """a + round((b - a) * w / 128), in-place em int16 (a e b já são cópias).
+
+    |b - a| <= 255 e w <= 128: produto + arredondamento cabem em int16 (<= 32704);
+    com pesos de 8 bits (w <= 256) o produto estourava e corrompia pixels de alto contraste.
+    """
+    b -= a
+    b *= w
+    b += 1 << (WEIGHT_BITS - 1)
+    b >>= WEIGHT_BITS
+    a += b
+    return a
+
+def _sample(flat, y0, y1, wy, x0, x1, wx):
+    """Recorte+escala de UM frame: linhas primeiro (reduz volume), depois colunas."""
+    rows = _lerp(np.take(flat, y0, axis=0).astype(np.int16),
+                 np.take(flat, y1, axis=0).astype(np.int16), wy[:, None])
+    return _lerp(np.take(rows, x0, axis=1), np.take(rows, x1, axis=1), wx[None, :]).astype(np.uint8)
+
+def _sample_batch(flat, taps, size, pool=None):
+    """Lote de frames a partir da mesma fonte achatada -> (B, H, W, 3) uint8.
+
+    As operações NumPy liberam o GIL; com `pool` os frames do lote rodam em paralelo.
+    """
+    w, h = size
+    jobs = list(zip(*taps))
+    frames = pool.map(lambda t: _sample(flat, *t), jobs) if pool else (_sample(flat, *t) for t in jobs)
+    out = np.empty((len(jobs), h, w * 3), dtype=np.uint8)
+    for b, f in enumerate(frames):
+        out[b] = f
+    return out.reshape(len(jobs), h, w, 3)
+
+def _default_workers():
+    # metade dos núcleos para reamostrar, o resto fica para o x264
+    return max(1, min(4, (os.cpu_count() or 1) // 2))
+
+# ======================================================================
+# Geração de frames
+# ======================================================================
+
+def frame_times(total_secs, fps=FPS):
+    """Instantes dos frames exatamente como o MoviePy itera (0, 1/fps, ... < total)."""
+    return np.arange(0, total_secs, 1.0 / fps)
+
+def iter_slideshow(segments, fps=FPS, size=(W, H), total_secs=None, batch=4, workers=None):
+    """Gera lotes (B, H, W, 3) uint8 para uma sequência de segmentos.
+
+    segments: lista de (frame | None, duração, zoom). frame=None => tela preta.
+    total_secs corta (ou estende com preto) a timeline, como set_duration.
+    """
+    workers = _default_workers() if workers is None else workers
+    pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        yield from _iter_slideshow(segments, fps, size, total_secs, batch, pool)
+    finally:
+        if pool:
+            pool.shutdown()
+
+def _iter_slideshow(segments, fps, size, total_secs, batch, pool):
+    w, h = size
+    seg_total = sum(d for _, d, _ in segments)
+    total = seg_total if total_secs is None else total_secs
+    times = frame_times(total, fps)
+    black = np.zeros((h, w, 3), dtype=np.uint8)
+
+    start = 0.0
+    cursor = 0
+    for frame, dur, zoom in list(segments) + [(None, max(0.0, total - seg_total), 1.0)]:
+        end = start + dur
+        stop = int(np.searchsorted(times, end, side="left"))
+        local = times[cursor:stop] - start
+        start = end
+        if local.size == 0:
+            continue
+        cursor = stop
+
+        if frame is None or zoom == 1.0:
+            # Sem movimento: o mesmo frame repetido, sem reamostrar
+            still = black if frame is None else frame
+            for i in range(0, local.size, batch):
+                n = min(batch, local.size - i)
+                yield np.broadcast_to(still, (n, h, w, 3))
+            continue
+
+        hs, ws = frame.shape[:2]
+        flat = np.ascontiguousarray(frame).reshape(hs, ws * 3)
+        crops = ken_burns_crops(local, dur, zoom=zoom, size=(ws, hs))
+        taps = (_axis_taps(crops[:, 1], crops[:, 3], h, hs)
+                + _axis_taps(crops[:, 0], crops[:, 2], w, ws, channels=3))
+        for i in range(0, local.size, batch):
+            sl = slice(i, i + batch)
+            yield _sample_batch(flat, [t[sl] for t in taps], size, pool)
+
+# ======================================================================
+# Saída: ffmpeg via pipe
+# ======================================================================
+
+def ffmpeg_writer_cmd(out_path, size=(W, H), fps=FPS, audio_path=None, duration=None,
+                      threads=None, preset=None, audio_codec="aac", audio_fps=44100):
+    w, h = size
+    cmd = [
+        ffmpeg_binary(), "-y", "-loglevel", "error",
+        "-f", "rawvideo", "-vcodec", "rawvideo",
+        "-s", f"{w}x{h}", "-pix_fmt", "rgb24", "-r", str(fps),
+        "-i", "-",
+    ]
+    if audio_path:
+        cmd += ["-i", str(audio_path)]
+    cmd += ["-map", "0:v:0"]
+    if audio_path:
+        # 44.1 kHz como o write_videofile do MoviePy
+        cmd += ["-map", "1:a:0", "-c:a", audio_codec, "-ar", str(audio_fps)]
+    if duration is not None:
+        cmd += ["-t", f"{duration:.3f}"]
+    cmd += encoder.x264_args("motion", threads, preset) + ["-pix_fmt", "yuv420p", str(out_path)]
+    return cmd
+
+def render_slideshow(segments, out_path, fps=FPS, size=(W, H), audio_path=None,
+                     total_secs=None, batch=4, threads=None, preset=None, workers=None):
+    """Renderiza os segmentos e transmite os frames crus ao ffmpeg (libx264)."""
+    total = sum(d for _, d, _ in segments) if total_secs is None else total_secs
+    pathlib.Path(os.path.dirname(str(out_path)) or ".").mkdir(parents=True, exist_ok=True)
+    cmd = ffmpeg_writer_cmd(out_path, size=size, fps=fps, audio_path=audio_path,
+                            duration=total, threads=threads, preset=preset)
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        for frames in iter_slideshow(segments, fps=fps, size=size, total_secs=total,
+                                     batch=batch, workers=workers):
+            proc.stdin.write(np.ascontiguousarray(frames).tobytes())
+    except BrokenPipeError:
+        pass
+    finally:
+        proc.stdin.close()
+    err = proc.stderr.read()
+    proc.stderr.close()
+    if proc.wait() != 0:
+        raise RuntimeError(f"ffmpeg falhou ({proc.returncode}): {err.decode(errors='replace')[-800:]}")
+    return str(out_path)
+
+# ======================================================================
+# Slideshow estático: cada imagem entra UMA vez no ffmpeg (concat demuxer)
+# ======================================================================
+
+def _concat_list(names, durations, total, fps=FPS):
+    """Lista ffconcat com a duração de cada imagem, cortada em `total`.
+
+    O demuxer ignora a duração do último item, então o último arquivo é repetido
+    como quadro de fechamento em total - 1/fps (sem -t, que descartaria esse quadro).
+    total <= 1/fps vira um vídeo de um quadro só (o primeiro).
+    """
+    if not names:
+        raise ValueError("render_stills: nenhum quadro para codificar")
+    lines = ["ffconcat version 1.0"]
+    t = 0.0
+    last = names[0]
+    for name, dur in zip(names, durations):
+        remaining = total - 1.0 / fps - t
+        if remaining <= 0:
+            break
+        dur = min(dur, remaining)
+        if dur <= 0:
+            continue
+        lines += [f"file '{name}'", f"duration {dur:.6f}"]
+        t += dur
+        last = name
+    lines.append(f"file '{last}'")
+    return "\n".join(lines) + "\n"
+
+def render_stills(frames, durations, out_path, fps=FPS, audio_path=None, total_secs=None,
+                  threads=None, preset=None, fps_mode=None, encoder_args=None):
+    """Codifica imagens paradas com o tempo de exibição de cada uma.
+
+    frames: imagens PIL ou ndarrays (H, W, 3). O ffmpeg recebe cada quadro uma única vez
+    via concat demuxer; com fps_mode="vfr" (padrão) só os quadros distintos são
+    codificados, com "cfr" o ffmpeg duplica internamente para `fps` (compatibilidade).
+    encoder_args substitui o perfil do x264 (bench_encoder mede candidatos por aqui).
+    """
+    import tempfile
+    fps_mode = fps_mode or os.getenv("STILL_FPS_MODE", "vfr")
+    total = sum(durations) if total_secs is None else total_secs
+    pathlib.Path(os.path.dirname(str(out_path)) or ".").mkdir(parents=True, exist_ok=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        names = []
+        for i, frame in enumerate(frames):
+            img = frame if isinstance(frame, Image.Image) else Image.fromarray(np.asarray(frame, dtype=np.uint8))
+            name = f"still_{i:04d}.bmp"  # sem compressão: grava/decodifica mais rápido que PNG/JPEG
+            img.convert("RGB").save(os.path.join(tmp, name))
+            names.append(name)
+        list_path = os.path.join(tmp, "stills.ffconcat")
+        pathlib.Path(list_path).write_text(_concat_list(names, durations, total, fps), encoding="utf-8")
+
+        cmd = [ffmpeg_binary(), "-y", "-loglevel", "error",
+               "-f", "concat", "-safe", "0", "-i", list_path]
+        if audio_path:
+            cmd += ["-i", str(audio_path), "-map", "0:v:0", "-map", "1:a:0",
+                    "-c:a", "aac", "-ar", "44100"]
+        if fps_mode == "cfr":
+            cmd += ["-vsync", "cfr", "-r", str(fps), "-t", f"{total:.3f}"]
+        else:
+            cmd += ["-vsync", "vfr"]
+        cmd += (encoder_args or encoder.x264_args("still", threads, preset)) + ["-pix_fmt", "yuv420p", str(out_path)]
+        res = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if res.returncode != 0:
+            raise RuntimeError(f"ffmpeg falhou ({res.returncode}): {res.stderr.decode(errors='replace')[-800:]}")
+    return str(out_path)
@@ -4,21 +4,33 @@
 # - Parsing robusto: extrai o primeiro JSON com "blocks" mesmo se o modelo escrever prosa antes/depois
 # - Normalização: garante 6–8 blocos, remove lixo
 # - Fallback local: roteiro seguro quando a LLM falhar
+# - Traduções passam pela memória de tradução em disco (core.translation_memory)
+# - translate_blocks_multi: todos os idiomas numa só chamada, com reserva por idioma
+# - Hedging (LLM_HEDGE=1): se o provider primário passar do prazo, dispara o outro (core.hedge)
+# - generate_script_stream: blocos entregues um a um durante o streaming da LLM
+# - Chamadas aos providers no ritmo de core.ratelimit (throttling pausa e repete antes do fallback)
 
 import os
 import re
 import json
+import time
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 import boto3
 import botocore
 
+from core import ratelimit
+from core.hedge import default_stats, hedged_call
+from core.translation_memory import default_tm
+
 DEFAULT_THEME = os.getenv("THEME_SEED", "autoajuda")
 BEDROCK_MODEL = os.getenv(
     "BEDROCK_MODEL_ID",
     "anthropic.claude-3-5-sonnet-20240620-v1:0"
 )
+LLM_HEDGE = os.getenv("LLM_HEDGE", "1").lower() in ("1", "true", "yes")
 
 # ======================================================================
 # Prompts: resposta ESTRITA em JSON
@@ -44,6 +56,21 @@ PROMPT_PT = (
     "{{\"language\":\"pt-BR\",\"blocks\":[{{\"text\":\"...\"}}]}}\n"
 )
 
+SYSTEM_TR_MULTI = (
+    "Você é um tradutor de roteiros curtos. "
+    "Responda ESTRITAMENTE em JSON válido, sem qualquer texto antes ou depois. "
+    "Preserve sentido, concisão e naturalidade; não junte nem divida linhas."
+)
+
+PROMPT_TR_MULTI = (
+    "Traduza cada linha do array JSON abaixo para os idiomas: {targets}.\n"
+    "- Exatamente {n} linhas por idioma, na MESMA ORDEM da entrada.\n"
+    "- Sem numeração, markdown ou comentários.\n"
+    "- SAÍDA: SOMENTE JSON MINIFICADO no formato:\n"
+    "{{\"translations\":{{{example}}}}}\n\n"
+    "Linhas:\n{lines}\n"
+)
+
 # ======================================================================
 # Providers
 # ======================================================================
@@ -52,22 +79,54 @@ def _openai_chat(messages, model="gpt-4o-mini"):
     key = os.getenv("OPENAI_API_KEY")
     if not key:
         raise RuntimeError("OPENAI_API_KEY ausente")
-    resp = requests.post(
-        "https://api.openai.com/v1/chat/completions",
-        headers={"Authorization": f"Bearer {key}"},
-        json={"model": model, "messages": messages, "temperature": 0.8},
-        timeout=60,
-    )
-    resp.raise_for_status()
-    data = resp.json()
+
+    def _post():
+        resp = requests.post(
+            "https://api.openai.com/v1/chat/completions",
+            headers={"Authorization": f"Bearer {key}"},
+            json={"model": model, "messages": messages, "temperature": 0.8},
+            timeout=60,
+        )
+        resp.raise_for_status()
+        return resp
+
+    data = ratelimit.call("openai", _post).json()
     return data["choices"][0]["message"]["content"]
 
-def _bedrock_claude(prompt_text, system_text=None):
-    region = os.getenv("AWS_REGION", "us-east-1")
-    client = boto3.client("bedrock-runtime", region_name=region)
+def _openai_stream(messages, model="gpt-4o-mini"):
+    """Mesma chamada do _openai_chat com stream=True: gera os trechos de texto (SSE)."""
+    key = os.getenv("OPENAI_API_KEY")
+    if not key:
+        raise RuntimeError("OPENAI_API_KEY ausente")
+
+    def _post():
+        resp = requests.post(
+            "https://api.openai.com/v1/chat/completions",
+            headers={"Authorization": f"Bearer {key}"},
+            json={"model": model, "messages": messages, "temperature": 0.8, "stream": True},
+            timeout=60,
+            stream=True,
+        )
+        if not resp.ok:
+            resp.close()
+        resp.raise_for_status()
+        return resp
+
+    with ratelimit.call("openai", _post) as resp:
+        for line in resp.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+            if delta:
+                yield delta
+
+def _bedrock_payload(prompt_text, system_text=None, max_tokens=1200):
     payload = {
         "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens": 1200,
+        "max_tokens": max_tokens,
         "temperature": 0.8,
         "messages": [
             {"role": "user", "content": [{"type": "text", "text": prompt_text}]}
@@ -75,30 +134,59 @@ def _bedrock_claude(prompt_text, system_text=None):
     }
     if system_text:
         payload["system"] = system_text
-    body = json.dumps(payload)
-    response = client.invoke_model(
+    return json.dumps(payload)
+
+def _bedrock_claude(prompt_text, system_text=None, max_tokens=1200):
+    region = os.getenv("AWS_REGION", "us-east-1")
+    client = boto3.client("bedrock-runtime", region_name=region)
+    response = ratelimit.call("bedrock", lambda: client.invoke_model(
         modelId=BEDROCK_MODEL,
-        body=body,
+        body=_bedrock_payload(prompt_text, system_text, max_tokens),
         contentType="application/json",
         accept="application/json"
-    )
+    ))
     out = json.loads(response["body"].read())
     return out["content"][0]["text"]
 
+def _bedrock_claude_stream(prompt_text, system_text=None, max_tokens=1200):
+    """invoke_model_with_response_stream: gera os trechos de texto (content_block_delta)."""
+    region = os.getenv("AWS_REGION", "us-east-1")
+    client = boto3.client("bedrock-runtime", region_name=region)
+    response = ratelimit.call("bedrock", lambda: client.invoke_model_with_response_stream(
+        modelId=BEDROCK_MODEL,
+        body=_bedrock_payload(prompt_text, system_text, max_tokens),
+        contentType="application/json",
+        accept="application/json"
+    ))
+    for event in response["body"]:
+        chunk = event.get("chunk")
+        if not chunk:
+            continue
+        data = json.loads(chunk["bytes"])
+        if data.get("type") == "content_block_delta":
+            text = data.get("delta", {}).get("text")
+            if text:
+                yield text
+
 # ======================================================================
 # Parsing robusto de JSON e fallbacks
 # ======================================================================
 
 def _extract_json_with_blocks(text: str):
     """Extrai o primeiro objeto JSON contendo a chave 'blocks' mesmo
-    que haja prosa antes/depois. Evita regex recursiva; usa varredura
+    que haja prosa antes/depois."""
+    return _extract_json_with_key(text, "blocks")
+
+def _extract_json_with_key(text: str, key: str):
+    """Extrai o primeiro objeto JSON contendo `key` mesmo que haja
+    prosa antes/depois. Evita regex recursiva; usa varredura
     por chaves balanceadas e respeita strings/escapes."""
     # 1) Tenta bloco cercado por ```json ... ```
     fenced = re.search(r"```json\s*(\{.*?\})\s*```", text, re.DOTALL | re.IGNORECASE)
     if fenced:
         cand = fenced.group(1)
         data = json.loads(cand)
-        if isinstance(data, dict) and "blocks" in data:
+        if isinstance(data, dict) and key in data:
             return data
 
     # 2) Varredura manual por chaves balanceadas
@@ -130,7 +218,7 @@ def _extract_json_with_blocks(text: str):
                             cand = text[i:j+1]
                             try:
                                 data = json.loads(cand)
-                                if isinstance(data, dict) and "blocks" in data:
+                                if isinstance(data, dict) and key in data:
                                     return data
                             except json.JSONDecodeError:
                                 pass
@@ -139,7 +227,57 @@ def _extract_json_with_blocks(text: str):
             i = j
         i += 1
 
-    raise json.JSONDecodeError("JSON com 'blocks' não encontrado", text, 0)
+    raise json.JSONDecodeError(f"JSON com '{key}' não encontrado", text, 0)
+
+class BlockStreamParser:
+    """Parser JSON incremental para respostas em streaming.
+
+    Mesma varredura por chaves balanceadas de _extract_json_with_key (respeita
+    strings/escapes), mas com estado entre trechos: cada caractere é visto uma
+    vez e só o objeto em aberto fica em memória. feed() devolve os blocos
+    {"text": ...} (objetos no 2º nível, dentro de "blocks") que fecharam no trecho.
+    """
+    def __init__(self):
+        self.depth = 0
+        self.in_str = False
+        self.esc = False
+        self._obj = None  # caracteres do bloco em aberto
+
+    def feed(self, chunk):
+        out = []
+        for ch in chunk:
+            if self._obj is not None:
+                self._obj.append(ch)
+            if self.in_str:
+                if self.esc:
+                    self.esc = False
+                elif ch == "\\":
+                    self.esc = True
+                elif ch == '"':
+                    self.in_str = False
+            elif ch == '"':
+                # aspas só contam dentro de JSON (prosa antes do objeto é ignorada)
+                self.in_str = self.depth > 0
+            elif ch == "{":
+                self.depth += 1
+                if self.depth == 2:
+                    self._obj = ["{"]
+            elif ch == "}" and self.depth > 0:
+                if self.depth == 2 and self._obj is not None:
+                    block = self._close()
+                    if block:
+                        out.append(block)
+                self.depth -= 1
+        return out
+
+    def _close(self):
+        try:
+            obj = json.loads("".join(self._obj))
+        except json.JSONDecodeError:
+            obj = None
+        self._obj = None
+        text = str(obj.get("text", "")).strip() if isinstance(obj, dict) else ""
+        return {"text": text} if text else None
 
 def _normalize_blocks(data):
     if not isinstance(data, dict) or "blocks" not in data:
@@ -175,18 +313,67 @@ def _fallback_script(theme: str):
         "Se falhar, recomece ainda hoje, em versão menor. Consistência supera intensidade.",
         "Se fez sentido, compartilhe com alguém e salve para lembrar amanhã."
     ]
-    return {"language": "pt-BR", "blocks": [{"text": t} for t in base]}
+    # "fallback": roteiro de reserva, não deve ser tratado como resultado definitivo (ex.: manifesto)
+    return {"language": "pt-BR", "blocks": [{"text": t} for t in base], "fallback": True}
 
 # ======================================================================
 # API pública
 # ======================================================================
 
-def generate_script(theme=DEFAULT_THEME, provider="bedrock"):
-    """Gera o roteiro em PT-BR como JSON com 6–8 blocos."""
+def _script_call(provider, prompt_text):
+    if provider == "openai":
+        return _openai_chat(
+            [{"role": "system", "content": SYSTEM_PT},
+             {"role": "user", "content": prompt_text}]
+        )
+    return _bedrock_claude(prompt_text, system_text=SYSTEM_PT)
+
+def _parse_script(content):
+    """Resposta da LLM -> roteiro normalizado; levanta se não houver blocos válidos."""
+    if content and content.strip().startswith("{"):
+        data = json.loads(content)
+    else:
+        data = _extract_json_with_blocks(content)
+    script = _normalize_blocks(data)
+    if not script["blocks"]:
+        raise ValueError("roteiro sem blocos")
+    return script
+
+def _secondary_provider(provider):
+    """O outro provider, se houver credenciais para ele."""
+    if provider == "openai":
+        return "bedrock" if os.getenv("AWS_ACCESS_KEY_ID") else None
+    return "openai" if os.getenv("OPENAI_API_KEY") else None
+
+def _generate_hedged(prompt_text, provider, secondary):
+    stats = default_stats()
+    deadline = stats.deadline(provider)
+    t0 = time.perf_counter()
+    name, script = hedged_call(
+        (provider, lambda: _script_call(provider, prompt_text)),
+        (secondary, lambda: _script_call(secondary, prompt_text)),
+        _parse_script, deadline, stats,
+    )
+    print(f"[hedge] roteiro via {name} em {time.perf_counter() - t0:.1f}s (prazo {deadline:.1f}s)")
+    return script
+
+def generate_script(theme=DEFAULT_THEME, provider="bedrock", hedge=None):
+    """Gera o roteiro em PT-BR como JSON com 6–8 blocos.
+
+    Com hedge (padrão LLM_HEDGE) e credenciais dos dois providers, o secundário é
+    disparado quando o primário passa do prazo; vale a primeira resposta válida.
+    """
     today = datetime.date.today().isoformat()
     prompt_text = PROMPT_PT.format(theme=f"{theme} {today}")
     content = None
 
+    secondary = _secondary_provider(provider)
+    if (LLM_HEDGE if hedge is None else hedge) and secondary:
+        try:
+            return _generate_hedged(prompt_text, provider, secondary)
+        except Exception:
+            return _fallback_script(theme)
+
     try:
         if provider == "openai":
             content = _openai_chat(
@@ -227,43 +414,201 @@ def generate_script(theme=DEFAULT_THEME, provider="bedrock"):
     except Exception:
         return _fallback_script(theme)
 
-def translate_blocks(blocks, target_lang, provider="bedrock"):
-    """Traduz blocos mantendo a contagem e a ordem, retornando [{text:...}, ...]."""
-    text = "\n".join([b["text"] for b in blocks])
-    prompt = (
-        f"Traduza as linhas abaixo para {target_lang}, mantendo sentido, concisão e naturalidade. "
-        f"Responda com as linhas na MESMA ORDEM, uma por linha, sem numeração e sem comentários.\n\n{text}"
-    )
+def _script_stream(provider, prompt_text):
+    if provider == "openai":
+        return _openai_stream(
+            [{"role": "system", "content": SYSTEM_PT},
+             {"role": "user", "content": prompt_text}]
+        )
+    return _bedrock_claude_stream(prompt_text, system_text=SYSTEM_PT)
+
+def generate_script_stream(theme=DEFAULT_THEME, provider="bedrock", status=None):
+    """Como generate_script, mas gera cada bloco {"text": ...} assim que ele fecha
+    na resposta em streaming (o TTS pode começar antes de a LLM terminar).
+
+    Mantém as garantias de _normalize_blocks (no máximo 8; completa até 6 repetindo
+    o último). Se o streaming falhar antes do primeiro bloco, cai para generate_script.
+    status (dict): recebe status["fallback"] = True se o resultado for o roteiro de reserva.
+    """
+    status = {} if status is None else status
+
+    def _fallback_blocks():
+        script = generate_script(theme, provider)
+        if script.get("fallback"):
+            status["fallback"] = True
+        return script["blocks"]
+
+    today = datetime.date.today().isoformat()
+    prompt_text = PROMPT_PT.format(theme=f"{theme} {today}")
+    parser = BlockStreamParser()
+    chunks = []
+    emitted = []
+    t0 = time.perf_counter()
 
+    try:
+        for chunk in _script_stream(provider, prompt_text):
+            chunks.append(chunk)
+            for block in parser.feed(chunk):
+                if len(emitted) >= 8:
+                    break
+                if not emitted:
+                    print(f"[stream] primeiro bloco em {time.perf_counter() - t0:.1f}s")
+                emitted.append(block)
+                yield block
+            if len(emitted) >= 8:
+                break
+    except Exception as e:
+        if not emitted:
+            print(f"[stream] {provider} falhou ({e}); usando generate_script")
+            yield from _fallback_blocks()
+            return
+        # caiu no meio: roteiro incompleto, completado abaixo repetindo o último bloco
+        print(f"[stream] {provider} falhou após {len(emitted)} bloco(s) ({e})")
+        status["fallback"] = True
+
+    if not emitted:
+        # nada no formato {"text": ...} (ex.: blocos como strings): parsing completo uma vez
+        try:
+            blocks = _parse_script("".join(chunks))["blocks"]
+        except Exception:
+            blocks = _fallback_blocks()
+        yield from blocks
+        return
+
+    print(f"[stream] {len(emitted)} blocos em {time.perf_counter() - t0:.1f}s")
+    for _ in range(6 - len(emitted)):
+        yield {"text": emitted[-1]["text"]}
+
+def _llm_complete(prompt, system_text, provider="bedrock", max_tokens=1200):
+    """Texto da LLM (Bedrock, com OpenAI como reserva) ou None se nenhum provider respondeu."""
+    messages = [{"role": "system", "content": system_text},
+                {"role": "user", "content": prompt}]
     try:
         if provider == "openai":
-            out = _openai_chat(
-                [{"role": "system", "content": "Traduza preservando concisão e naturalidade."},
-                 {"role": "user", "content": prompt}]
-            )
-        else:
-            out = _bedrock_claude(prompt, system_text="Traduza preservando concisão e naturalidade.")
+            return _openai_chat(messages)
+        return _bedrock_claude(prompt, system_text=system_text, max_tokens=max_tokens)
     except botocore.exceptions.ClientError:
         if os.getenv("OPENAI_API_KEY"):
-            out = _openai_chat(
-                [{"role": "system", "content": "Traduza preservando concisão e naturalidade."},
-                 {"role": "user", "content": prompt}]
-            )
-        else:
-            out = text
+            return _openai_chat(messages)
+        return None
     except Exception:
         if os.getenv("OPENAI_API_KEY"):
             try:
-                out = _openai_chat(
-                    [{"role": "system", "content": "Traduza preservando concisão e naturalidade."},
-                     {"role": "user", "content": prompt}]
-                )
+                return _openai_chat(messages)
             except Exception:
-                out = text
-        else:
-            out = text
+                return None
+        return None
+
+def _llm_translate_lines(lines, target_lang, provider="bedrock"):
+    """Uma chamada à LLM: linhas traduzidas (mesma ordem) ou None se nenhum provider respondeu."""
+    text = "\n".join(lines)
+    prompt = (
+        f"Traduza as linhas abaixo para {target_lang}, mantendo sentido, concisão e naturalidade. "
+        f"Responda com as linhas na MESMA ORDEM, uma por linha, sem numeração e sem comentários.\n\n{text}"
+    )
+    out = _llm_complete(prompt, "Traduza preservando concisão e naturalidade.", provider)
+    if out is None:
+        return None
+    return [x.strip() for x in out.split("\n") if x.strip()]
+
+def translate_blocks(blocks, target_lang, provider="bedrock", source_lang="pt-BR", status=None):
+    """Traduz blocos mantendo a contagem e a ordem, retornando [{text:...}, ...].
+
+    Linhas já traduzidas saem da memória de tradução; só o resto vai à LLM.
+    status (dict): recebe status["fallback"] = True se alguma linha ficou sem tradução
+    (nenhum provider respondeu ou a resposta veio com linhas faltando).
+    """
+    texts = [b["text"] for b in blocks]
+    unique = list(dict.fromkeys(texts))
+    tm = default_tm()
+    done = tm.lookup(unique, source_lang, target_lang, provider)
+    missing = [t for t in unique if t not in done]
+
+    if missing:
+        out_lines = _llm_translate_lines(missing, target_lang, provider)
+        if out_lines is None:
+            out_lines = missing  # sem provider: mantém o texto original
+        elif len(out_lines) == len(missing):
+            # só memoriza quando a resposta casa linha a linha
+            tm.store(dict(zip(missing, out_lines)), source_lang, target_lang, provider)
+        if status is not None and (out_lines is missing or len(out_lines) != len(missing)):
+            status["fallback"] = True
+        if len(out_lines) < len(missing):
+            out_lines += [""] * (len(missing) - len(out_lines))
+        done.update(zip(missing, out_lines[:len(missing)]))
+
+    print(f"[tm] {target_lang}: {len(unique) - len(missing)}/{len(unique)} linha(s) da memória")
+    return [{"text": done[t]} for t in texts]
+
+def _parse_multi(content, targets, n):
+    """{idioma: [n linhas]} só para os idiomas que vieram completos na resposta."""
+    if not content:
+        return {}
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        try:
+            data = _extract_json_with_key(content, "translations")
+        except json.JSONDecodeError:
+            return {}
+    tr = data.get("translations") if isinstance(data, dict) else None
+    if not isinstance(tr, dict):
+        return {}
+    out = {}
+    for target in targets:
+        lines = tr.get(target)
+        if isinstance(lines, list) and len(lines) == n:
+            lines = [str(x).strip() for x in lines]
+            if all(lines):
+                out[target] = lines
+    return out
+
+def translate_blocks_multi(blocks, targets, provider="bedrock", source_lang="pt-BR", status=None):
+    """Traduz os blocos para vários idiomas numa só chamada à LLM.
+
+    Pede JSON estrito {"translations": {idioma: [linhas]}}; idiomas ausentes ou
+    com contagem errada caem para translate_blocks, em paralelo.
+    Retorna {idioma: [{text:...}, ...]} com a mesma contagem e ordem dos blocos.
+    status (dict): recebe status["fallback"] = [idiomas] que ficaram (em parte) sem tradução.
+    """
+    targets = list(dict.fromkeys(targets))
+    texts = [b["text"] for b in blocks]
+    unique = list(dict.fromkeys(texts))
+    tm = default_tm()
+
+    done = {t: tm.lookup(unique, source_lang, t, provider) for t in targets}
+    # uma só lista de linhas faltantes (união entre idiomas) para a chamada conjunta
+    missing = [x for x in unique if any(x not in done[t] for t in targets)]
+    pending = [t for t in targets if any(x not in done[t] for x in unique)]
+
+    if missing and pending:
+        prompt = PROMPT_TR_MULTI.format(
+            targets=", ".join(pending),
+            n=len(missing),
+            example=",".join(f"\"{t}\":[\"...\"]" for t in pending),
+            lines=json.dumps(missing, ensure_ascii=False),
+        )
+        content = _llm_complete(prompt, SYSTEM_TR_MULTI, provider,
+                                max_tokens=min(4096, 1200 * len(pending)))
+        parsed = _parse_multi(content, pending, len(missing))
+        for t, lines in parsed.items():
+            pairs = dict(zip(missing, lines))
+            tm.store(pairs, source_lang, t, provider)
+            done[t].update(pairs)
+
+        fallback = [t for t in pending if t not in parsed]
+        if fallback:
+            print(f"[translate] resposta conjunta incompleta; reserva por idioma: {', '.join(fallback)}")
+            lang_status = {t: {} for t in fallback}
+            with ThreadPoolExecutor(max_workers=len(fallback)) as pool:
+                per_lang = dict(zip(fallback, pool.map(
+                    lambda t: translate_blocks(blocks, t, provider=provider, source_lang=source_lang,
+                                               status=lang_status[t]), fallback)))
+            for t, tb in per_lang.items():
+                done[t].update(zip(texts, (b["text"] for b in tb)))
+            degraded = [t for t in fallback if lang_status[t].get("fallback")]
+            if degraded and status is not None:
+                status["fallback"] = degraded
 
-    out_lines = [x.strip() for x in out.split("\n") if x.strip()]
-    if len(out_lines) < len(blocks):
-        out_lines += [""] * (len(blocks) - len(out_lines))
-    return [{"text": t} for t in out_lines[:len(blocks)]]
+    print(f"[tm] {', '.join(targets)}: {len(unique) - len(missing)}/{len(unique)} linha(s) da memória")
+    return {t: [{"text": done[t][x]} for x in texts] for t in targets}
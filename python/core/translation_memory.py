@@ -0,0 +1,84 @@
+# python/core/translation_memory.py
+# Memória de tradução em disco, compartilhada por translate.py e core/script_gen.py
+# - Chave: (SHA-256 do texto de origem, idioma de origem, idioma de destino, provider)
+# - Índice SQLite (WAL) em output/translation_memory.sqlite (TM_PATH)
+# - Consultada antes de qualquer chamada de rede; contadores de acerto/erro
+
+import os, time, hashlib, sqlite3, pathlib, threading, unicodedata
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent          # …/python
+DEFAULT_PATH = ROOT / "output" / "translation_memory.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    source_hash TEXT NOT NULL,
+    source_lang TEXT NOT NULL,
+    target_lang TEXT NOT NULL,
+    provider    TEXT NOT NULL,
+    source      TEXT NOT NULL,
+    target      TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    PRIMARY KEY (source_hash, source_lang, target_lang, provider)
+);
+"""
+
+def _hash(text):
+    s = unicodedata.normalize("NFC", text).strip()
+    return hashlib.sha256(s.encode("utf-8")).hexdigest()
+
+class TranslationMemory:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def lookup(self, texts, source_lang, target_lang, provider):
+        """{texto: tradução} para os textos já traduzidos (conta acertos e faltas)."""
+        found = {}
+        with self._lock:
+            for t in dict.fromkeys(texts):
+                row = self._db.execute(
+                    "SELECT target FROM translations WHERE source_hash = ? AND source_lang = ? "
+                    "AND target_lang = ? AND provider = ?",
+                    (_hash(t), source_lang, target_lang, provider),
+                ).fetchone()
+                if row:
+                    found[t] = row[0]
+                    self.hits += 1
+                else:
+                    self.misses += 1
+        return found
+
+    def store(self, pairs, source_lang, target_lang, provider):
+        """Grava {texto: tradução}."""
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO translations "
+                "(source_hash, source_lang, target_lang, provider, source, target, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(_hash(s), source_lang, target_lang, provider, s, t, now) for s, t in pairs.items()],
+            )
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses,
+                    "hit_rate": (self.hits / total) if total else 0.0}
+
+_tm = None
+_tm_lock = threading.Lock()
+
+def default_tm():
+    """Instância única por processo (TM_PATH)."""
+    global _tm
+    with _tm_lock:
+        if _tm is None:
+            _tm = TranslationMemory(os.getenv("TM_PATH", str(DEFAULT_PATH)))
+        return _tm
@@ -1,11 +1,18 @@
 # python/core/tts.py
 # TTS com Amazon Polly (PT-BR, EN, ES)
-# - Retorna: caminho mp3, duração total (s), lista de durações por bloco (s)
+# - Retorna: caminho WAV (PCM), duração total (s), lista de durações por bloco (s)
+# - Polly entrega PCM cru: sem decodificar MP3 por bloco nem recodificar a narração
 # - Ajuste automático para ~60s se definido VIDEO_SECONDS
 # - Engine neural sempre que possível
+# - Cache em disco por (SSML, voz, engine, rate, formato): falas repetidas não chamam o Polly
+# - Blocos sintetizados em paralelo; engine escolhida antes pelo mapa de vozes em cache
+# - Chamadas ao Polly no ritmo de core.ratelimit (TPS; throttling pausa e repete)
 
-import os, io, boto3
-from pydub import AudioSegment
+import os, json, time, pathlib, threading, boto3
+from concurrent.futures import ThreadPoolExecutor
+
+from core import audio, ratelimit
+from core.audio_cache import default_cache
 
 VOICES = {
     "pt-BR": "Camila",   # alternativas: Vitoria, Thiago
@@ -17,38 +24,125 @@ def synthesize_ssml(text, lang):
     # SSML simples e robusto (pode evoluir para marcação de pausas)
     return f"<speak><prosody rate='medium'>{text}</prosody></speak>"
 
-def tts_from_blocks(blocks, lang_code, out_path):
-    polly = boto3.client("polly", region_name=os.getenv("AWS_REGION", "us-east-1"))
+# ======================================================================
+# Mapa voz -> engines suportadas (describe_voices), em cache no disco
+# ======================================================================
+
+VOICES_TTL = int(os.getenv("POLLY_VOICES_TTL", str(7 * 24 * 3600)))
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "4"))
+
+_client = None
+_client_lock = threading.Lock()
+_engines = None
+_engines_lock = threading.Lock()
+
+def _polly():
+    """Cliente Polly único (clientes boto3 são thread-safe), criado sob demanda."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = boto3.client("polly", region_name=os.getenv("AWS_REGION", "us-east-1"))
+        return _client
+
+def _voices_path():
+    return pathlib.Path(default_cache().root) / "polly_voices.json"
+
+def voice_engines():
+    """{voz: [engines]} lido do disco; atualizado via describe_voices se velho/ausente."""
+    global _engines
+    with _engines_lock:
+        if _engines is not None:
+            return _engines
+        path = _voices_path()
+        try:
+            if time.time() - path.stat().st_mtime < VOICES_TTL:
+                _engines = json.loads(path.read_text(encoding="utf-8"))
+                return _engines
+        except (OSError, ValueError):
+            pass
+        try:
+            engines, token = {}, None
+            while True:
+                kw = {"IncludeAdditionalLanguageCodes": True}
+                if token:
+                    kw["NextToken"] = token
+                resp = _polly().describe_voices(**kw)
+                for v in resp.get("Voices", []):
+                    engines[v["Id"]] = v.get("SupportedEngines", ["standard"])
+                token = resp.get("NextToken")
+                if not token:
+                    break
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(engines, indent=2), encoding="utf-8")
+            _engines = engines
+        except Exception as e:
+            # sem permissão/rede: segue com o comportamento antigo (neural com fallback)
+            print(f"[tts] describe_voices indisponível: {e}")
+            _engines = {}
+        return _engines
+
+def pick_engine(voice):
+    engines = voice_engines().get(voice)
+    if engines is None:
+        return "neural"  # desconhecida: tenta neural (com fallback)
+    return "neural" if "neural" in engines else "standard"
+
+def _synthesize(polly, ssml, voice, engine="neural"):
+    """(PCM, engine que de fato gerou o áudio)."""
+    kwargs = dict(TextType="ssml", Text=ssml, VoiceId=voice,
+                  OutputFormat="pcm", SampleRate=str(audio.PCM_RATE))
+    try:
+        resp = ratelimit.call("polly", lambda: polly.synthesize_speech(Engine=engine, **kwargs))
+    except ratelimit.QuotaExceeded:
+        raise
+    except Exception as e:
+        if engine == "standard" or ratelimit.throttle_info(e)[0]:
+            raise
+        # fallback para engine padrão se neural não estiver disponível
+        resp = ratelimit.call("polly", lambda: polly.synthesize_speech(**kwargs))
+        engine = "standard"
+    return resp["AudioStream"].read(), engine
+
+def _block_audio(cache, text, lang_code, voice, engine):
+    ssml = synthesize_ssml(text, lang_code)
+    pcm = cache.get(cache.key(ssml, voice, engine, "medium", "pcm"), "pcm")
+    if pcm is None:
+        pcm, used = _synthesize(_polly(), ssml, voice, engine)
+        # gravado sob a engine que gerou o áudio: um fallback para "standard" não fica
+        # servido como neural para sempre
+        cache.put(cache.key(ssml, voice, used, "medium", "pcm"), "pcm", pcm)
+    return audio.from_pcm16(pcm)
+
+def tts_from_blocks(blocks, lang_code, out_path, with_offsets=False):
+    """Narração dos blocos (lista ou gerador) em WAV. Retorna (caminho, duração total, durações por bloco)
+    e, com with_offsets=True, também o início exato de cada bloco (amostras a PCM_RATE)."""
     voice = VOICES.get(lang_code, VOICES["en"])
-    combined = AudioSegment.silent(duration=0)
+    engine = pick_engine(voice)
+    cache = default_cache()
+    before = cache.stats()
+    sr = audio.PCM_RATE
+    timeline = audio.Timeline(sr)
+    offsets = []
     piece_durations = []
 
-    for b in blocks:
-        ssml = synthesize_ssml(b["text"], lang_code)
-        try:
-            resp = polly.synthesize_speech(
-                TextType="ssml",
-                Text=ssml,
-                VoiceId=voice,
-                OutputFormat="mp3",
-                Engine="neural"
-            )
-        except Exception:
-            # fallback para engine padrão se neural não estiver disponível
-            resp = polly.synthesize_speech(
-                TextType="ssml",
-                Text=ssml,
-                VoiceId=voice,
-                OutputFormat="mp3"
-            )
-
-        audio_bytes = resp["AudioStream"].read()
-        seg = AudioSegment.from_file(io.BytesIO(audio_bytes), format="mp3")
-        piece_durations.append(len(seg) / 1000.0)
-        combined += seg
+    # Blocos sintetizados em paralelo (pool limitado) assim que chegam — `blocks` pode
+    # ser um gerador (roteiro em streaming); cada texto distinto vai uma vez e o
+    # resultado é remontado na ordem original
+    texts = []
+    futures = {}
+    with ThreadPoolExecutor(max_workers=TTS_WORKERS) as pool:
+        for b in blocks:
+            texts.append(b["text"])
+            if b["text"] not in futures:
+                futures[b["text"]] = pool.submit(_block_audio, cache, b["text"], lang_code, voice, engine)
+        segments = [futures[t].result() for t in texts]
+
+    for seg in segments:
+        piece_durations.append(audio.duration(seg, sr))
+        offsets.append(timeline.append(seg))
 
         # pequena pausa entre blocos para melhor respiração
-        combined += AudioSegment.silent(duration=200)
+        timeline.pause(0.2)
 
     total_secs = sum(piece_durations)
 
@@ -56,11 +150,16 @@ def tts_from_blocks(blocks, lang_code, out_path):
     target = float(os.getenv("VIDEO_SECONDS", "60"))
     if total_secs < target - 1.0:
         extra = (target - total_secs)
-        combined += AudioSegment.silent(duration=int(extra * 1000))
+        timeline.pause(extra)
         piece_durations.append(extra)
         total_secs = sum(piece_durations)
 
-    # Exportação final
-    combined.export(out_path, format="mp3")
+    # Exportação final: WAV sem perda (a única codificação é o AAC no mux do vídeo)
+    audio.write_wav(out_path, timeline.render(), sr)
+    st = cache.stats()
+    hits, misses = st["hits"] - before["hits"], st["misses"] - before["misses"]
+    print(f"[tts] {lang_code}: {voice}/{engine}, cache {hits} acertos / {misses} faltas")
 
+    if with_offsets:
+        return out_path, total_secs, piece_durations, offsets
     return out_path, total_secs, piece_durations
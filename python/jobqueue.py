@@ -0,0 +1,261 @@
+"""Fila durável de jobs de render (SQLite) com workers em vários processos.
+
+Cada job: (kind, key, payload). kind é "módulo:função" importada pelo worker;
+key é única (reenfileirar a mesma key não duplica o job).
+
+- lease com prazo: um job pego por um worker fica reservado até lease_until;
+  o worker renova (heartbeat) enquanto roda. Worker morto => lease expira e
+  outro worker retoma o job
+- falha => volta à fila com espera crescente, até max_attempts; depois "failed"
+- saídas idempotentes ficam a cargo do handler (ex.: main.render_job grava em
+  arquivo temporário e renomeia)
+- handler "m:f" pode definir "m:f_failed(payload)", chamado quando o job falha de vez
+  (ex.: soltar os pins das imagens no armazém do Pexels)
+
+Vários hosts podem usar a mesma fila se o arquivo SQLite estiver num sistema
+de arquivos com locks POSIX confiáveis (o modo WAL exige memória compartilhada,
+então a fila usa journal_mode=DELETE).
+
+Uso:
+    python jobqueue.py work --queue output/render_queue.sqlite --workers 4
+    python jobqueue.py status --queue output/render_queue.sqlite
+    python jobqueue.py retry-failed --queue output/render_queue.sqlite
+"""
+import argparse, importlib, json, multiprocessing, os, socket, sqlite3, threading, time, traceback
+from dataclasses import dataclass
+from pathlib import Path
+
+DEFAULT_QUEUE = Path(__file__).parent / "output" / "render_queue.sqlite"
+LEASE_SECS = float(os.getenv("JOB_LEASE_SECS", "300"))
+HEARTBEAT_SECS = float(os.getenv("JOB_HEARTBEAT_SECS", "30"))
+BACKOFF_SECS = float(os.getenv("JOB_BACKOFF_SECS", "30"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    key          TEXT NOT NULL UNIQUE,
+    kind         TEXT NOT NULL,
+    payload      TEXT NOT NULL,
+    status       TEXT NOT NULL DEFAULT 'queued',   -- queued | leased | done | failed
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    not_before   REAL NOT NULL DEFAULT 0,
+    lease_owner  TEXT,
+    lease_until  REAL,
+    result       TEXT,
+    error        TEXT,
+    created_at   REAL NOT NULL,
+    updated_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs(status, not_before, id);
+"""
+
+
+@dataclass
+class Job:
+    id: int
+    key: str
+    kind: str
+    payload: dict
+    attempts: int
+
+
+class JobQueue:
+    def __init__(self, path: str | Path = DEFAULT_QUEUE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), timeout=60, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=DELETE")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def _tx(self, fn):
+        """fn(db) dentro de BEGIN IMMEDIATE (um escritor por vez entre processos)."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                out = fn(self._db)
+                self._db.execute("COMMIT")
+                return out
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, kind: str, key: str, payload: dict, max_attempts: int = 3) -> bool:
+        """Adiciona o job; False se a key já existia (qualquer status)."""
+        now = time.time()
+        cur = self._tx(lambda db: db.execute(
+            "INSERT OR IGNORE INTO jobs (key, kind, payload, max_attempts, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, kind, json.dumps(payload, ensure_ascii=False), max_attempts, now, now)))
+        return cur.rowcount == 1
+
+    def lease(self, owner: str, lease_secs: float = LEASE_SECS) -> Job | None:
+        """Reserva o próximo job pronto (ou com lease expirado) para `owner`."""
+        def _take(db):
+            now = time.time()
+            # leases expirados sem tentativas restantes viram falha
+            db.execute(
+                "UPDATE jobs SET status = 'failed', error = COALESCE(error, 'lease expirado'), updated_at = ? "
+                "WHERE status = 'leased' AND lease_until < ? AND attempts >= max_attempts", (now, now))
+            row = db.execute(
+                "SELECT id, key, kind, payload, attempts FROM jobs "
+                "WHERE (status = 'queued' AND not_before <= ?) OR (status = 'leased' AND lease_until < ?) "
+                "ORDER BY id LIMIT 1", (now, now)).fetchone()
+            if not row:
+                return None
+            db.execute(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_until = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (owner, now + lease_secs, now, row[0]))
+            return Job(row[0], row[1], row[2], json.loads(row[3]), row[4] + 1)
+        return self._tx(_take)
+
+    def heartbeat(self, job_id: int, owner: str, lease_secs: float = LEASE_SECS) -> bool:
+        """Renova o lease; False se o job não é mais deste worker."""
+        now = time.time()
+        cur = self._tx(lambda db: db.execute(
+            "UPDATE jobs SET lease_until = ?, updated_at = ? "
+            "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            (now + lease_secs, now, job_id, owner)))
+        return cur.rowcount == 1
+
+    def complete(self, job_id: int, owner: str, result) -> bool:
+        now = time.time()
+        cur = self._tx(lambda db: db.execute(
+            "UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_until = NULL, updated_at = ? "
+            "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            (json.dumps(result, ensure_ascii=False, default=str), now, job_id, owner)))
+        return cur.rowcount == 1
+
+    def fail(self, job_id: int, owner: str, error: str, backoff: float | None = None) -> bool:
+        """Devolve à fila (espera backoff * 2^(tentativas-1)) ou marca 'failed' sem tentativas restantes."""
+        now = time.time()
+        backoff = BACKOFF_SECS if backoff is None else backoff
+        cur = self._tx(lambda db: db.execute(
+            "UPDATE jobs SET "
+            "status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END, "
+            "not_before = ? + ? * (1 << (attempts - 1)), error = ?, lease_until = NULL, updated_at = ? "
+            "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            (now, backoff, error[-4000:], now, job_id, owner)))
+        return cur.rowcount == 1
+
+    def retry_failed(self) -> int:
+        cur = self._tx(lambda db: db.execute(
+            "UPDATE jobs SET status = 'queued', attempts = 0, not_before = 0, updated_at = ? "
+            "WHERE status = 'failed'", (time.time(),)))
+        return cur.rowcount
+
+    def status(self, key: str) -> str | None:
+        """Status do job com esta key (None se não existir)."""
+        with self._lock:
+            row = self._db.execute("SELECT status FROM jobs WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: n for status, n in rows}
+
+
+def _resolve(kind: str):
+    module, _, name = kind.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def _on_failed(job: Job, owner: str):
+    """Limpeza opcional do handler ("m:f_failed") depois da última tentativa."""
+    module, _, name = job.kind.partition(":")
+    hook = getattr(importlib.import_module(module), f"{name}_failed", None)
+    if hook is None:
+        return
+    try:
+        hook(job.payload)
+    except Exception as e:
+        print(f"[worker {owner}] limpeza de {job.key} falhou: {e}")
+
+
+def run_worker(queue_path: str | Path = DEFAULT_QUEUE, owner: str | None = None,
+               lease_secs: float = LEASE_SECS, heartbeat_secs: float = HEARTBEAT_SECS,
+               poll: float = 2.0, exit_when_idle: bool = False) -> int:
+    """Loop do worker: pega job, roda com heartbeat, conclui/falha. Retorna nº de jobs concluídos."""
+    q = JobQueue(queue_path)
+    owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+    done = 0
+    while True:
+        job = q.lease(owner, lease_secs)
+        if job is None:
+            st = q.stats()
+            if exit_when_idle and not st.get("leased") and not st.get("queued"):
+                return done
+            time.sleep(poll)
+            continue
+
+        stop = threading.Event()
+
+        def _beat(job_id=job.id):
+            while not stop.wait(heartbeat_secs):
+                if not q.heartbeat(job_id, owner, lease_secs):
+                    print(f"[worker {owner}] lease perdido: job {job_id}")
+                    return
+
+        beat = threading.Thread(target=_beat, daemon=True)
+        beat.start()
+        t0 = time.perf_counter()
+        try:
+            result = _resolve(job.kind)(job.payload)
+        except Exception:
+            q.fail(job.id, owner, traceback.format_exc())
+            print(f"[worker {owner}] ✗ {job.key} (tentativa {job.attempts})")
+            if q.status(job.key) == "failed":
+                _on_failed(job, owner)
+            continue
+        finally:
+            stop.set()
+            beat.join()
+        if q.complete(job.id, owner, result):
+            done += 1
+            print(f"[worker {owner}] ✓ {job.key} em {time.perf_counter() - t0:.1f}s")
+
+
+def _work(args):
+    queue_path, exit_when_idle = args
+    return run_worker(queue_path, exit_when_idle=exit_when_idle)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Fila de jobs de render")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    for name in ("work", "status", "retry-failed"):
+        p = sub.add_parser(name)
+        p.add_argument("--queue", default=os.getenv("RENDER_QUEUE", str(DEFAULT_QUEUE)))
+        if name == "work":
+            p.add_argument("--workers", type=int, default=0, help="processos (0 = pelo orçamento de CPU/memória)")
+            p.add_argument("--exit-when-idle", action="store_true")
+    args = ap.parse_args()
+
+    if args.cmd == "status":
+        print(json.dumps(JobQueue(args.queue).stats()))
+    elif args.cmd == "retry-failed":
+        print(f"{JobQueue(args.queue).retry_failed()} job(s) devolvidos à fila")
+    else:
+        from parallel import cpu_budget, available_cores
+        workers, threads = cpu_budget(args.workers or available_cores())
+        if args.workers:
+            workers = args.workers
+        if workers > 1:
+            # núcleos divididos entre os workers; com um só, o perfil do host decide (core.encoder)
+            os.environ.setdefault("ENCODER_THREADS", str(threads))
+        print(f"[jobqueue] {workers} worker(s) x {os.environ.get('ENCODER_THREADS', 'perfil')} thread(s) de encoder")
+        if workers <= 1:
+            run_worker(args.queue, exit_when_idle=args.exit_when_idle)
+            return
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(workers) as pool:
+            total = sum(pool.map(_work, [(args.queue, args.exit_when_idle)] * workers))
+        print(f"[jobqueue] {total} job(s) concluídos")
+
+
+if __name__ == "__main__":
+    main()
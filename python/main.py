@@ -1,10 +1,17 @@
-import os, pathlib, shutil
-from trends import top_topics_week
+import os, pathlib, shutil, time, hashlib, json
+from functools import lru_cache
+from trends import top_topics_multi
 from script_writer import build_script
 from media import pexels_images, clear_pexels_cache
-from video import build_video
-from translate import translate_text
+from video import build_video, prepare_background
+from translate import translate_batch
 from subtitles import srt_from_lines
+from parallel import cpu_budget, run_jobs, new_pool
+from pipeline import Stage, run_pipeline, report
+from core.translation_memory import default_tm
+from core import ratelimit
+from core.assets import default_store
+from jobqueue import JobQueue
 import re
 
 OUT = pathlib.Path(__file__).parent / "output"
@@ -15,43 +22,166 @@ def slug(s: str) -> str:
     s = re.sub(r"[^\w\- ]+", "", s).strip().lower().replace(" ", "-")
     return s[:60] if s else "video"
 
-def generate_for_language(topic: str, lines: list[str], lang_code: str, images: list[str]):
-    """Gera vídeo para um idioma específico."""
+LANGS = ["pt", "en", "es", "fr", "it", "de", "zh"]
+
+def translate_lines(lines: list[str], lang_code: str) -> list[str]:
+    """Traduz as linhas do roteiro (pt é o idioma de origem)."""
+    return translate_all(lines, [lang_code])[lang_code]
+
+def translate_all(lines: list[str], lang_codes: list[str]) -> dict[str, list[str]]:
+    """Todas as traduções de uma vez (lotes por idioma, linhas repetidas uma vez só)."""
+    out = translate_batch(lines, [c for c in lang_codes if c != 'pt'])
+    if 'pt' in lang_codes:
+        out['pt'] = list(lines)
+    return out
+
+@lru_cache(maxsize=2)
+def _background_for(images: tuple):
+    # fundo decodificado uma vez por tópico em cada processo (workers do pool ou da fila):
+    # os idiomas seguintes do mesmo tópico reaproveitam, sem camadas trafegando via pickle
+    return prepare_background(list(images))
+
+def generate_for_language(topic: str, lines: list[str], lang_code: str, images: list[str],
+                          threads: int = 4, t_lines: list[str] | None = None):
+    """Gera vídeo para um idioma específico (t_lines: linhas já traduzidas).
+    Erros sobem para o chamador (run_jobs os entrega ao resumo)."""
+    # Traduz linhas
+    if t_lines is None:
+        t_lines = translate_lines(lines, lang_code)
+
+    # Cria diretório do idioma
+    lang_dir = OUT / lang_code.upper()
+    lang_dir.mkdir(parents=True, exist_ok=True)
+
+    # Caminhos de saída
+    name = f"{slug(topic)}-{lang_code}.mp4"
+    out_path = lang_dir / name
+
+    # Gera vídeo
+    build_video(images, t_lines, str(out_path), background=_background_for(tuple(images)), threads=threads)
+
+    # Gera SRT
+    srt = srt_from_lines(t_lines, dur_per_line=3.0)
+    srt_path = lang_dir / f"{slug(topic)}-{lang_code}.srt"
+    srt_path.write_text(srt, encoding='utf-8')
+
+    return str(out_path)
+
+# ======================================================================
+# Jobs da fila (jobqueue.py): um job = (tópico, idioma, variante)
+# ======================================================================
+
+VARIANT = "still"
+
+def render_job(payload: dict) -> str:
+    """Handler da fila: renderiza um vídeo. Saída idempotente (arquivo temporário + rename)."""
+    topic, lang_code = payload["topic"], payload["lang"]
+    lang_dir = OUT / lang_code.upper()
+    lang_dir.mkdir(parents=True, exist_ok=True)
+    out_path = lang_dir / f"{slug(topic)}-{lang_code}.mp4"
+    tmp_path = out_path.with_name(f"{out_path.stem}.{os.getpid()}.part.mp4")
+
+    # sem valor explícito (payload/ENCODER_THREADS do orçamento do worker), vale o perfil do host
+    threads = payload.get("threads") or int(os.getenv("ENCODER_THREADS", "0")) or None
     try:
-        # Traduz linhas
-        t_lines = [translate_text(x, lang_code) if lang_code != 'pt' else x for x in lines]
-        
-        # Cria diretório do idioma
-        lang_dir = OUT / lang_code.upper()
-        lang_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Caminhos de saída
-        name = f"{slug(topic)}-{lang_code}.mp4"
-        out_path = lang_dir / name
-        
-        # Gera vídeo
-        build_video(images, t_lines, str(out_path))
-        
-        # Gera SRT
-        srt = srt_from_lines(t_lines, dur_per_line=3.0)
-        srt_path = lang_dir / f"{slug(topic)}-{lang_code}.srt"
-        srt_path.write_text(srt, encoding='utf-8')
-        
-        return str(out_path)
-        
-    except Exception as e:
-        print(f"    Erro ao gerar vídeo: {e}")
-        import traceback
-        traceback.print_exc()
+        build_video(payload["images"], payload["t_lines"], str(tmp_path),
+                    background=_background_for(tuple(payload["images"])), threads=threads)
+        os.replace(tmp_path, out_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)  # falhou no meio: não deixa .part.mp4 para trás
+
+    srt = srt_from_lines(payload["t_lines"], dur_per_line=3.0)
+    (lang_dir / f"{slug(topic)}-{lang_code}.srt").write_text(srt, encoding='utf-8')
+    default_store().unpin(payload["pin"])
+    return str(out_path)
+
+def render_job_failed(payload: dict):
+    """jobqueue: última tentativa falhou; as imagens voltam a poder sair no LRU."""
+    default_store().unpin(payload["pin"])
+
+def release_stale_pins(queue: JobQueue) -> int:
+    """Solta pins de jobs que já não estão pendentes (concluídos, falhos, worker morto)."""
+    return default_store().release_pins(lambda key: queue.status(key) in ("queued", "leased"))
+
+def _job_key(topic: str, lang: str, t_lines: list[str], images: list[str]) -> str:
+    # mesmo conteúdo => mesma key (não duplica); roteiro/imagens novos => novo job
+    digest = hashlib.sha256(json.dumps([t_lines, images], ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+    return f"{slug(topic)}:{lang}:{VARIANT}:{digest}"
+
+def _make_enqueue_stage(queue: JobQueue, totals: dict):
+    release_stale_pins(queue)
+
+    def _stage_enqueue(item: dict):
+        new = 0
+        for lang in LANGS:
+            t_lines = item["translations"][lang]
+            key = _job_key(item["topic"], lang, t_lines, item["images"])
+            payload = {"topic": item["topic"], "lang": lang, "images": item["images"],
+                       "t_lines": t_lines, "variant": VARIANT, "pin": key}
+            # imagens fixadas no armazém até o job terminar (o LRU não as apaga antes do worker)
+            if queue.enqueue("main:render_job", key, payload):
+                default_store().pin(key, item["images"])
+                new += 1
+        totals["queued"] = totals.get("queued", 0) + new
+        print(f"  {item['tag']} ⇢ {new} job(s) de render enfileirados")
+        return item
+    return _stage_enqueue
+
+# ======================================================================
+# Estágios da pipeline (um item = dict de um tópico)
+# ======================================================================
+
+def _stage_script(item: dict):
+    item["lines"] = build_script(item["topic"])
+    if not item["lines"]:
+        print(f"  {item['tag']} ✗ Script vazio - pulando tópico")
+        return None
+    print(f"  {item['tag']} ✓ Script: {len(item['lines'])} linhas")
+    return item
+
+def _stage_assets(item: dict):
+    images = pexels_images(item["topic"], limit=5)
+    if not images:
+        print(f"  {item['tag']} ✗ Sem imagens - pulando tópico")
         return None
+    # Fundo (decodificação, resize, faixa da legenda) preparado no processo que renderiza,
+    # uma vez por tópico (_background_for); cada idioma só rasteriza a própria legenda
+    item["images"] = images
+    print(f"  {item['tag']} ✓ Imagens: {len(images)} prontas")
+    return item
+
+def _stage_translate(item: dict):
+    item["translations"] = translate_all(item["lines"], LANGS)
+    print(f"  {item['tag']} ✓ Traduções: {len(LANGS)} idiomas")
+    return item
+
+def _make_render_stage(workers: int, threads: int, pool, totals: dict):
+    def _stage_render(item: dict):
+        topic, tag = item["topic"], item["tag"]
+        # só caminhos no pickle: cada worker decodifica o fundo uma vez (_background_for)
+        jobs = [(topic, item["lines"], lang, item["images"], threads,
+                 item["translations"][lang]) for lang in LANGS]
+        success = 0
+        for job, result, err in run_jobs(generate_for_language, jobs, workers, pool=pool):
+            lang = job[2]
+            if result:
+                print(f"  {tag} ✓ [{lang.upper()}] {os.path.basename(result)}")
+                success += 1
+            else:
+                print(f"  {tag} ✗ [{lang.upper()}] Falhou" + (f": {type(err).__name__}: {err}" if err else ""))
+        totals["videos"] += success
+        print(f"\n  {tag} Resumo: {success}/{len(LANGS)} idiomas OK — {topic}")
+        return item
+    return _stage_render
 
 def main():
     print("="*70)
     print("GERADOR DE VÍDEOS MULTI-IDIOMA")
     print("="*70)
     
-    region = os.getenv("TRENDS_REGION", "BR")
-    topics = top_topics_week(limit=25, region=region) or []
+    # TRENDS_REGIONS=BR,US,ES,... busca as regiões em paralelo (padrão: TRENDS_REGION)
+    regions = os.getenv("TRENDS_REGIONS", os.getenv("TRENDS_REGION", "BR")).split(",")
+    topics = top_topics_multi(regions, limit=25) or []
     
     if not topics:
         print("\n[AVISO] Nenhum tópico retornado.")
@@ -62,59 +192,52 @@ def main():
     
     # Processa os 10 primeiros tópicos
     selected = topics[:10]
-    total_videos = 0
+    totals = {"videos": 0}
+    
+    # Jobs (tópico, idioma) em paralelo: workers x threads do encoder <= núcleos/memória
+    workers, threads = cpu_budget(len(LANGS))
+    print(f"[parallel] {workers} worker(s) x {threads} thread(s) de encoder")
     
+    items = []
     for idx, t in enumerate(selected, start=1):
         topic = t.get("title") or f"Topico-{idx}"
-        
-        print(f"\n{'='*70}")
-        print(f"[{idx}/10] {topic}")
-        print('='*70)
-        
-        try:
-            # 1. Gera script
-            print("  [1/3] Gerando script...")
-            lines = build_script(topic)
-            if not lines:
-                print("  ✗ Script vazio - pulando tópico")
-                continue
-            print(f"  ✓ Script: {len(lines)} linhas")
-            
-            # 2. Busca imagens
-            print("  [2/3] Buscando imagens no Pexels...")
-            images = pexels_images(topic, limit=5)
-            if not images:
-                print("  ✗ Sem imagens - pulando tópico")
-                continue
-            print(f"  ✓ Imagens: {len(images)} prontas")
-            
-            # 3. Gera vídeos em todos os idiomas
-            print("  [3/3] Gerando vídeos...")
-            success = 0
-            
-            for lang in ["pt", "en", "es", "fr", "it", "de", "zh"]:
-                print(f"\n  [{lang.upper()}]")
-                result = generate_for_language(topic, lines, lang, images)
-                if result:
-                    print(f"  ✓ [{lang.upper()}] {os.path.basename(result)}")
-                    success += 1
-                    total_videos += 1
-                else:
-                    print(f"  ✗ [{lang.upper()}] Falhou")
-            
-            print(f"\n  Resumo: {success}/7 idiomas OK")
-            
-        except KeyboardInterrupt:
-            print("\n\n[INTERROMPIDO] Cancelado pelo usuário")
-            break
-        except Exception as e:
-            print(f"  ✗ Erro geral: {e}")
-            import traceback
-            traceback.print_exc()
+        print(f"[{idx}/{len(selected)}] {topic}")
+        items.append({"topic": topic, "tag": f"[{idx}/{len(selected)}]"})
+    
+    # Pipeline: roteiro -> imagens -> traduções -> render, com filas limitadas.
+    # Enquanto o tópico N codifica, o N+1 já está baixando imagens/traduzindo.
+    # RENDER_QUEUE=caminho.sqlite: o render vai para a fila (workers: python jobqueue.py work)
+    queue_path = os.getenv("RENDER_QUEUE")
+    pool = None if queue_path else new_pool(workers)
+    render = (Stage("enqueue", _make_enqueue_stage(JobQueue(queue_path), totals)) if queue_path
+              else Stage("render", _make_render_stage(workers, threads, pool, totals)))
+    stages = [
+        Stage("script", _stage_script),
+        Stage("assets", _stage_assets),
+        Stage("translate", _stage_translate),
+        render,
+    ]
+    t0 = time.perf_counter()
+    try:
+        run_pipeline(items, stages, maxsize=int(os.getenv("PIPELINE_QUEUE", "1")))
+    except KeyboardInterrupt:
+        print("\n\n[INTERROMPIDO] Cancelado pelo usuário")
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+    
+    print("\n[pipeline] Utilização por estágio")
+    print(report(stages, time.perf_counter() - t0))
+    tm = default_tm().stats()
+    print(f"[tm] memória de tradução: {tm['hits']} acertos / {tm['misses']} faltas ({tm['hit_rate']:.0%})")
+    print("[ratelimit] cotas nesta execução:\n" + (ratelimit.report() or "  (nenhuma chamada externa)"))
     
     # Resultado final
     print("\n" + "="*70)
-    print(f"✓ CONCLUÍDO! {total_videos} vídeos gerados")
+    if queue_path:
+        print(f"✓ CONCLUÍDO! {totals.get('queued', 0)} jobs enfileirados em {queue_path}")
+    else:
+        print(f"✓ CONCLUÍDO! {totals['videos']} vídeos gerados")
     print(f"📁 Salvos em: {OUT.absolute()}")
     print("="*70)
     
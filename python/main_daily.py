@@ -1,12 +1,62 @@
 # main_daily.py
-import os, pathlib, datetime, json
-from core.script_gen import generate_script, translate_blocks
+import os, pathlib, datetime, json, threading
+from concurrent.futures import ThreadPoolExecutor
+from core.script_gen import generate_script, generate_script_stream, translate_blocks_multi
 from core.tts import tts_from_blocks
 from core.media import fetch_broll
 from core.assemble import build_video
 from core.srt import write_srt_from_blocks
+from core.translation_memory import default_tm
+from core.hedge import default_stats
+from core import ratelimit
+from core.manifest import Manifest, file_hash, inputs_hash
+from core.assets import default_store
+from jobqueue import JobQueue
 from pathlib import Path
 
+# Roteiro em streaming (TTS começa antes de a LLM terminar); STREAM_SCRIPT=0 desliga
+STREAM_SCRIPT = os.getenv("STREAM_SCRIPT", "1").lower() in ("1", "true", "yes")
+
+def _tts_stage(manifest, blocks, lang, out_path, run=None):
+    """Narração de um idioma via manifesto; run() entrega o resultado já em andamento (streaming)."""
+    inputs = {"blocks": blocks, "lang": lang, "video_seconds": os.getenv("VIDEO_SECONDS", "60")}
+
+    def _run():
+        wav, dur, parts = run() if run else tts_from_blocks(blocks, lang, str(out_path))
+        return {"wav": wav, "dur": dur, "parts": parts}, [wav]
+
+    d = manifest.stage(f"tts_{lang}", inputs, _run)
+    return d["wav"], d["dur"], d["parts"]
+
+def render_job(payload: dict) -> str:
+    """Handler da fila (jobqueue.py): monta o vídeo do dia (arquivo temporário + rename)."""
+    out = Path(payload["out"])
+    tmp = out.with_name(f"{out.stem}.{os.getpid()}.part.mp4")
+    try:
+        build_video(payload["images"], payload["narration"], str(tmp), target_secs=payload["target_secs"],
+                    music_dir=payload["music_dir"], branding_handle=payload["branding"])
+        os.replace(tmp, out)
+    finally:
+        tmp.unlink(missing_ok=True)
+    default_store().unpin(payload["pin"])
+    return str(out)
+
+def render_job_failed(payload: dict):
+    """jobqueue: última tentativa falhou; as imagens voltam a poder sair no LRU."""
+    default_store().unpin(payload["pin"])
+
+def _enqueue_render(queue_path, images, wav, mp4_out, render_in, target_secs, music_dir, branding_handle):
+    queue, store = JobQueue(queue_path), default_store()
+    store.release_pins(lambda key: queue.status(key) in ("queued", "leased"))
+    key = f"daily:{Path(mp4_out).parent.name}:{inputs_hash(render_in)[:12]}"
+    payload = {"images": images, "narration": wav, "out": mp4_out, "target_secs": target_secs,
+               "music_dir": music_dir, "branding": branding_handle, "pin": key}
+    if queue.enqueue("main_daily:render_job", key, payload):
+        store.pin(key, images)  # o LRU do armazém não apaga as imagens antes do worker
+        print(f"[queue] render enfileirado: {key}")
+    else:
+        print(f"[queue] render já estava na fila: {key} ({queue.status(key)})")
+
 def main():
     date_str = datetime.date.today().isoformat()
     
@@ -22,36 +72,112 @@ def main():
 
     branding_handle = os.getenv("BRANDING_HANDLE", "@BoxInandOut")
 
-    # 1) Roteiro base PT-BR
-    data_pt = generate_script(theme=theme, provider=provider)
-    blocks_pt = data_pt["blocks"]
-    (out_dir / "prompt.txt").write_text(json.dumps(data_pt, ensure_ascii=False, indent=2), encoding="utf-8")
+    # Manifesto por estágio: numa nova execução do mesmo dia, estágios com entradas
+    # e saídas inalteradas são pulados e a retomada começa no primeiro desatualizado
+    manifest = Manifest(out_dir)
 
-    # 2) Traduções
-    blocks_en = translate_blocks(blocks_pt, "English", provider=provider)
-    blocks_es = translate_blocks(blocks_pt, "Español", provider=provider)
+    with ThreadPoolExecutor(max_workers=1) as tts_pool:
+        # 1) Roteiro base PT-BR em streaming: o TTS PT-BR começa no primeiro bloco fechado
+        script_in = {"theme": theme, "provider": provider, "date": date_str}
+        prompt_path = out_dir / "prompt.txt"
+        tts_pt = None
+        data_pt = manifest.lookup("script", script_in)
+        if data_pt is not None:
+            print("[manifest] script: em dia, pulando")
+            blocks_pt = data_pt["blocks"]
+        else:
+            print("[manifest] script: executando")
+            blocks_pt = []
+            script_status = {}
+            script_done = threading.Event()
 
-    # 3) TTS
-    mp3_pt, dur_pt, parts_pt = tts_from_blocks(blocks_pt, "pt-BR", str(out_dir / "daily_pt-BR.mp3"))
-    mp3_en, dur_en, parts_en = tts_from_blocks(blocks_en, "en",     str(out_dir / "daily_en.mp3"))
-    mp3_es, dur_es, parts_es = tts_from_blocks(blocks_es, "es",     str(out_dir / "daily_es.mp3"))
+            def _script_blocks():
+                try:
+                    if STREAM_SCRIPT:
+                        source = generate_script_stream(theme=theme, provider=provider, status=script_status)
+                    else:
+                        script = generate_script(theme=theme, provider=provider)
+                        script_status["fallback"] = script.get("fallback", False)
+                        source = script["blocks"]
+                    for b in source:
+                        blocks_pt.append(b)
+                        yield b
+                finally:
+                    script_done.set()
+
+            tts_pt = tts_pool.submit(tts_from_blocks, _script_blocks(), "pt-BR", str(out_dir / "daily_pt-BR.wav"))
+            while not script_done.wait(timeout=0.5):
+                if tts_pt.done():
+                    break
+            if tts_pt.done():
+                tts_pt.result()  # propaga falha do TTS/roteiro
+            data_pt = {"language": "pt-BR", "blocks": blocks_pt}
+            prompt_path.write_text(json.dumps(data_pt, ensure_ascii=False, indent=2), encoding="utf-8")
+            if script_status.get("fallback"):
+                # LLM falhou: roteiro de reserva usado hoje, mas a próxima execução tenta de novo
+                print("[manifest] script: roteiro de reserva, não gravado (refaz na próxima execução)")
+            else:
+                manifest.record("script", script_in, data_pt, [prompt_path])
+
+        # 2) Traduções (todos os idiomas numa só chamada à LLM), enquanto o TTS PT-BR termina
+        tr_status = {}
+        tr = manifest.stage(
+            "translate", {"blocks": blocks_pt, "targets": ["English", "Español"], "provider": provider},
+            lambda: (translate_blocks_multi(blocks_pt, ["English", "Español"], provider=provider,
+                                            status=tr_status), []),
+            degraded=lambda: bool(tr_status.get("fallback")),
+        )
+        blocks_en, blocks_es = tr["English"], tr["Español"]
+
+        # 3) TTS
+        wav_en, dur_en, parts_en = _tts_stage(manifest, blocks_en, "en",    out_dir / "daily_en.wav")
+        wav_es, dur_es, parts_es = _tts_stage(manifest, blocks_es, "es",    out_dir / "daily_es.wav")
+        wav_pt, dur_pt, parts_pt = _tts_stage(manifest, blocks_pt, "pt-BR", out_dir / "daily_pt-BR.wav",
+                                              run=tts_pt.result if tts_pt else None)
 
     # 4) B-roll (mix equilibrado)
     # Consulta genérica com palavras-chave variadas
     query = f"{theme} motivation lifestyle nature city"
-    images = fetch_broll(query, n=6, base_dir=str(out_dir / "broll"))
-    if not images:
-        raise RuntimeError("Nenhuma imagem encontrada via Pexels. Verifique PEXELS_KEY.")
+
+    def _broll():
+        images = fetch_broll(query, n=6, base_dir=str(out_dir / "broll"))
+        if not images:
+            raise RuntimeError("Nenhuma imagem encontrada via Pexels. Verifique PEXELS_KEY.")
+        return images, images
+
+    images = manifest.stage("broll", {"query": query, "n": 6}, _broll)
 
     # 5) Montagem do vídeo principal com narração PT-BR e branding final
     mp4_out = str(out_dir / "daily_master_1080x1920_60s.mp4")
-    build_video(images, mp3_pt, mp4_out, target_secs=target_secs, music_dir=music_dir, branding_handle=branding_handle)
+    render_in = {
+        "images": [file_hash(p) for p in images],
+        "narration": file_hash(wav_pt),
+        "target_secs": target_secs,
+        "music_dir": music_dir,
+        "branding": branding_handle,
+    }
+
+    def _render():
+        build_video(images, wav_pt, mp4_out, target_secs=target_secs, music_dir=music_dir, branding_handle=branding_handle)
+        return mp4_out, [mp4_out]
+
+    # RENDER_QUEUE=caminho.sqlite: o render vai para a fila (workers: python jobqueue.py work);
+    # o manifesto não registra o estágio (a saída só existe quando o worker terminar)
+    queue_path = os.getenv("RENDER_QUEUE")
+    if queue_path and manifest.lookup("render", render_in) is None:
+        _enqueue_render(queue_path, images, wav_pt, mp4_out, render_in, target_secs, music_dir, branding_handle)
+    else:
+        manifest.stage("render", render_in, _render)
 
     # 6) Legendas SRT com base na duração real por bloco
     write_srt_from_blocks(blocks_pt, parts_pt, str(out_dir / "captions_pt-BR.srt"))
     write_srt_from_blocks(blocks_en, parts_en, str(out_dir / "captions_en.srt"))
     write_srt_from_blocks(blocks_es, parts_es, str(out_dir / "captions_es.srt"))
 
+    print("[llm] latência por provider:\n" + (default_stats().report() or "  (sem amostras)"))
+    tm = default_tm().stats()
+    print(f"[tm] memória de tradução: {tm['hits']} acertos / {tm['misses']} faltas ({tm['hit_rate']:.0%})")
+    print("[ratelimit] cotas nesta execução:\n" + (ratelimit.report() or "  (nenhuma chamada externa)"))
     print("Concluído:", out_dir)
 
 if __name__ == "__main__":
@@ -1,13 +1,16 @@
-import os, pathlib, shutil, argparse, io
-from typing import List, Dict
+import os, pathlib, shutil, argparse, hashlib, json
+from typing import List, Dict, Tuple
+import numpy as np
 from story import story_lines
 from media import pexels_images, clear_pexels_cache
 from video_v2 import assemble_video
-from translate import translate_text
+from translate import translate_batch
 from subtitles_multi import srt_from_timings
 from narration import synthesize as tts
 from music import load_background_music
-from pydub import AudioSegment
+from core import audio
+from core.assets import default_store
+from jobqueue import JobQueue
 
 # Saída da v2 (mantenho separada da v1)
 OUT = pathlib.Path(__file__).parent / "output"
@@ -22,41 +25,94 @@ def _norm_lang(code: str) -> str:
     return (code or "").strip().lower().split("-")[0]
 
 
-def build_audio_narration(lines: List[str], lang: str = 'pt-BR') -> AudioSegment:
+def build_audio_narration(lines: List[str], lang: str = 'pt-BR', with_offsets: bool = False):
     """
-    Gera a narração concatenando as falas (TTS) com pequenas pausas.
+    Gera a narração concatenando as falas (TTS em PCM 16 kHz) com pequenas pausas.
+    Com with_offsets=True retorna também o início exato (s) de cada fala na Timeline.
     """
-    parts: List[AudioSegment] = []
+    timeline = audio.Timeline(audio.PCM_RATE)
+    offsets = []
     for line in lines:
-        audio_mp3 = tts(line, lang=lang, speech_rate='medium')
-        seg = AudioSegment.from_file(io.BytesIO(audio_mp3), format='mp3')
+        pcm = tts(line, lang=lang, speech_rate='medium', output_format='pcm')
+        offsets.append(timeline.append(audio.from_pcm16(pcm)) / audio.PCM_RATE)
         # pequena pausa entre falas para legibilidade das legendas
-        parts.append(seg + AudioSegment.silent(duration=250))
-    return sum(parts, AudioSegment.silent(duration=0))
+        timeline.pause(0.25)
+    voice = timeline.render()
+    return (voice, offsets) if with_offsets else voice
 
 
-def duck_music(music: AudioSegment, voice: AudioSegment, duck_db: float = -12.0) -> AudioSegment:
+def duck_music(music: np.ndarray, voice: np.ndarray, duck_db: float = -12.0,
+               sr: int = audio.MIX_RATE) -> np.ndarray:
     """
-    Reduz a música quando há voz (mix simples com ganho relativo).
+    Ducking sidechain: a música desce duck_db só enquanto há voz (envelope RMS
+    com ataque/soltura) e volta entre as falas; depois soma a voz.
+    Ambos na mesma taxa (sr); voz mono é espalhada nos canais da música.
     """
-    music_under = music.apply_gain(duck_db)
-    mixed = music_under.overlay(voice)
-    return mixed
+    music_under = audio.sidechain_duck(music, voice, sr, depth_db=duck_db)
+    return audio.mix(music_under, voice)[:len(music)]
 
 
-def timings_from_audio(voice: AudioSegment, lines: List[str]) -> List[int]:
+def timings_from_audio(voice: np.ndarray, lines: List[str], sr: int = audio.PCM_RATE,
+                       offsets: List[float] | None = None) -> Tuple[List[int], List[int]]:
     """
-    Distribui a duração total do áudio igualmente pelas falas.
-    (simples e robusto; se quiser refinar, dá para usar VAD/aligner)
+    Início e duração (ms) de cada fala, achados pela VAD nas pausas entre falas.
+    Com offsets (início de cada fala na Timeline, s), cada fronteira é a pausa mais
+    próxima do offset e, sem pausa por perto, o próprio offset; sem offsets, as
+    pausas mais longas. Se nada disso servir, divide a duração total igualmente.
     """
-    total = len(voice)
     n = max(1, len(lines))
+    total = int(round(len(voice) * 1000 / sr))
+    near = offsets[1:n] if offsets and len(offsets) >= n else None
+    spans = audio.speech_spans(voice, sr, n, near=near)
+    if spans is not None:
+        starts = [int(round(a * 1000)) for a, _ in spans]
+        return starts, [int(round(b * 1000)) - s for s, (_, b) in zip(starts, spans)]
+    if near is not None:
+        starts = [int(round(t * 1000)) for t in offsets[:n]]
+        return starts, [b - a for a, b in zip(starts, starts[1:] + [total])]
+
     per = total // n
     timings = [per] * n
     if timings:
         timings[-1] = total - sum(timings[:-1])  # fecha a conta
-    return timings
-
+    return [per * i for i in range(n)], timings
+
+
+def render_job(payload: dict) -> str:
+    """Handler da fila (jobqueue.py): monta o vídeo (arquivo temporário + rename)."""
+    out = pathlib.Path(payload["out"])
+    tmp = out.with_name(f"{out.stem}.{os.getpid()}.part.mp4")
+    try:
+        assemble_video(payload["images"], payload["per_sec"], str(tmp), audio_path=payload["audio"])
+        os.replace(tmp, out)
+    finally:
+        tmp.unlink(missing_ok=True)
+    pathlib.Path(payload["audio"]).unlink(missing_ok=True)
+    default_store().unpin(payload["pin"])
+    return str(out)
+
+def render_job_failed(payload: dict):
+    """jobqueue: última tentativa falhou; as imagens voltam a poder sair no LRU
+    (o WAV fica para um retry-failed)."""
+    default_store().unpin(payload["pin"])
+
+def _enqueue_render(queue: JobQueue, imgs: List[str], per_sec: float, out_video: pathlib.Path,
+                    final_audio: np.ndarray) -> bool:
+    """Grava o áudio do job e enfileira a montagem; imagens fixadas no armazém até o fim do job."""
+    store = default_store()
+    store.release_pins(lambda key: queue.status(key) in ("queued", "leased"))
+    digest = hashlib.sha256(json.dumps([imgs, per_sec]).encode("utf-8") + final_audio.tobytes()).hexdigest()[:12]
+    key = f"v2:{out_video.stem}:{digest}"
+    wav = OUT / f"{out_video.stem}.{digest}.wav"
+    if not wav.exists():  # mesmo digest => mesmo áudio (um worker pode estar lendo)
+        audio.write_wav(wav, final_audio, audio.MIX_RATE)
+    payload = {"images": imgs, "per_sec": per_sec, "out": str(out_video), "audio": str(wav), "pin": key}
+    if queue.enqueue("main_v2:render_job", key, payload):
+        store.pin(key, imgs)
+        return True
+    if queue.status(key) == "done":
+        wav.unlink(missing_ok=True)  # mesmo conteúdo já renderizado
+    return False
 
 def run(topic: str, n_images: int = 8, lang_narration: str = 'pt-BR', sub_langs: List[str] = None):
     """
@@ -75,46 +131,53 @@ def run(topic: str, n_images: int = 8, lang_narration: str = 'pt-BR', sub_langs:
     print("[story]", lines)
 
     # Narração
-    voice = build_audio_narration(lines, lang=lang_narration)
-
-    # Música + ducking
-    music = load_background_music(total_duration_ms=len(voice))
-    final_audio = duck_music(music, voice)
+    voice, offsets = build_audio_narration(lines, lang=lang_narration, with_offsets=True)
+    voice_ms = int(round(audio.duration(voice, audio.PCM_RATE) * 1000))
 
-    # Salva áudio temporário
-    tmp_audio = OUT / "temp_audio.mp3"
-    final_audio.export(tmp_audio, format='mp3')
+    # Música + ducking (mix em float32 a 44.1 kHz)
+    music = load_background_music(total_duration_ms=voice_ms, sr=audio.MIX_RATE)
+    final_audio = duck_music(music, audio.resample(voice, audio.PCM_RATE, audio.MIX_RATE))
 
     # Imagens (Pexels)
     imgs = pexels_images(query=topic, limit=n_images)
 
     # Duração por imagem proporcional ao áudio total
-    per_sec = max(1.0, (len(voice) / 1000.0) / max(1, len(imgs)))
+    per_sec = max(1.0, (voice_ms / 1000.0) / max(1, len(imgs)))
     out_video = OUT / f"{topic.replace(' ', '_')}.mp4"
 
-    # Montagem do vídeo com trilha
-    assemble_video(imgs, per_sec, str(out_video), audio_path=str(tmp_audio))
+    # RENDER_QUEUE=caminho.sqlite: a montagem vai para a fila (workers: python jobqueue.py work)
+    queue_path = os.getenv("RENDER_QUEUE")
+    if queue_path:
+        new = _enqueue_render(JobQueue(queue_path), imgs, per_sec, out_video, final_audio)
+        print(f"[queue] montagem {'enfileirada' if new else 'já estava na fila'}: {out_video.name}")
+    else:
+        # Salva áudio temporário em WAV (sem perda; o AAC sai só no mux do vídeo)
+        tmp_audio = OUT / "temp_audio.wav"
+        audio.write_wav(tmp_audio, final_audio, audio.MIX_RATE)
+
+        # Montagem do vídeo com trilha
+        assemble_video(imgs, per_sec, str(out_video), audio_path=str(tmp_audio))
 
     # Legendas (SRT sidecar)
     base_lines = lines
-    timings = timings_from_audio(voice, base_lines)
+    starts, timings = timings_from_audio(voice, base_lines, offsets=offsets)
+
+    # Todas as traduções em lote (pt é o idioma da narração; não precisa traduzir)
+    targets = [_norm_lang(l) for l in sub_langs if _norm_lang(l) != 'pt']
+    translations = translate_batch(base_lines, targets)
 
     srt_paths: Dict[str, pathlib.Path] = {}
     for lang in sub_langs:
         raw_lang = (lang or "").strip()
         tgt = _norm_lang(raw_lang)
+        translated = base_lines if tgt == 'pt' else translations[tgt]
 
-        if tgt == 'pt':  # pt é o idioma da narração; não precisa traduzir
-            translated = base_lines
-        else:
-            translated = [translate_text(l, target=tgt) for l in base_lines]
-
-        srt_content = srt_from_timings(translated, timings)
+        srt_content = srt_from_timings(translated, timings, starts_ms=starts)
         srt_path = OUT / f"{out_video.stem}.{raw_lang}.srt"  # mantém rótulo original (ex.: pt-BR)
         srt_path.write_text(srt_content, encoding='utf-8')
         srt_paths[raw_lang] = srt_path
 
-    print("\n✓ Vídeo gerado:", out_video)
+    print("\n✓ Vídeo " + ("enfileirado:" if queue_path else "gerado:"), out_video)
     for lang, sp in srt_paths.items():
         print("  ↳ SRT:", lang, sp)
     return out_video, srt_paths
@@ -2,6 +2,9 @@ import os, requests, pathlib
 from io import BytesIO
 from PIL import Image
 
+from core import pexels
+from core.assets import default_store
+
 PEXELS_KEY = os.getenv("PEXELS_KEY")
 
 def pexels_images(query: str, limit: int = 5) -> list[str]:
@@ -15,79 +18,56 @@ def pexels_images(query: str, limit: int = 5) -> list[str]:
     Returns:
         Lista de caminhos de arquivos das imagens baixadas
     """
-    if not PEXELS_KEY:
+    if not PEXELS_KEY and not pexels.replay_mode():
         print("[pexels] PEXELS_KEY não configurada")
         return []
     
     try:
         # Busca imagens na API
-        r = requests.get(
-            "https://api.pexels.com/v1/search",
-            headers={"Authorization": PEXELS_KEY},
-            params={
-                "query": query, 
-                "orientation": "portrait", 
-                "per_page": limit,
-            },
-            timeout=10
-        )
-        r.raise_for_status()
-        
-        photos = r.json().get("photos", [])
+        photos = pexels.search(query, per_page=limit, orientation="portrait", key=PEXELS_KEY)
         if not photos:
             print(f"[pexels] Nenhuma imagem encontrada para '{query}'")
             return []
         
         print(f"[pexels] {len(photos)} imagens encontradas para '{query}'")
         
-        # Cria diretório de cache
-        cache_dir = pathlib.Path(__file__).parent / "output" / "pexels_cache"
-        cache_dir.mkdir(parents=True, exist_ok=True)
+        # Armazém compartilhado (conteúdo endereçado + índice SQLite + LRU)
+        store = default_store()
         
-        downloaded_paths = []
+        paths: list[str | None] = [None] * len(photos)
+        pending = []
         
-        # Baixa cada imagem
         for idx, photo in enumerate(photos):
+            photo_id = photo.get("id", idx)
+            
+            # Se já existe em cache, reutiliza
+            cached = store.get(photo_id)
+            if cached:
+                paths[idx] = cached
+                print(f"  [pexels] {idx+1}/{len(photos)} (cache)")
+                continue
+            
+            # Menor renderização que ainda cobre 1080x1920 + zoom
+            pending.append((idx, photo, pexels.best_src(photo)))
+        
+        # Baixa as que faltam em paralelo (sessão com keep-alive + retry)
+        results = pexels.download_many([url for _, _, url in pending])
+        for (idx, photo, url), (data, err) in zip(pending, results):
             try:
-                # URL da imagem
-                img_url = photo["src"].get("large2x") or photo["src"].get("large") or photo["src"]["original"]
-                
-                # Nome do arquivo
-                photo_id = photo.get("id", idx)
-                filename = f"pexels_{photo_id}.jpg"
-                filepath = cache_dir / filename
-                
-                # Se já existe em cache, reutiliza
-                if filepath.exists() and filepath.stat().st_size > 0:
-                    downloaded_paths.append(str(filepath))
-                    print(f"  [pexels] {idx+1}/{len(photos)} (cache)")
-                    continue
-                
-                # Baixa a imagem
-                print(f"  [pexels] Baixando {idx+1}/{len(photos)}...")
-                img_response = requests.get(img_url, timeout=20, stream=True)
-                img_response.raise_for_status()
-                
-                # Valida e converte
-                img = Image.open(BytesIO(img_response.content))
-                
-                # Garante RGB
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # Redimensiona se muito grande
-                max_size = (1920, 1920)
-                if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
-                    img.thumbnail(max_size, Image.Resampling.LANCZOS)
+                if err is not None:
+                    raise err
                 
-                # Salva
-                img.save(filepath, 'JPEG', quality=90, optimize=True)
-                downloaded_paths.append(str(filepath))
+                # Valida (sem decodificar/recodificar: o CDN já entrega no tamanho certo)
+                img = Image.open(BytesIO(data))
+                size = img.size
+                img.verify()
+                paths[idx] = store.put(photo.get("id", idx), data, url=url, width=size[0], height=size[1])
                 
             except Exception as e:
                 print(f"  [pexels] Erro na imagem {idx+1}: {e}")
                 continue
         
+        downloaded_paths = [p for p in paths if p]
         if not downloaded_paths:
             print(f"[pexels] Nenhuma imagem baixada para '{query}'")
             return []
@@ -105,9 +85,5 @@ def pexels_images(query: str, limit: int = 5) -> list[str]:
 
 def clear_pexels_cache():
     """Limpa o cache de imagens do Pexels."""
-    cache_dir = pathlib.Path(__file__).parent / "output" / "pexels_cache"
-    if cache_dir.exists():
-        import shutil
-        shutil.rmtree(cache_dir)
-        cache_dir.mkdir(parents=True, exist_ok=True)
-        print("[pexels] Cache limpo")
+    default_store().clear()
+    print("[pexels] Cache limpo")
@@ -1,15 +1,17 @@
-import os, random, io, math
-from typing import Optional, Tuple
-from pydub import AudioSegment
+import os, random
+import numpy as np
+
+from core import audio
 
 # Pequena faixa default (sine pad) caso não haja MP3 local
-def _embedded_tone(duration_ms=60000) -> AudioSegment:
-    from pydub.generators import Sine
-    base = Sine(440).to_audio_segment(duration=duration_ms).apply_gain(-18)
-    pad  = Sine(880).to_audio_segment(duration=duration_ms).apply_gain(-22)
-    return base.overlay(pad)
+def _embedded_tone(duration_ms=60000, sr=audio.MIX_RATE) -> np.ndarray:
+    t = np.arange(int(sr * duration_ms / 1000)) / sr
+    base = np.sin(2 * np.pi * 440 * t) * 10 ** (-18 / 20)
+    pad  = np.sin(2 * np.pi * 880 * t) * 10 ** (-22 / 20)
+    return (base + pad).astype(np.float32).reshape(-1, 1)
 
-def load_background_music(total_duration_ms: int) -> AudioSegment:
+def load_background_music(total_duration_ms: int, sr: int = audio.MIX_RATE, channels: int = 2) -> np.ndarray:
+    """Trilha float32 (n, canais) com exatamente total_duration_ms, em loop se for curta."""
     music_dir = os.getenv('MUSIC_DIR', 'python/assets/music').strip()
     candidates = []
     if os.path.isdir(music_dir):
@@ -18,12 +20,9 @@ def load_background_music(total_duration_ms: int) -> AudioSegment:
                 candidates.append(os.path.join(music_dir,f))
     if candidates:
         path = random.choice(candidates)
-        track = AudioSegment.from_file(path)
+        track = audio.decode_file(path, sr=sr, channels=channels)
     else:
-        track = _embedded_tone(total_duration_ms)
+        track = np.repeat(_embedded_tone(total_duration_ms, sr), channels, axis=1)
 
-    # Loop até cobrir toda a duração
-    out = AudioSegment.silent(duration=0)
-    while len(out) < total_duration_ms:
-        out += track
-    return out[:total_duration_ms]
+    # Loop até cobrir toda a duração (buffer único, sem concatenações)
+    return audio.loop(track, int(round(total_duration_ms * sr / 1000)))
@@ -1,6 +1,9 @@
 import os, io
 import boto3
 
+from core import ratelimit
+from core.audio_cache import default_cache
+
 # ==========================================================
 # Narração padrão para vídeos do TikTok (voz Camila - pt-BR)
 # ==========================================================
@@ -21,14 +24,15 @@ def get_polly():
     region = os.getenv('AWS_REGION', 'us-east-1')
     return boto3.client('polly', region_name=region)
 
-def synthesize(text: str, lang: str = DEFAULT_LANG, speech_rate: str = 'medium') -> bytes:
+def synthesize(text: str, lang: str = DEFAULT_LANG, speech_rate: str = 'medium',
+               output_format: str = 'mp3') -> bytes:
     """
-    Gera áudio MP3 via AWS Polly.
+    Gera áudio via AWS Polly (falas repetidas saem do cache em disco).
     - text: Texto a ser narrado (SSML seguro).
     - lang: Idioma (padrão pt-BR).
     - speech_rate: 'slow', 'medium' ou 'fast'.
+    - output_format: 'mp3' ou 'pcm' (s16le mono 16 kHz, sem decodificação).
     """
-    polly = get_polly()
     voice = VOICE_BY_LANG.get(lang, DEFAULT_VOICE)
 
     rate_map = {'slow': '85%', 'medium': '100%', 'fast': '115%'}
@@ -38,14 +42,20 @@ def synthesize(text: str, lang: str = DEFAULT_LANG, speech_rate: str = 'medium')
     # Monta parâmetros (só envia LanguageCode se existir)
     kwargs = dict(
         VoiceId=voice,
-        OutputFormat='mp3',
+        OutputFormat=output_format,
         TextType='ssml',
         Text=ssml,
     )
+    if output_format == 'pcm':
+        kwargs['SampleRate'] = '16000'
     lang_code = LANG_CODE_BY_LANG.get(lang)
     if lang_code:
         kwargs['LanguageCode'] = lang_code
 
-    # Chama o Polly com parâmetros válidos
-    resp = polly.synthesize_speech(**kwargs)
-    return resp['AudioStream'].read()
+    # Chama o Polly com parâmetros válidos (só em caso de miss no cache)
+    def _synth():
+        resp = ratelimit.call('polly', lambda: get_polly().synthesize_speech(**kwargs))
+        return resp['AudioStream'].read()
+
+    voice_key = f"{voice}:{lang_code}" if lang_code else voice
+    return default_cache().fetch(ssml, voice_key, 'standard', rate, output_format, _synth)
@@ -0,0 +1,94 @@
+import os, multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Iterable, Iterator, Tuple
+
+from core import encoder
+
+# Estimativa de memória por job de render (fundo decodificado + x264 1080x1920)
+JOB_MEM_MB = int(os.getenv("JOB_MEM_MB", "700"))
+
+
+def available_cores() -> int:
+    """Núcleos realmente disponíveis para o processo (respeita affinity/cgroups)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+
+def available_mem_mb() -> int:
+    """MemAvailable do /proc/meminfo; cai para a RAM física total."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return JOB_MEM_MB
+
+
+def cpu_budget(n_jobs: int, threads_per_job: int | None = None) -> Tuple[int, int]:
+    """Divide os núcleos entre workers x threads do encoder.
+
+    - threads_per_job: ENCODER_THREADS, senão as threads do perfil do host (core.encoder,
+      slideshow "still"), senão 2 (slideshow estático codifica pouco)
+    - workers: limitado por núcleos, memória (JOB_MEM_MB por job), nº de jobs e MAX_WORKERS
+    - núcleos que sobrarem voltam como threads extras do encoder
+    Retorna (workers, threads_por_job).
+    """
+    cores = available_cores()
+    threads = (threads_per_job or int(os.getenv("ENCODER_THREADS", "0"))
+               or encoder.load_profile().get("still", {}).get("threads") or 2)
+    threads = max(1, min(threads, cores))
+    by_cpu = max(1, cores // threads)
+    by_mem = max(1, available_mem_mb() // max(1, JOB_MEM_MB))
+    workers = max(1, min(by_cpu, by_mem, n_jobs, int(os.getenv("MAX_WORKERS", str(cores)))))
+    threads = max(threads, cores // workers)
+    return workers, threads
+
+
+def new_pool(workers: int) -> ProcessPoolExecutor | None:
+    """Pool reutilizável entre chamadas de run_jobs (None se workers=1).
+
+    Usa "spawn": seguro mesmo quando criado a partir de um processo com threads
+    (ex.: estágios da pipeline), ao contrário de fork.
+    """
+    if workers <= 1:
+        return None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def run_jobs(fn: Callable, jobs: Iterable[tuple], workers: int,
+             pool: ProcessPoolExecutor | None = None) -> Iterator[Tuple[tuple, object, Exception | None]]:
+    """Executa fn(*job) em paralelo e devolve (job, resultado, erro) na ordem em que terminam.
+
+    Com workers=1 roda no próprio processo (sem custo de spawn/pickle).
+    Sem `pool`, cria um temporário só para estes jobs.
+    """
+    jobs = list(jobs)
+    if workers <= 1:
+        for job in jobs:
+            try:
+                yield job, fn(*job), None
+            except Exception as e:
+                yield job, None, e
+        return
+
+    own = pool is None
+    pool = pool or new_pool(workers)
+    try:
+        futures = {pool.submit(fn, *job): job for job in jobs}
+        for fut in as_completed(futures):
+            job = futures[fut]
+            try:
+                yield job, fut.result(), None
+            except Exception as e:
+                # inclui BrokenProcessPool (worker morto por OOM, etc.)
+                yield job, None, e
+    finally:
+        if own:
+            pool.shutdown()
@@ -0,0 +1,112 @@
+import queue, threading, time, traceback
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List
+
+# Marca de fim de fluxo entre estágios
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """Estágio da pipeline: fn(item) -> item (ou None para descartar).
+
+    Métricas por estágio:
+      busy    — tempo executando fn (soma das threads)
+      starved — tempo esperando item do estágio anterior
+      blocked — tempo esperando vaga na fila seguinte (backpressure)
+    """
+    name: str
+    fn: Callable
+    workers: int = 1
+    items: int = 0
+    dropped: int = 0
+    errors: int = 0
+    busy: float = 0.0
+    starved: float = 0.0
+    blocked: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def _add(self, **kw):
+        with self._lock:
+            for k, v in kw.items():
+                setattr(self, k, getattr(self, k) + v)
+
+
+def _worker(stage: Stage, inbox: queue.Queue, outbox: queue.Queue | None, finished: list, n_alive: list):
+    while True:
+        t0 = time.perf_counter()
+        item = inbox.get()
+        stage._add(starved=time.perf_counter() - t0)
+        if item is _DONE:
+            inbox.put(_DONE)  # acorda as outras threads do mesmo estágio
+            break
+
+        t0 = time.perf_counter()
+        try:
+            out = stage.fn(item)
+        except Exception as e:
+            print(f"[pipeline] {stage.name} erro: {e}")
+            traceback.print_exc()
+            stage._add(busy=time.perf_counter() - t0, errors=1)
+            continue
+        stage._add(busy=time.perf_counter() - t0, items=1)
+
+        if out is None:
+            stage._add(dropped=1)
+            continue
+        t0 = time.perf_counter()
+        if outbox is not None:
+            outbox.put(out)
+        else:
+            finished.append(out)
+        stage._add(blocked=time.perf_counter() - t0)
+
+    # a última thread do estágio propaga o fim para o próximo
+    with stage._lock:
+        n_alive[0] -= 1
+        last = n_alive[0] == 0
+    if last and outbox is not None:
+        outbox.put(_DONE)
+
+
+def run_pipeline(source: Iterable, stages: List[Stage], maxsize: int = 1) -> list:
+    """Executa os estágios em threads ligadas por filas limitadas (maxsize).
+
+    Filas pequenas dão backpressure: um estágio lento segura os anteriores e a
+    memória fica estável (no máximo ~maxsize itens em trânsito por fila).
+    Retorna os itens que saíram do último estágio.
+    """
+    queues = [queue.Queue(maxsize=maxsize) for _ in stages]
+    finished: list = []
+    threads = []
+    for i, st in enumerate(stages):
+        outbox = queues[i + 1] if i + 1 < len(stages) else None
+        n_alive = [st.workers]
+        for _ in range(st.workers):
+            th = threading.Thread(target=_worker, args=(st, queues[i], outbox, finished, n_alive),
+                                  name=f"stage-{st.name}", daemon=True)
+            th.start()
+            threads.append(th)
+
+    for item in source:
+        queues[0].put(item)
+    queues[0].put(_DONE)
+
+    for th in threads:
+        # join com timeout para o Ctrl+C continuar funcionando no thread principal
+        while th.is_alive():
+            th.join(timeout=0.5)
+    return finished
+
+
+def report(stages: List[Stage], wall: float) -> str:
+    """Tabela de utilização por estágio; o de maior utilização é o gargalo."""
+    wall = max(wall, 1e-9)
+    rows = [f"{'estágio':<12}{'itens':>6}{'erros':>6}{'ocupado':>10}{'util':>7}{'ocioso':>9}{'bloq.':>9}"]
+    for st in stages:
+        util = st.busy / (wall * st.workers)
+        rows.append(f"{st.name:<12}{st.items:>6}{st.errors:>6}{st.busy:>9.1f}s{util:>6.0%}"
+                    f"{st.starved:>8.1f}s{st.blocked:>8.1f}s")
+    bottleneck = max(stages, key=lambda s: s.busy / s.workers)
+    rows.append(f"gargalo: {bottleneck.name} (parede {wall:.1f}s)")
+    return "\n".join(rows)
@@ -1,11 +1,15 @@
 import srt, datetime as dt
-from typing import List, Dict
+from typing import List, Dict, Optional
 
-def srt_from_timings(lines: List[str], timings_ms: List[int]) -> str:
-    """Gera SRT a partir de falas e duração por fala (ms)."""
+def srt_from_timings(lines: List[str], timings_ms: List[int], starts_ms: Optional[List[int]] = None) -> str:
+    """Gera SRT a partir de falas e duração por fala (ms).
+    Com starts_ms, cada fala começa no instante dado (pausas ficam sem legenda);
+    sem ele, as falas são encadeadas a partir de 0."""
     subs = []
     t = 0
     for i, (line, dur) in enumerate(zip(lines, timings_ms), start=1):
+        if starts_ms is not None:
+            t = starts_ms[i - 1]
         start = dt.timedelta(milliseconds=t)
         end = dt.timedelta(milliseconds=t+dur)
         subs.append(srt.Subtitle(index=i, start=start, end=end, content=line))
@@ -0,0 +1,4 @@
+import sys, pathlib
+
+# módulos do projeto (core/, tiktok.py...) importáveis sem instalar o pacote
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
@@ -0,0 +1,48 @@
+import os
+
+from core.assets import AssetStore
+
+
+def _store(tmp_path, budget):
+    store = AssetStore(tmp_path / "cache", budget_mb=0)
+    store.budget = budget
+    return store
+
+
+def test_pinned_blob_survives_lru_until_unpin(tmp_path):
+    store = _store(tmp_path, 2500)
+    pinned = store.put("a", os.urandom(1000))
+    assert store.pin("job-1", [pinned, str(tmp_path / "fora_do_armazem.jpg")]) == 1
+
+    others = [store.put(k, os.urandom(1000)) for k in "bcd"]
+
+    assert os.path.exists(pinned)                  # o mais antigo, mas fixado
+    assert not os.path.exists(others[0]) and not os.path.exists(others[1])
+    assert store.size() <= 2500 + 1000
+
+    store.budget = 1000
+    store.unpin("job-1")
+    assert not os.path.exists(pinned)              # sem pin: sai no LRU
+    assert store.size() <= 1000
+
+
+def test_replaced_pinned_blob_is_dropped_on_unpin(tmp_path):
+    store = _store(tmp_path, 10_000)
+    old = store.put("a", os.urandom(1000))
+    store.pin("job-1", [old])
+    new = store.put("a", os.urandom(1000))         # mesmo photo_id, conteúdo novo
+
+    assert os.path.exists(old) and os.path.exists(new)
+    store.unpin("job-1")
+    assert not os.path.exists(old) and os.path.exists(new)
+
+
+def test_release_pins_keeps_only_pending_owners(tmp_path):
+    store = _store(tmp_path, 10_000)
+    paths = [store.put(k, os.urandom(100)) for k in "ab"]
+    store.pin("pendente", [paths[0]])
+    store.pin("concluido", [paths[1]])
+    store.budget = 0
+
+    assert store.release_pins(lambda owner: owner == "pendente") == 1
+    assert os.path.exists(paths[0]) and not os.path.exists(paths[1])
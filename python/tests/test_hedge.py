@@ -0,0 +1,104 @@
+import json
+import threading
+import time
+
+import pytest
+
+from core import hedge, script_gen
+from core.hedge import LatencyStats, hedged_call
+
+_VALID = json.dumps({"language": "pt-BR", "blocks": [{"text": f"bloco {i}"} for i in range(6)]})
+
+
+def _stats(primary_secs=None):
+    """Histórico em memória; com primary_secs, o primário já tem amostras para o percentil."""
+    stats = LatencyStats(path=None)
+    for i in range(hedge.MIN_SAMPLES if primary_secs else 0):
+        stats.record("primario", primary_secs * (1 + i / 100))
+    return stats
+
+
+def _provider(delay, result=_VALID, error=None, log=None, name=None):
+    def fn():
+        if log is not None:
+            log.append((name, time.perf_counter()))
+        time.sleep(delay)
+        if error:
+            raise error
+        return result
+    return fn
+
+
+def _accept(content):
+    return script_gen._parse_script(content)
+
+
+def test_secondary_fires_only_after_percentile_deadline():
+    stats = _stats(primary_secs=0.15)
+    deadline = stats.deadline("primario", 90)
+    assert 0.15 <= deadline < 0.2
+
+    log = []
+    t0 = time.perf_counter()
+    name, _ = hedged_call(("primario", _provider(0.6, log=log, name="primario")),
+                          ("secundario", _provider(0.05, log=log, name="secundario")),
+                          _accept, deadline, stats, verbose=False)
+
+    assert name == "secundario"
+    started = dict(log)
+    assert started["secundario"] - t0 >= deadline * 0.95
+
+    # primário dentro do prazo: o secundário nem é chamado
+    log.clear()
+    name, _ = hedged_call(("primario", _provider(0.02, log=log, name="primario")),
+                          ("secundario", _provider(0.0, log=log, name="secundario")),
+                          _accept, deadline, stats, verbose=False)
+    assert name == "primario" and [n for n, _ in log] == ["primario"]
+
+
+def test_first_valid_response_wins_and_loser_is_ignored():
+    stats = _stats()
+    loser_done = threading.Event()
+    loser = json.dumps({"language": "pt-BR", "blocks": [{"text": "perdedor"}]})
+
+    def slow_primary():
+        time.sleep(0.4)
+        loser_done.set()
+        return loser
+
+    t0 = time.perf_counter()
+    name, script = hedged_call(("primario", slow_primary), ("secundario", _provider(0.02)),
+                               _accept, 0.05, stats, verbose=False)
+    elapsed = time.perf_counter() - t0
+
+    assert name == "secundario" and script["blocks"][0]["text"] == "bloco 0"
+    assert elapsed < 0.3 and not loser_done.is_set()    # não esperou o perdedor
+    assert loser_done.wait(1)                           # termina em segundo plano e é descartado
+
+
+def test_primary_error_or_invalid_response_fires_secondary_without_waiting():
+    stats = _stats()
+    for primary in (_provider(0.0, error=RuntimeError("ThrottlingException")),
+                    _provider(0.0, result="isto não é json")):
+        t0 = time.perf_counter()
+        name, _ = hedged_call(("primario", primary), ("secundario", _provider(0.01)),
+                              _accept, 5.0, stats, verbose=False)
+        assert name == "secundario" and time.perf_counter() - t0 < 1.0
+    assert stats._data["primario"]["errors"] == 1       # erro contado no histórico do primário
+
+
+def test_both_providers_failing_raises_last_error():
+    with pytest.raises(RuntimeError, match="openai fora"):
+        hedged_call(("primario", _provider(0.0, error=RuntimeError("bedrock fora"))),
+                    ("secundario", _provider(0.01, error=RuntimeError("openai fora"))),
+                    _accept, 5.0, _stats(), verbose=False)
+
+
+def test_generate_script_falls_back_when_hedged_providers_fail(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    monkeypatch.setattr(script_gen, "default_stats", lambda: _stats())
+    monkeypatch.setattr(script_gen, "_script_call", lambda provider, prompt: "sem json")
+
+    script = script_gen.generate_script(theme="foco", provider="bedrock", hedge=True)
+
+    assert script.get("fallback") and script["blocks"]
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from core import ratelimit
+from core.ratelimit import Limiter, QuotaExceeded
+
+
+class _Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class _HTTPError(Exception):
+    """Mesmo formato do requests.HTTPError (exc.response.status_code/headers)."""
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.response = _Response(status_code, headers)
+
+
+def _flaky(*errors):
+    """fn() que levanta os erros em ordem e depois devolve "ok"; conta as chamadas."""
+    pending = list(errors)
+    calls = []
+
+    def fn():
+        calls.append(time.monotonic())
+        if pending:
+            raise pending.pop(0)
+        return "ok"
+    return fn, calls
+
+
+def test_429_with_retry_after_pauses_service_and_halves_rate():
+    lim = Limiter("svc", rate=100, burst=100)
+    fn, calls = _flaky(_HTTPError(429, {"Retry-After": "0.2"}))
+    other = []
+
+    def _concurrent():
+        time.sleep(0.05)  # entra durante a pausa
+        lim.acquire()
+        other.append(time.monotonic())
+
+    t = threading.Thread(target=_concurrent)
+    t.start()
+    assert lim.call(fn) == "ok"
+    t.join()
+
+    assert len(calls) == 2 and calls[1] - calls[0] >= 0.19
+    assert other[0] - calls[0] >= 0.19          # a pausa vale para o serviço inteiro
+    s = lim.stats()
+    assert s["throttled"] == 1
+    assert s["rate"] == pytest.approx(100 / 2 + 100 * ratelimit.RECOVERY)  # metade + um sucesso
+
+
+def test_rate_recovers_gradually_after_successes():
+    lim = Limiter("svc", rate=1000, burst=1000)
+    lim.on_throttle(retry_after=0)
+    lim.on_throttle(retry_after=0)
+    assert lim.rate == pytest.approx(250)
+
+    steps = 0
+    while lim.rate < lim.base_rate:
+        lim.on_success()
+        steps += 1
+    assert steps == 15                           # 5% do ritmo base por sucesso
+    lim.on_success()
+    assert lim.rate == lim.base_rate             # não passa do base
+
+
+def test_quota_exceeded_without_calling_the_api():
+    lim = Limiter("svc", rate=1000, burst=10, budget=2)
+    fn, calls = _flaky()
+    assert lim.call(fn) == "ok" and lim.call(fn) == "ok"
+    with pytest.raises(QuotaExceeded):
+        lim.call(fn)
+    assert len(calls) == 2
+
+
+def test_non_throttling_errors_pass_through_unchanged():
+    lim = Limiter("svc", rate=1000, burst=10)
+    err = _HTTPError(500)
+    fn, calls = _flaky(err)
+    with pytest.raises(_HTTPError) as info:
+        lim.call(fn)
+    assert info.value is err and len(calls) == 1
+    s = lim.stats()
+    assert s["errors"] == 1 and s["throttled"] == 0 and s["rate"] == 1000
+
+
+def test_env_rate_zero_is_unlimited_and_negative_is_rejected(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_SVC", "0")
+    lim = ratelimit._from_env("svc")
+    t0 = time.monotonic()
+    for _ in range(50):
+        lim.acquire()
+    assert time.monotonic() - t0 < 0.5 and lim.calls == 50
+
+    monkeypatch.setenv("RATE_LIMIT_SVC", "-1")
+    with pytest.raises(ValueError):
+        ratelimit._from_env("svc")
@@ -0,0 +1,64 @@
+"""core.render: reamostragem em ponto fixo contra uma bilinear em float64 e lista do concat."""
+import numpy as np
+import pytest
+
+from core.render import ken_burns_crops, iter_slideshow, _concat_list
+
+SRC_W, SRC_H = 120, 200
+OUT = (90, 160)
+
+
+def _float_bilinear(img, crop, size):
+    """Mesmo mapeamento half-pixel do _axis_taps, sem quantizar os pesos."""
+    x0, y0, cw, ch = crop
+    w, h = size
+
+    def axis(start, length, out_len, src_len):
+        pos = np.clip(start + (np.arange(out_len) + 0.5) * (length / out_len) - 0.5, 0, src_len - 1)
+        i0 = np.floor(pos).astype(int)
+        return i0, np.minimum(i0 + 1, src_len - 1), pos - i0
+
+    ya, yb, wy = axis(y0, ch, h, img.shape[0])
+    xa, xb, wx = axis(x0, cw, w, img.shape[1])
+    f = img.astype(np.float64)
+    rows = f[ya] + (f[yb] - f[ya]) * wy[:, None, None]
+    return rows[:, xa] + (rows[:, xb] - rows[:, xa]) * wx[None, :, None]
+
+
+# tolerância: pesos de 7 bits + arredondamento da passada de linhas (antes do fix: até 254)
+def _max_error(img, zoom=1.3, secs=0.5, fps=10):
+    frames = np.concatenate(list(iter_slideshow([(img, secs, zoom)], fps=fps, size=OUT, workers=1)))
+    times = np.arange(len(frames)) / fps
+    crops = ken_burns_crops(times, secs, zoom=zoom, size=(SRC_W, SRC_H))
+    return max(np.abs(frames[i].astype(np.float64) - _float_bilinear(img, c, OUT)).max()
+               for i, c in enumerate(crops))
+
+
+def test_high_contrast_lines():
+    img = np.zeros((SRC_H, SRC_W, 3), dtype=np.uint8)
+    img[::7] = 255
+    img[:, ::5] = 255
+    assert _max_error(img) <= 3
+
+
+def test_random_binary_image():
+    rng = np.random.default_rng(0)
+    img = (rng.integers(0, 2, size=(SRC_H, SRC_W, 3)) * 255).astype(np.uint8)
+    assert _max_error(img) <= 3
+
+
+def test_concat_list_holds_each_image_and_closes_at_total():
+    lines = _concat_list(["a.bmp", "b.bmp"], [2.0, 2.0], 3.0, fps=10).splitlines()
+    assert lines == ["ffconcat version 1.0", "file 'a.bmp'", "duration 2.000000",
+                     "file 'b.bmp'", "duration 0.900000", "file 'b.bmp'"]
+
+
+def test_concat_list_shorter_than_one_frame_is_a_single_frame():
+    for total in (0.0, 0.02, 1 / 30):
+        assert _concat_list(["a.bmp", "b.bmp"], [1.0, 1.0], total, fps=30).splitlines() == \
+            ["ffconcat version 1.0", "file 'a.bmp'"]
+
+
+def test_concat_list_without_frames_is_a_clear_error():
+    with pytest.raises(ValueError):
+        _concat_list([], [], 3.0)
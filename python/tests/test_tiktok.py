@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+import tiktok
+from tiktok_stub import StubTikTok
+
+CHUNK = 64 * 1024
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = StubTikTok(put_delay=0.05, processing_polls=2).start()
+    monkeypatch.setattr(tiktok, "BASE", server.base)
+    monkeypatch.setattr(tiktok, "ENABLE", True)
+    monkeypatch.setattr(tiktok, "TOKEN", "token")
+    monkeypatch.setattr(tiktok, "OPEN_ID", "open-id")
+    # partes pequenas e sem espera real entre tentativas/consultas
+    monkeypatch.setattr(tiktok, "MIN_CHUNK", CHUNK)
+    monkeypatch.setattr(tiktok, "CHUNK_SIZE", CHUNK)
+    monkeypatch.setattr(tiktok, "RETRY_BACKOFF", 0.0)
+    monkeypatch.setattr(tiktok, "STATUS_INTERVAL", 0.0)
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(os.urandom(5 * CHUNK + 1234))  # 5 partes, a última absorve o resto
+    return path
+
+
+def test_concurrent_chunks_with_retry_and_status_poll(stub, video):
+    stub.fail_once = {2}
+
+    res = tiktok.upload_draft_file(str(video), "título", workers=3)
+
+    assert res["sent"] and res["status"] == "SEND_TO_USER_INBOX"
+    assert stub.inits == 1
+    assert stub.max_inflight >= 2
+    assert stub.puts == {0: 1, 1: 1, 2: 2, 3: 1, 4: 1}
+    assert stub.polls[res["publish_id"]] == 3
+    assert stub.video(res["publish_id"]) == video.read_bytes()
+
+
+def test_interrupted_upload_resumes_pending_chunks(stub, video):
+    stub.fail_always = {3}
+
+    first = tiktok.upload_draft_file(str(video), "título", workers=3)
+
+    assert not first["sent"] and first["resumable"]
+    assert sorted(tiktok._State(str(video)).data["done"]) == [0, 1, 2, 4]
+
+    stub.fail_always.clear()
+    stub.puts.clear()
+    second = tiktok.upload_draft_file(str(video), "título", workers=3)
+
+    assert second["sent"] and second["publish_id"] == first["publish_id"]
+    assert stub.inits == 1
+    assert stub.puts == {3: 1}
+    assert stub.video(second["publish_id"]) == video.read_bytes()
+
+    # concluído: nova chamada não reenvia nada
+    third = tiktok.upload_draft_file(str(video), "título")
+    assert third["resumed"] and stub.inits == 1
+
+
+def test_rewritten_file_starts_over(stub, video):
+    first = tiktok.upload_draft_file(str(video), "título")
+    assert first["sent"]
+
+    video.write_bytes(os.urandom(3 * CHUNK))
+    second = tiktok.upload_draft_file(str(video), "título")
+
+    assert second["sent"] and not second.get("resumed")
+    assert stub.inits == 2 and second["publish_id"] != first["publish_id"]
+    assert stub.video(second["publish_id"]) == video.read_bytes()
@@ -1,30 +1,216 @@
-import os, requests, mimetypes
+import os, json, time, mmap, pathlib, threading, argparse
+from concurrent.futures import ThreadPoolExecutor
+import requests
 
 TOKEN = os.getenv("TIKTOK_ACCESS_TOKEN")
 OPEN_ID = os.getenv("TIKTOK_OPEN_ID")
 ENABLE = os.getenv("ENABLE_TIKTOK_UPLOAD", "false").lower() == "true"
 
-BASE = "https://open.tiktokapis.com/v2"
+BASE = os.getenv("TIKTOK_API_BASE", "https://open.tiktokapis.com/v2")
 
-def upload_draft_file(mp4_path:str, title:str, hashtags:list[str]|None=None):
-    """Placeholder de envio. Alguns apps usam fluxo init->upload->publish.
-    Aqui deixamos um esqueleto de "multipart" (pode mudar conforme aprovação do app).
+# Fluxo init -> upload em partes (PUT com Content-Range) -> status da publicação
+MIN_CHUNK = 5 * 1024 * 1024
+MAX_CHUNK = 64 * 1024 * 1024
+CHUNK_SIZE = int(os.getenv("TIKTOK_CHUNK_MB", "10")) * 1024 * 1024
+UPLOAD_WORKERS = int(os.getenv("TIKTOK_UPLOAD_WORKERS", "3"))  # 1 = partes estritamente em ordem
+CHUNK_RETRIES = 4
+RETRY_BACKOFF = 0.5  # s; dobra a cada tentativa
+STATUS_POLLS = 10
+STATUS_INTERVAL = 3.0
+_IN_PROGRESS = {"PROCESSING_UPLOAD", "PROCESSING_DOWNLOAD"}
+STATE_TTL = 50 * 60  # upload_url vale ~1h; estado mais velho reinicia o upload
+
+def _headers():
+    return {"Authorization": f"Bearer {TOKEN}", "Content-Type": "application/json; charset=UTF-8"}
+
+def _plan_chunks(size: int, chunk_size: int | None = None):
+    """(chunk_size, total) nas regras da API: partes de 5–64 MB, a última absorve o resto;
+    arquivos menores que 5 MB vão numa parte só."""
+    if size < MIN_CHUNK:
+        return size, 1
+    chunk_size = max(MIN_CHUNK, min(MAX_CHUNK, chunk_size or CHUNK_SIZE, size))
+    return chunk_size, max(1, size // chunk_size)
+
+def _chunk_range(i: int, chunk_size: int, total: int, size: int):
+    start = i * chunk_size
+    end = size if i == total - 1 else start + chunk_size
+    return start, end
+
+class _State:
+    """Estado do upload em <mp4>.upload.json (retomada após interrupção)."""
+    def __init__(self, mp4_path: str):
+        self.path = pathlib.Path(f"{mp4_path}.upload.json")
+        self._lock = threading.Lock()
+        try:
+            self.data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.data = {}
+
+    def matches(self, size: int, mtime: float) -> bool:
+        """O estado é deste arquivo (não de um MP4 regravado com o mesmo nome)?"""
+        return self.data.get("size") == size and self.data.get("mtime") == mtime
+
+    def valid_for(self, size: int, mtime: float) -> bool:
+        return (self.matches(size, mtime) and self.data.get("upload_url")
+                and time.time() - self.data.get("created_at", 0) < STATE_TTL)
+
+    def _write_locked(self):
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self.data), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def save(self, **kw):
+        with self._lock:
+            self.data.update(kw)
+            self._write_locked()
+
+    def mark_done(self, i: int):
+        # ler-alterar-gravar numa só posse do lock: partes concluídas juntas não se perdem
+        with self._lock:
+            self.data["done"] = sorted(set(self.data.get("done", [])) | {i})
+            self._write_locked()
+
+def _init_upload(session, size: int, chunk_size: int, total: int):
+    r = session.post(f"{BASE}/post/publish/inbox/video/init/", headers=_headers(), timeout=30, json={
+        "source_info": {
+            "source": "FILE_UPLOAD",
+            "video_size": size,
+            "chunk_size": chunk_size,
+            "total_chunk_count": total,
+        }
+    })
+    r.raise_for_status()
+    data = r.json().get("data") or {}
+    return data["publish_id"], data["upload_url"]
+
+def _put_chunk(session, url: str, mm, i: int, chunk_size: int, total: int, size: int):
+    """PUT de uma parte direto do mmap, com novas tentativas só desta parte."""
+    start, end = _chunk_range(i, chunk_size, total, size)
+    headers = {
+        "Content-Type": "video/mp4",
+        "Content-Length": str(end - start),
+        "Content-Range": f"bytes {start}-{end - 1}/{size}",
+    }
+    for attempt in range(CHUNK_RETRIES):
+        try:
+            # view liberada ao sair: o mmap pode ser fechado mesmo com exceções guardadas
+            with memoryview(mm)[start:end] as body:
+                r = session.put(url, data=body, headers=headers, timeout=120)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == CHUNK_RETRIES - 1:
+                raise
+        else:
+            if r.status_code < 500 and r.status_code != 429:
+                r.raise_for_status()  # 4xx não adianta repetir agora
+                return
+        time.sleep(RETRY_BACKOFF * 2 ** attempt)
+    raise RuntimeError(f"parte {i + 1}/{total} falhou após {CHUNK_RETRIES} tentativas")
+
+def fetch_status(publish_id: str, session=None):
+    s = session or requests.Session()
+    r = s.post(f"{BASE}/post/publish/status/fetch/", headers=_headers(), timeout=30,
+               json={"publish_id": publish_id})
+    r.raise_for_status()
+    return r.json().get("data") or {}
+
+def _await_status(publish_id: str, session):
+    """Consulta o status até sair de PROCESSING_* (no máximo STATUS_POLLS vezes)."""
+    for attempt in range(STATUS_POLLS):
+        status = fetch_status(publish_id, session)
+        if status.get("status") not in _IN_PROGRESS:
+            break
+        if attempt < STATUS_POLLS - 1:
+            time.sleep(STATUS_INTERVAL)
+    return status
+
+def upload_draft_file(mp4_path:str, title:str, hashtags:list[str]|None=None, workers:int = UPLOAD_WORKERS):
+    """Envia o vídeo como rascunho (inbox) pelo fluxo init -> partes -> status.
+
+    - partes lidas do arquivo via mmap (sem carregar o MP4 inteiro), várias em paralelo
+    - só as partes que falharem são reenviadas; o estado fica em <mp4>.upload.json,
+      então uma nova chamada retoma de onde parou (enquanto o upload_url valer)
     Se ENABLE=false ou faltarem credenciais, apenas retorna sem enviar.
+    O título vai no app (fluxo de rascunho); title/hashtags ficam no resultado.
     """
     if not ENABLE or not TOKEN or not OPEN_ID:
         return {"sent": False, "reason": "upload desativado ou credenciais ausentes", "file": mp4_path}
-    # Exemplo ilustrativo (pode variar conforme seu app):
-    headers = {"Authorization": f"Bearer {TOKEN}"}
-    files = {"video": (os.path.basename(mp4_path), open(mp4_path, 'rb'), 'video/mp4')}
-    data = {
-        "open_id": OPEN_ID,
-        "title": title[:220],
-    }
-    # Endpoint real pode ser diferente dependendo do modo (draft/direct). Ajuste conforme sua aprovação.
-    url = f"{BASE}/post/publish/inspection/"  # rascunho/inspeção ilustrativo
-    r = requests.post(url, headers=headers, files=files, data=data, timeout=120)
+
+    st = os.stat(mp4_path)
+    size = st.st_size
+    state = _State(mp4_path)
+    # "completed" só vale para o mesmo arquivo; MP4 regravado => upload novo
+    if state.data.get("completed") and state.matches(size, st.st_mtime):
+        return {"sent": True, "file": mp4_path, "publish_id": state.data["publish_id"], "resumed": True}
+
+    session = requests.Session()
     try:
-        r.raise_for_status()
-        return r.json()
+        if state.valid_for(size, st.st_mtime):
+            publish_id, url = state.data["publish_id"], state.data["upload_url"]
+            chunk_size, total = state.data["chunk_size"], state.data["total"]
+        else:
+            chunk_size, total = _plan_chunks(size)
+            publish_id, url = _init_upload(session, size, chunk_size, total)
+            state.data = {}
+            state.save(publish_id=publish_id, upload_url=url, size=size, mtime=st.st_mtime,
+                       chunk_size=chunk_size, total=total, done=[], created_at=time.time())
+
+        pending = [i for i in range(total) if i not in set(state.data.get("done", []))]
+        errors = []
+        with open(mp4_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            def _one(i):
+                try:
+                    _put_chunk(session, url, mm, i, chunk_size, total, size)
+                    state.mark_done(i)
+                except Exception as e:
+                    errors.append((i, e))
+
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending) or 1))) as pool:
+                list(pool.map(_one, pending))
+
+        if errors:
+            return {"sent": False, "file": mp4_path, "publish_id": publish_id, "resumable": True,
+                    "error": f"{len(errors)}/{total} parte(s) falharam: {errors[0][1]}"}
+
+        status = _await_status(publish_id, session)
+        if status.get("status") == "FAILED":
+            state.data = {}  # publicação recusada: a próxima chamada recomeça do init
+            state.save()
+            return {"sent": False, "file": mp4_path, "publish_id": publish_id,
+                    "error": f"publicação falhou: {status.get('fail_reason')}"}
+        state.save(completed=True, status=status.get("status"))
+        return {"sent": True, "file": mp4_path, "publish_id": publish_id, "status": status.get("status"),
+                "title": title[:220], "hashtags": hashtags or []}
     except Exception as e:
-        return {"sent": False, "error": str(e), "status": getattr(r, 'status_code', None), "text": r.text[:500]}
+        return {"sent": False, "file": mp4_path, "error": str(e)}
+    finally:
+        session.close()
+
+def upload_day(day_dir: str, workers: int = 2, chunk_workers: int = UPLOAD_WORKERS):
+    """Envia todos os MP4 de um diretório (ex.: output/2025-01-31), no máximo `workers` por vez.
+    Vídeos já concluídos (estado "completed") não são reenviados."""
+    files = sorted(p for p in pathlib.Path(day_dir).rglob("*.mp4") if not p.name.endswith(".part.mp4"))
+    if not files:
+        return []
+
+    def _one(p):
+        res = upload_draft_file(str(p), p.stem.replace("-", " ").replace("_", " "), workers=chunk_workers)
+        mark = "✓" if res.get("sent") else "✗"
+        print(f"[tiktok] {mark} {p.name}" + ("" if res.get("sent") else f": {res.get('error') or res.get('reason')}"))
+        return res
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(files)))) as pool:
+        results = list(pool.map(_one, files))
+    print(f"[tiktok] {sum(1 for r in results if r.get('sent'))}/{len(results)} vídeo(s) enviados")
+    return results
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Upload de vídeos para o TikTok (rascunho)")
+    ap.add_argument("path", help="arquivo .mp4 ou diretório de um dia (ex.: output/2025-01-31)")
+    ap.add_argument("--workers", type=int, default=2, help="vídeos em paralelo (modo diretório)")
+    ap.add_argument("--chunk-workers", type=int, default=UPLOAD_WORKERS, help="partes em paralelo por vídeo")
+    args = ap.parse_args()
+    if os.path.isdir(args.path):
+        upload_day(args.path, workers=args.workers, chunk_workers=args.chunk_workers)
+    else:
+        print(json.dumps(upload_draft_file(args.path, pathlib.Path(args.path).stem, workers=args.chunk_workers),
+                         ensure_ascii=False))
@@ -0,0 +1,172 @@
+"""Servidor de mentira da Content Posting API do TikTok (init -> PUT das partes -> status).
+
+Sem rede nem credenciais: remonta o vídeo em memória e deixa injetar falhas para
+exercitar tiktok.py (retentativa de parte, retomada após interrupção, polling de status).
+
+- POST /v2/post/publish/inbox/video/init/   -> publish_id + upload_url
+- PUT  /upload/<publish_id>                 -> grava a parte indicada no Content-Range
+- POST /v2/post/publish/status/fetch/       -> PROCESSING_UPLOAD até chegar tudo
+                                               (e pelas `processing_polls` primeiras consultas)
+
+Falhas: `fail_once` (índices de parte que recebem um 503 na primeira vez) e
+`fail_always` (503 enquanto o índice estiver no conjunto).
+
+Uso:
+    python tiktok_stub.py --port 8765
+    TIKTOK_API_BASE=http://127.0.0.1:8765/v2 ENABLE_TIKTOK_UPLOAD=true \\
+        TIKTOK_ACCESS_TOKEN=x TIKTOK_OPEN_ID=x python tiktok.py output/2025-01-31
+"""
+import argparse, json, re, threading, time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+class StubTikTok:
+    def __init__(self, host="127.0.0.1", port=0, put_delay=0.0, processing_polls=0):
+        self.put_delay = put_delay
+        self.processing_polls = processing_polls
+        self.fail_once, self.fail_always = set(), set()
+        self.inits = 0
+        self.puts = Counter()       # índice da parte -> PUTs recebidos (inclui os com falha)
+        self.polls = Counter()      # publish_id -> consultas de status
+        self.uploads = {}           # publish_id -> {"size", "chunk_size", "total", "data", "got"}
+        self.inflight = self.max_inflight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v2"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def video(self, publish_id):
+        """Bytes recebidos até agora (bytes(...) do buffer remontado)."""
+        return bytes(self.uploads[publish_id]["data"])
+
+    # --- handlers -----------------------------------------------------------------
+
+    def _init(self, body):
+        info = body.get("source_info") or {}
+        with self._lock:
+            self.inits += 1
+            publish_id = f"v_inbox_file~stub.{self.inits}"
+            self.uploads[publish_id] = {
+                "size": info["video_size"], "chunk_size": info["chunk_size"],
+                "total": info["total_chunk_count"], "data": bytearray(info["video_size"]), "got": set(),
+            }
+        host, port = self._server.server_address[:2]
+        return 200, {"data": {"publish_id": publish_id, "upload_url": f"http://{host}:{port}/upload/{publish_id}"},
+                     "error": {"code": "ok"}}
+
+    def _put(self, publish_id, content_range, payload):
+        up = self.uploads.get(publish_id)
+        m = _RANGE.fullmatch(content_range or "")
+        if up is None or m is None:
+            return 400, {"error": {"code": "invalid_params"}}
+        start, end, size = (int(g) for g in m.groups())
+        i = min(start // up["chunk_size"], up["total"] - 1)
+        last = i == up["total"] - 1
+        expected_end = up["size"] if last else start + up["chunk_size"]
+        if size != up["size"] or start != i * up["chunk_size"] or end + 1 != expected_end or len(payload) != end + 1 - start:
+            return 416, {"error": {"code": "range_mismatch"}}
+        with self._lock:
+            self.puts[i] += 1
+            if i in self.fail_always or i in self.fail_once:
+                self.fail_once.discard(i)
+                return 503, {"error": {"code": "internal_error"}}
+            up["data"][start:end + 1] = payload
+            up["got"].add(i)
+            done = len(up["got"]) == up["total"]
+        return (201 if done else 206), {}
+
+    def _status(self, body):
+        publish_id = body.get("publish_id")
+        up = self.uploads.get(publish_id)
+        if up is None:
+            return 404, {"error": {"code": "invalid_publish_id"}}
+        with self._lock:
+            self.polls[publish_id] += 1
+            ready = len(up["got"]) == up["total"] and self.polls[publish_id] > self.processing_polls
+        return 200, {"data": {"status": "SEND_TO_USER_INBOX" if ready else "PROCESSING_UPLOAD"},
+                     "error": {"code": "ok"}}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, code, obj):
+                data = json.dumps(obj).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _body(self):
+                return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+            def do_POST(self):
+                body = self._body()
+                if not (self.headers.get("Authorization") or "").startswith("Bearer "):
+                    return self._reply(401, {"error": {"code": "access_token_invalid"}})
+                body = json.loads(body or b"{}")
+                if self.path == "/v2/post/publish/inbox/video/init/":
+                    return self._reply(*stub._init(body))
+                if self.path == "/v2/post/publish/status/fetch/":
+                    return self._reply(*stub._status(body))
+                self._reply(404, {"error": {"code": "not_found"}})
+
+            def do_PUT(self):
+                with stub._lock:
+                    stub.inflight += 1
+                    stub.max_inflight = max(stub.max_inflight, stub.inflight)
+                try:
+                    payload = self._body()
+                    time.sleep(stub.put_delay)
+                    if not self.path.startswith("/upload/"):
+                        return self._reply(404, {"error": {"code": "not_found"}})
+                    self._reply(*stub._put(self.path[len("/upload/"):], self.headers.get("Content-Range"), payload))
+                finally:
+                    with stub._lock:
+                        stub.inflight -= 1
+
+        return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--put-delay", type=float, default=0.0, help="latência artificial por PUT (s)")
+    ap.add_argument("--processing-polls", type=int, default=1, help="consultas em PROCESSING_UPLOAD")
+    ap.add_argument("--fail-once", default="", help="índices de parte com um 503 na primeira vez (ex.: 1,3)")
+    args = ap.parse_args()
+
+    stub = StubTikTok(port=args.port, put_delay=args.put_delay, processing_polls=args.processing_polls)
+    stub.fail_once = {int(x) for x in args.fail_once.split(",") if x}
+    print(f"[stub] TIKTOK_API_BASE={stub.base}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,17 @@
-import os
-from typing import Dict
+# translate.py
+# Tradução via Google Cloud Translate (v2)
+# - Cliente único por processo (criado na primeira chamada)
+# - translate_batch: várias linhas x vários idiomas, linhas repetidas enviadas uma vez,
+#   lotes de até MAX_SEGMENTS trechos / MAX_CHARS caracteres por requisição
+# - Memória de tradução em disco (core.translation_memory) consultada antes da rede
+# - Requisições no ritmo de core.ratelimit (429 pausa e repete o lote, em vez de perdê-lo)
+# - Sem credenciais (ou em erro), devolve o próprio texto, como antes
+
+import os, threading
+from typing import Dict, List, Iterable
+
+from core import ratelimit
+from core.translation_memory import default_tm
 
 LANGS = {
     "pt": "Portuguese",
@@ -11,11 +23,70 @@ LANGS = {
     "zh": "Chinese (Simplified)",
 }
 
+# Limites do translate_v2: 128 trechos por requisição; tamanho total conservador
+MAX_SEGMENTS = 128
+MAX_CHARS = int(os.getenv("TRANSLATE_MAX_CHARS", "5000"))
+
+PROVIDER = "google-v2"
+
+_client = None
+_client_lock = threading.Lock()
+
+def _get_client():
+    """Cliente translate_v2 compartilhado; None se a lib/credenciais não estiverem disponíveis."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            try:
+                from google.cloud import translate_v2 as translate
+                _client = translate.Client()
+            except Exception:
+                return None
+        return _client
+
+def _chunks(texts: List[str]) -> Iterable[List[str]]:
+    batch, size = [], 0
+    for t in texts:
+        if batch and (len(batch) >= MAX_SEGMENTS or size + len(t) > MAX_CHARS):
+            yield batch
+            batch, size = [], 0
+        batch.append(t)
+        size += len(t)
+    if batch:
+        yield batch
+
+def translate_batch(texts: List[str], targets: Iterable[str], source: str = "auto") -> Dict[str, List[str]]:
+    """Traduz todas as linhas para cada idioma: {idioma: [linhas traduzidas]} na ordem de entrada.
+
+    Linhas idênticas vão uma vez só e as já conhecidas saem da memória de tradução;
+    o resto usa o mínimo de requisições por idioma.
+    Um lote que falhar mantém o texto original só naquele lote (e não é memorizado).
+    """
+    targets = list(dict.fromkeys(targets))
+    unique = list(dict.fromkeys(t for t in texts if t and t.strip()))
+    tm = default_tm()
+
+    out = {}
+    for target in targets:
+        done = tm.lookup(unique, source, target, PROVIDER) if unique else {}
+        missing = [t for t in unique if t not in done]
+        client = _get_client() if missing else None
+        if client is not None:
+            fresh = {}
+            for batch in _chunks(missing):
+                try:
+                    res = ratelimit.call("translate", lambda: client.translate(
+                        batch, target_language=target,
+                        source_language=None if source == "auto" else source))
+                    fresh.update((src, r["translatedText"]) for src, r in zip(batch, res))
+                except Exception:
+                    pass
+            if fresh:
+                tm.store(fresh, source, target, PROVIDER)
+            done.update(fresh)
+        out[target] = [done.get(t, t) for t in texts]
+    return out
+
 def translate_text(text: str, target: str) -> str:
     # Tenta Google Cloud; se não houver chave, retorna o próprio texto.
-    try:
-        from google.cloud import translate_v2 as translate
-        client = translate.Client()
-        return client.translate(text, target_language=target)["translatedText"]
-    except Exception:
-        return text
+    return translate_batch([text], [target])[target][0]
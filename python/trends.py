@@ -1,5 +1,50 @@
-import os
-from typing import List, Dict
+import os, json, time, pathlib, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Iterable
+
+from core import ratelimit
+
+# Respostas cruas do SerpApi em cache por (engine, geo), válidas por TRENDS_CACHE_TTL segundos
+CACHE_DIR = pathlib.Path(__file__).parent / "output" / "trends_cache"
+CACHE_TTL = int(os.getenv("TRENDS_CACHE_TTL", "3600"))
+_cache_lock = threading.Lock()
+
+def _cache_path(engine: str, geo: str) -> pathlib.Path:
+    return pathlib.Path(os.getenv("TRENDS_CACHE_DIR", str(CACHE_DIR))) / f"{engine}_{geo}.json"
+
+def _serpapi_get(params: Dict, ttl: int | None = None) -> Dict:
+    """GoogleSearch(params).get_dict() com cache em disco por (engine, geo).
+
+    Só respostas sem "error" são gravadas; ttl=0 força a chamada.
+    """
+    from serpapi import GoogleSearch
+
+    ttl = CACHE_TTL if ttl is None else ttl
+    path = _cache_path(params["engine"], params.get("geo", ""))
+    try:
+        entry = json.loads(path.read_text(encoding="utf-8"))
+        if time.time() - entry["fetched_at"] <= ttl:
+            print(f"[trends] cache: {params['engine']} {params.get('geo', '')}")
+            return entry["response"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    def _search():
+        out = GoogleSearch(params).get_dict() or {}
+        err = str(out.get("error", "")).lower()
+        if any(w in err for w in ("rate", "limit", "too many")):
+            raise ratelimit.Throttled(f"serpapi: {out['error']}")
+        return out
+
+    # só chamadas de rede contam no ritmo/orçamento (QUOTA_SERPAPI = créditos por execução)
+    data = ratelimit.call("serpapi", _search)
+    if data and "error" not in data:
+        with _cache_lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(json.dumps({"fetched_at": time.time(), "response": data}), encoding="utf-8")
+            os.replace(tmp, path)
+    return data
 
 def _serpapi_daily_trends(limit: int, region: str) -> List[Dict]:
     """Usa SerpApi (pacote google-search-results) com engine google_trends."""
@@ -23,8 +68,7 @@ def _serpapi_daily_trends(limit: int, region: str) -> List[Dict]:
     }
     
     try:
-        search = GoogleSearch(params)
-        data = search.get_dict() or {}
+        data = _serpapi_get(params)
         
         out: List[Dict] = []
         
@@ -107,7 +151,7 @@ def _serpapi_realtime_trends(limit: int, region: str) -> List[Dict]:
     }
     
     try:
-        data = GoogleSearch(params).get_dict() or {}
+        data = _serpapi_get(params)
         out: List[Dict] = []
         
         for item in data.get("trending_searches", [])[:limit]:
@@ -192,3 +236,32 @@ def top_topics_week(limit: int = 20, region: str | None = None) -> List[Dict]:
     print(f"[trends] Usando tópicos backup para {region}")
     backup = _get_backup_topics(limit, region)
     return backup
+
+def top_topics_multi(regions: Iterable[str], limit: int = 20) -> List[Dict]:
+    """Tendências de várias regiões em paralelo, intercaladas e sem duplicatas.
+
+    Cada região segue a mesma cadeia de top_topics_week (realtime -> daily -> backup);
+    o resultado alterna entre regiões (1º de cada, 2º de cada, ...) para manter o
+    ranking de todas, deduplica pelo título em minúsculas e marca "region".
+    """
+    regions = [r.strip().upper() for r in regions if r and r.strip()]
+    regions = list(dict.fromkeys(regions))
+    if not regions:
+        return []
+
+    with ThreadPoolExecutor(max_workers=len(regions)) as pool:
+        per_region = list(pool.map(lambda r: top_topics_week(limit=limit, region=r), regions))
+
+    seen = set()
+    merged: List[Dict] = []
+    for rank in range(max((len(items) for items in per_region), default=0)):
+        for region, items in zip(regions, per_region):
+            if rank >= len(items):
+                continue
+            t = items[rank]
+            k = (t.get("title") or "").lower()
+            if k and k not in seen:
+                seen.add(k)
+                merged.append({**t, "region": region})
+    print(f"[trends] {len(merged)} tópicos únicos de {len(regions)} região(ões)")
+    return merged[:limit]
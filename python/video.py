@@ -1,8 +1,13 @@
 from PIL import Image, ImageDraw, ImageFont
 from moviepy.editor import ImageClip, concatenate_videoclips
 import requests, io, os, textwrap, pathlib
+from dataclasses import dataclass
+from functools import lru_cache
 import numpy as np
 
+from core import encoder
+from core.render import render_stills
+
 W, H, DUR = 1080, 1920, 60
 
 def _download_or_load(source: str) -> bytes:
@@ -22,6 +27,7 @@ def _download_or_load(source: str) -> bytes:
 
     raise FileNotFoundError(f"Imagem não encontrada: {source}")
 
+@lru_cache(maxsize=8)
 def _load_font(size: int = 54) -> ImageFont.ImageFont:
     """Tenta carregar uma fonte TrueType; cai para a padrão se não encontrar."""
     for path in (
@@ -35,18 +41,40 @@ def _load_font(size: int = 54) -> ImageFont.ImageFont:
             pass
     return ImageFont.load_default()
 
-def _captioned_image(img_bytes: bytes, text: str) -> Image.Image:
-    """Cria imagem (W x H) com legenda em caixa semitransparente na base."""
+# Caixa de legenda (semitransparente) na base do quadro
+PAD = 32
+BOX_H = 300
+BOX_FILL = (0, 0, 0, 180)
+
+@dataclass
+class Background:
+    """Camada independente de idioma: imagem já decodificada/redimensionada
+    e a faixa inferior (onde entra a legenda) pronta em RGBA."""
+    base: Image.Image
+    strip: Image.Image
+
+def _background(img_bytes: bytes) -> Background:
     base = Image.open(io.BytesIO(img_bytes)).convert('RGB').resize((W, H))
+    strip = base.crop((0, H - BOX_H, W, H)).convert('RGBA')
+    return Background(base=base, strip=strip)
 
-    # Overlay RGBA para permitir alpha real
-    overlay = Image.new('RGBA', (W, H), (0, 0, 0, 0))
-    odraw = ImageDraw.Draw(overlay)
+def prepare_background(image_sources: list[str]) -> list[Background | None]:
+    """Decodifica as imagens do tópico uma única vez (reutilizado por todos os idiomas).
+    Imagens que falharem ficam como None, preservando o índice da legenda."""
+    layers = []
+    for i, source in enumerate(image_sources):
+        try:
+            layers.append(_background(_download_or_load(source)))
+        except Exception as e:
+            print(f"    Erro ao processar imagem {i+1}: {e}")
+            layers.append(None)
+    return layers
 
-    # Caixa de legenda (semitransparente)
-    pad = 32
-    box_h = 300
-    odraw.rectangle([(0, H - box_h), (W, H)], fill=(0, 0, 0, 180))
+def _caption(bg: Background, text: str) -> Image.Image:
+    """Rasteriza só a faixa da legenda e cola sobre a base em cache."""
+    # Overlay RGBA (caixa + texto) apenas na faixa, com alpha real
+    overlay = Image.new('RGBA', (W, BOX_H), BOX_FILL)
+    odraw = ImageDraw.Draw(overlay)
 
     # Texto
     font = _load_font(54)
@@ -54,17 +82,23 @@ def _captioned_image(img_bytes: bytes, text: str) -> Image.Image:
 
     # Desenha o texto na overlay (usa RGBA)
     odraw.multiline_text(
-        (pad, H - box_h + pad),
+        (PAD, PAD),
         wrapped,
         font=font,
         fill=(255, 255, 255, 255)
     )
 
-    # Compõe overlay sobre a base e volta a RGB
-    composed = Image.alpha_composite(base.convert('RGBA'), overlay).convert('RGB')
-    return composed
+    # Compõe overlay sobre a faixa da base e cola de volta (RGB)
+    frame = bg.base.copy()
+    frame.paste(Image.alpha_composite(bg.strip, overlay).convert('RGB'), (0, H - BOX_H))
+    return frame
 
-def build_video(image_sources: list[str], lines: list[str], out_path: str):
+def _captioned_image(img_bytes: bytes, text: str) -> Image.Image:
+    """Cria imagem (W x H) com legenda em caixa semitransparente na base."""
+    return _caption(_background(img_bytes), text)
+
+def build_video(image_sources: list[str], lines: list[str], out_path: str, mode: str = "still",
+                background: list[Background | None] | None = None, threads: int | None = None):
     """
     Constrói vídeo a partir de imagens e legendas.
 
@@ -72,6 +106,11 @@ def build_video(image_sources: list[str], lines: list[str], out_path: str):
         image_sources: Lista de URLs ou caminhos de arquivo das imagens
         lines: Lista de textos para legendas
         out_path: Caminho do arquivo de vídeo de saída
+        mode: "still" (cada quadro legendado vai uma vez ao ffmpeg, com sua duração)
+              ou "moviepy" (ImageClip re-emitido a 30 fps, caminho antigo)
+        background: camadas de prepare_background(image_sources); se ausente,
+              as imagens são carregadas aqui
+        threads: threads do encoder x264 (None = perfil do host, core.encoder)
     """
     if not image_sources:
         raise RuntimeError("Sem imagens para compor o vídeo.")
@@ -82,21 +121,18 @@ def build_video(image_sources: list[str], lines: list[str], out_path: str):
     print(f"  [video] Construindo vídeo com {len(image_sources)} imagens...")
 
     per = max(2, DUR // max(1, len(image_sources)))  # segundos por cena
-    clips = []
+    if background is None:
+        background = prepare_background(image_sources)
+    frames = []
 
-    for i, source in enumerate(image_sources):
+    for i, bg in enumerate(background):
+        if bg is None:
+            continue
         try:
             text = lines[i % len(lines)]
 
-            # Baixa ou carrega a imagem
-            img_bytes = _download_or_load(source)
-
             # Cria frame com legenda (PIL Image RGB W x H)
-            frame = _captioned_image(img_bytes, text)
-
-            # >>> CORREÇÃO: passar ndarray (H, W, 3) para o ImageClip <<<
-            clip = ImageClip(np.array(frame)).set_duration(per)
-            clips.append(clip)
+            frames.append(_caption(bg, text))
 
             print(f"    Clip {i+1}/{len(image_sources)} criado")
 
@@ -104,13 +140,23 @@ def build_video(image_sources: list[str], lines: list[str], out_path: str):
             print(f"    Erro ao processar imagem {i+1}: {e}")
             continue
 
-    if not clips:
+    if not frames:
         raise RuntimeError("Nenhum clip foi criado com sucesso.")
 
+    total = min(DUR, len(frames) * per)
+    if mode == "still":
+        print(f"  [video] Exportando {len(frames)} quadros estáticos para {out_path}...")
+        render_stills(frames, [per] * len(frames), out_path, total_secs=total, threads=threads)
+        print(f"  [video] Vídeo salvo: {out_path}")
+        return
+
+    # >>> CORREÇÃO: passar ndarray (H, W, 3) para o ImageClip <<<
+    clips = [ImageClip(np.array(f)).set_duration(per) for f in frames]
+
     # Concatena e exporta
     print(f"  [video] Concatenando {len(clips)} clips...")
     video = concatenate_videoclips(clips, method="compose")
-    video = video.set_duration(min(DUR, len(clips) * per))
+    video = video.set_duration(total)
 
     print(f"  [video] Exportando para {out_path}...")
     video.write_videofile(
@@ -118,9 +164,8 @@ def build_video(image_sources: list[str], lines: list[str], out_path: str):
         fps=30,
         codec='libx264',
         audio=False,
-        preset='medium',
-        threads=4,
-        logger=None  # Remove logs verbosos
+        logger=None,  # Remove logs verbosos
+        **encoder.moviepy_kwargs('still', threads)
     )
 
     print(f"  [video] Vídeo salvo: {out_path}")
@@ -14,6 +14,11 @@ from moviepy.editor import (
 )
 from PIL import Image
 
+from core import encoder
+from core.render import load_frame, render_slideshow
+
+ZOOM = 1.05
+
 def _ken_burns(img_path: str, dur: float, size=(1080, 1920)) -> ImageClip:
     W, H = size
     img = Image.open(img_path).convert('RGB')
@@ -24,10 +29,28 @@ def _ken_burns(img_path: str, dur: float, size=(1080, 1920)) -> ImageClip:
     clip = ImageClip(frame).set_duration(dur)
 
     # Pequeno zoom (Ken Burns)
-    zoom = 1.05
+    zoom = ZOOM
     return clip.resize(lambda t: 1 + (zoom - 1) * (t / dur))
 
-def assemble_video(images: List[str], per_sec: float, out_path: str, audio_path: str = None) -> None:
+def assemble_video(images: List[str], per_sec: float, out_path: str, audio_path: str = None,
+                   engine: str = "stream") -> None:
+    """Monta o vídeo (Ken Burns por imagem) e multiplexa o áudio, se houver.
+    engine="stream": frames NumPy enviados ao ffmpeg (core.render);
+    engine="moviepy": caminho antigo via clip.resize.
+    """
+    if engine == "moviepy":
+        return _assemble_video_moviepy(images, per_sec, out_path, audio_path)
+
+    size = (1080, 1920)
+    segments = [(load_frame(p, size, resample=Image.LANCZOS), per_sec, ZOOM) for p in images]
+    if not segments:
+        # Fundo preto caso não haja imagens
+        segments = [(None, per_sec, 1.0)]
+
+    audio = audio_path if audio_path and os.path.exists(audio_path) else None
+    render_slideshow(segments, out_path, size=size, audio_path=audio)
+
+def _assemble_video_moviepy(images: List[str], per_sec: float, out_path: str, audio_path: str = None) -> None:
     clips = [_ken_burns(p, per_sec) for p in images]
 
     if clips:
@@ -44,7 +67,6 @@ def assemble_video(images: List[str], per_sec: float, out_path: str, audio_path:
         fps=30,
         codec='libx264',
         audio=bool(audio_path),
-        preset='medium',
-        threads=4,
-        logger=None
+        logger=None,
+        **encoder.moviepy_kwargs('motion')
     )